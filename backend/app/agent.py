@@ -0,0 +1,152 @@
+import asyncio
+import logging
+import signal
+import time
+from datetime import datetime
+from typing import Dict, List
+from uuid import UUID
+import httpx
+from app.core.config import settings
+from app.core.host_limiter import host_limiter
+from app.core.monitor import ping_service, service_host
+from app.core.dns_cache import dns_cache
+from app.core.regions import encode_batch
+from app.core.scheduling import CheckSchedule, EPOCH
+from app.db.models import Service, RefreshFrequency
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Configuration des constantes
+AGENT_REFRESH_SECONDS = 60  # Fréquence de récupération de la liste des checks
+AGENT_PUSH_SECONDS = 5  # Fréquence d'envoi des résultats
+AGENT_PUSH_BATCH = 500  # Résultats par requête d'ingestion
+AGENT_MAX_BUFFER = 50000  # Au-delà, les plus anciens résultats non envoyés sont abandonnés
+AGENT_CONCURRENCY = 20
+
+class ProbeAgent:
+    """Regional probe agent: pulls its checks from the server, probes them
+    on their own schedule and pushes the results in gzip batches.
+
+    Results stay buffered while the server is unreachable and are sent
+    with the next successful push."""
+
+    def __init__(self, client: httpx.AsyncClient):
+        self.client = client
+        self.region: str | None = None
+        self.schedule = CheckSchedule()
+        self.services: Dict[UUID, Service] = {}
+        self.buffer: List[dict] = []
+        self.dropped = 0
+        self._semaphore = asyncio.Semaphore(AGENT_CONCURRENCY)
+        self._tasks: set = set()
+
+    async def refresh_checks(self) -> None:
+        response = await self.client.get("/api/agents/checks")
+        response.raise_for_status()
+        data = response.json()
+        self.region = data["region"]
+        self.services = {
+            UUID(check["service_id"]): Service(
+                id=UUID(check["service_id"]),
+                url=check["url"],
+                refresh_frequency=RefreshFrequency.CUSTOM,
+                interval_seconds=check["interval_seconds"],
+                probe_method=check["probe_method"],
+                probe_body_limit=check["probe_body_limit"],
+                timeout_override=check["timeout"],
+            )
+            for check in data["checks"]
+        }
+        intervals = {service_id: service.interval_seconds for service_id, service in self.services.items()}
+        self.schedule.sync(intervals, {}, time.time())
+        logger.info(f"Agent {self.region}: {len(self.services)} checks assigned")
+
+    async def probe(self, service: Service) -> None:
+        host = service_host(service)
+        async with host_limiter.slot(host, dns_cache.peek(host)), self._semaphore:
+            ping_date = datetime.utcnow()
+            result = await ping_service(service)
+        self.buffer.append({
+            "service_id": str(service.id),
+            "ping_date": ping_date.isoformat(),
+            "status": result.status,
+            "response_time": result.response_time,
+            "bytes_read": result.bytes_read,
+        })
+        if len(self.buffer) > AGENT_MAX_BUFFER:
+            overflow = len(self.buffer) - AGENT_MAX_BUFFER
+            del self.buffer[:overflow]
+            self.dropped += overflow
+
+    def dispatch_due(self, now: float) -> int:
+        due = [service_id for service_id, _ in self.schedule.pop_due(now) if service_id in self.services]
+        for service_id in due:
+            task = asyncio.create_task(self.probe(self.services[service_id]))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        return len(due)
+
+    async def push(self) -> int:
+        """Send the buffered results; returns the number of results accepted."""
+        accepted = 0
+        while self.buffer:
+            batch = self.buffer[:AGENT_PUSH_BATCH]
+            try:
+                response = await self.client.post(
+                    "/api/agents/results",
+                    content=encode_batch(batch),
+                    headers={"Content-Encoding": "gzip", "Content-Type": "application/json"},
+                )
+                response.raise_for_status()
+            except httpx.HTTPError as e:
+                logger.warning(f"Agent push failed, {len(self.buffer)} results kept: {str(e)}")
+                break
+            del self.buffer[:len(batch)]
+            accepted += response.json()["accepted"]
+        return accepted
+
+    async def run(self, stop: asyncio.Event) -> None:
+        next_refresh = next_push = 0.0
+        while not stop.is_set():
+            now = time.time()
+            try:
+                if now >= next_refresh:
+                    await self.refresh_checks()
+                    next_refresh = now + AGENT_REFRESH_SECONDS
+                self.dispatch_due(now)
+                if now >= next_push:
+                    await self.push()
+                    next_push = now + AGENT_PUSH_SECONDS
+            except httpx.HTTPError as e:
+                logger.error(f"Agent cannot reach the server: {str(e)}")
+                next_refresh = now + AGENT_PUSH_SECONDS
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=1)
+            except asyncio.TimeoutError:
+                pass
+
+        if self._tasks:
+            await asyncio.wait(self._tasks)
+        await self.push()
+
+async def run_agent():
+    """Run a regional agent against AGENT_SERVER_URL with AGENT_TOKEN.
+
+    Locally, next to the API started with AGENT_TOKENS="eu-west=secret":
+
+        AGENT_TOKEN=secret python -m app.agent
+    """
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    headers = {"X-Agent-Token": settings.AGENT_TOKEN}
+    async with httpx.AsyncClient(base_url=settings.AGENT_SERVER_URL, headers=headers, timeout=30) as client:
+        agent = ProbeAgent(client)
+        await agent.run(stop)
+    logger.info("Probe agent stopped")
+
+if __name__ == "__main__":
+    asyncio.run(run_agent())
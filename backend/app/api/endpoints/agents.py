@@ -0,0 +1,64 @@
+from typing import List
+from uuid import UUID
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy.orm import Session
+from app.db.session import get_db
+from app.db.models import Service, User, CheckType
+from app.api.models.agent import AgentCheck, AgentChecksResponse, AgentResult, IngestResponse, ServiceRegionsResponse
+from app.core.auth import get_current_user, require_agent_region
+from app.core.regions import decode_batch, ingest_results, region_status, BatchTooLarge
+from app.core.scheduling import service_interval
+from app.core.timeouts import timeout_cache
+
+router = APIRouter()
+
+results_adapter = TypeAdapter(List[AgentResult])
+
+@router.get("/agents/checks", response_model=AgentChecksResponse)
+def get_agent_checks(region: str = Depends(require_agent_region), db: Session = Depends(get_db)):
+    """Checks a regional agent must run: every service, with its interval and timeout"""
+    checks = [
+        AgentCheck(
+            service_id=service.id,
+            url=service.url,
+            probe_method=service.probe_method,
+            probe_body_limit=service.probe_body_limit,
+            timeout=timeout_cache.get(service),
+            interval_seconds=service_interval(service),
+        )
+        for service in db.query(Service).filter(Service.check_type == CheckType.HTTP)
+    ]
+    return AgentChecksResponse(region=region, checks=checks)
+
+@router.post("/agents/results", response_model=IngestResponse)
+async def ingest_agent_results(
+    request: Request,
+    region: str = Depends(require_agent_region),
+    db: Session = Depends(get_db)
+):
+    """Bulk ingest of a batch of results (JSON list, optionally gzip-compressed)"""
+    try:
+        raw = decode_batch(await request.body(), request.headers.get("content-encoding"))
+        results = results_adapter.validate_python(raw)
+    except BatchTooLarge as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    except ValidationError as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=e.errors(include_url=False, include_context=False))
+    except (ValueError, OSError) as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid batch: {str(e)}")
+
+    accepted = ingest_results(db, region, [result.model_dump() for result in results])
+    return IngestResponse(received=len(results), accepted=accepted)
+
+@router.get("/services/{service_id}/regions", response_model=ServiceRegionsResponse)
+def get_service_regions(
+    service_id: UUID,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Per-region and quorum status of a service"""
+    service = db.query(Service).filter(Service.id == service_id, Service.user_id == current_user.id).first()
+    if not service:
+        raise HTTPException(status_code=404, detail="Service not found")
+    return ServiceRegionsResponse(service_id=service.id, **region_status(db, service))
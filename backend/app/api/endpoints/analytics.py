@@ -0,0 +1,39 @@
+from datetime import datetime, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from uuid import UUID
+from app.db.session import get_db
+from app.db.models import User
+from app.api.models.analytics import FleetAnalytics, ServiceAnalytics
+from app.core.auth import get_current_user
+from app.core.analytics import analytics_cache, MAX_ANALYTICS_DAYS
+
+router = APIRouter()
+
+def analytics_range(days: int) -> tuple:
+    # Plage alignée sur la minute : les requêtes d'une même minute partagent le cache
+    end = datetime.utcnow().replace(second=0, microsecond=0)
+    return end - timedelta(days=days), end
+
+@router.get("/analytics", response_model=FleetAnalytics)
+def get_fleet_analytics(
+    days: int = Query(30, ge=1, le=MAX_ANALYTICS_DAYS),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    start, end = analytics_range(days)
+    return analytics_cache.get(db, current_user.id, start, end)
+
+@router.get("/services/{service_id}/analytics", response_model=ServiceAnalytics)
+def get_service_analytics(
+    service_id: UUID,
+    days: int = Query(30, ge=1, le=MAX_ANALYTICS_DAYS),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    start, end = analytics_range(days)
+    summary = analytics_cache.get(db, current_user.id, start, end)
+    service = next((service for service in summary["services"] if service["service_id"] == service_id), None)
+    if service is None:
+        raise HTTPException(status_code=404, detail="Service not found")
+    return {**service, "start": start, "end": end}
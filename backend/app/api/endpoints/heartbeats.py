@@ -0,0 +1,11 @@
+from fastapi import APIRouter, HTTPException, status
+from app.core.heartbeats import heartbeat_tracker
+
+router = APIRouter()
+
+@router.post("/heartbeat/{token}", status_code=status.HTTP_202_ACCEPTED)
+async def check_in(token: str):
+    """Check-in of a cron / batch job; written to the database in batches"""
+    if not heartbeat_tracker.check_in(token):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Unknown heartbeat")
+    return {"status": "ok"}
@@ -0,0 +1,87 @@
+from uuid import UUID
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+from app.db.session import get_db
+from app.db.models import Service, User, WorkerHeartbeat, CheckType
+from app.api.models.monitoring import RateLimitUpdate, RateLimitResponse, UserQuotaUpdate, UserQuotaResponse, WorkerResponse, WorkersHealthResponse
+from app.core.auth import require_admin_token
+from app.core.scheduling import evenness, expected_load, frequency_seconds
+from app.core.pipeline import check_rate_limiter, store_rate_limit
+from app.core.leader import leader_election
+from app.core.workers import is_alive
+from app.core.heartbeats import heartbeat_tracker
+from app.core.analytics import analytics_cache
+
+router = APIRouter()
+
+@router.get("/monitoring/metrics", dependencies=[Depends(require_admin_token)])
+def get_monitoring_metrics(db: Session = Depends(get_db)):
+    """Internal metrics of the probe engine, as published by each worker with its heartbeat"""
+    schedule = [
+        (service_id, effective_interval or interval_seconds or frequency_seconds(refresh_frequency))
+        for service_id, effective_interval, interval_seconds, refresh_frequency
+        in db.query(Service.id, Service.effective_interval, Service.interval_seconds, Service.refresh_frequency)
+        .filter(Service.check_type == CheckType.HTTP)
+    ]
+    return {
+        "leader": leader_election.stats(db),
+        "workers": [
+            {
+                "worker_id": heartbeat.worker_id,
+                "role": heartbeat.role,
+                "is_leader": heartbeat.is_leader,
+                "alive": is_alive(heartbeat),
+                "last_seen": heartbeat.last_seen,
+                "metrics": heartbeat.metrics or {},
+            }
+            for heartbeat in db.query(WorkerHeartbeat).order_by(WorkerHeartbeat.worker_id)
+        ],
+        # Métriques propres au process de l'API
+        "api": {
+            "analytics": analytics_cache.stats(),
+            "heartbeat_check_ins": heartbeat_tracker.stats(),
+        },
+        "load": {
+            "expected_per_second_over_minute": evenness(expected_load(schedule, 60)),
+            "expected_per_second_over_hour": evenness(expected_load(schedule, 3600)),
+        },
+    }
+
+@router.get("/monitoring/workers", response_model=WorkersHealthResponse)
+async def get_workers(db: Session = Depends(get_db)):
+    """Health of the processes running the scheduler, from their heartbeats"""
+    workers = []
+    for heartbeat in db.query(WorkerHeartbeat).order_by(WorkerHeartbeat.last_seen.desc()):
+        worker = WorkerResponse.model_validate(heartbeat)
+        worker.alive = is_alive(heartbeat)
+        workers.append(worker)
+    return WorkersHealthResponse(
+        monitoring_running=any(worker.alive and worker.is_leader for worker in workers),
+        workers=workers
+    )
+
+@router.put("/monitoring/rate", response_model=RateLimitResponse, dependencies=[Depends(require_admin_token)])
+def update_check_rate(update: RateLimitUpdate, db: Session = Depends(get_db)):
+    """Change the global probe rate at runtime.
+
+    Stored in the database: the processes that probe apply it at their next
+    schedule sync, this one right away."""
+    limit = store_rate_limit(db, update.checks_per_second, update.burst)
+    db.commit()
+    check_rate_limiter.set_rate(limit.checks_per_second, limit.burst)
+    return check_rate_limiter.stats()
+
+@router.put("/monitoring/users/{user_id}/quota", response_model=UserQuotaResponse, dependencies=[Depends(require_admin_token)])
+async def update_user_quota(user_id: UUID, quota: UserQuotaUpdate, db: Session = Depends(get_db)):
+    """Set the probe weight and quotas of a user (tiers)"""
+    user = db.query(User).filter(User.id == user_id).first()
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    for field, value in quota.model_dump().items():
+        setattr(user, field, value)
+    db.commit()
+    db.refresh(user)
+    return UserQuotaResponse(user_id=user.id, **quota.model_dump())
@@ -0,0 +1,81 @@
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from uuid import UUID
+from app.db.session import get_db
+from app.db.models import Service, AlertRule, AlertRuleState, User
+from app.api.models.rule import AlertRuleCreate, AlertRuleResponse
+from app.core.auth import get_current_user
+from app.core.rules import describe, delete_rule_data, MAX_RULES_PER_SERVICE
+
+router = APIRouter()
+
+def get_user_service(db: Session, service_id: UUID, user: User) -> Service:
+    service = db.query(Service)\
+        .filter(Service.id == service_id, Service.user_id == user.id)\
+        .first()
+    if not service:
+        raise HTTPException(status_code=404, detail="Service not found")
+    return service
+
+def rule_response(rule: AlertRule, state: Optional[AlertRuleState]) -> AlertRuleResponse:
+    return AlertRuleResponse(
+        id=rule.id,
+        service_id=rule.service_id,
+        kind=rule.kind,
+        threshold=rule.threshold,
+        status_class=rule.status_class,
+        matches=rule.matches,
+        checks=rule.checks,
+        window_seconds=rule.window_seconds,
+        description=describe(rule),
+        created_at=rule.created_at,
+        firing=state.firing if state else False,
+        value=state.value if state else None,
+        changed_at=state.changed_at if state else None,
+    )
+
+@router.get("/services/{service_id}/rules", response_model=List[AlertRuleResponse])
+def list_rules(
+    service_id: UUID,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    service = get_user_service(db, service_id, current_user)
+    rules = db.query(AlertRule).filter(AlertRule.service_id == service.id).order_by(AlertRule.id).all()
+    states = {
+        state.rule_id: state
+        for state in db.query(AlertRuleState).filter(AlertRuleState.rule_id.in_([rule.id for rule in rules]))
+    }
+    return [rule_response(rule, states.get(rule.id)) for rule in rules]
+
+@router.post("/services/{service_id}/rules", response_model=AlertRuleResponse, status_code=201)
+def create_rule(
+    service_id: UUID,
+    rule: AlertRuleCreate,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    service = get_user_service(db, service_id, current_user)
+    if db.query(AlertRule).filter(AlertRule.service_id == service.id).count() >= MAX_RULES_PER_SERVICE:
+        raise HTTPException(status_code=400, detail=f"A service cannot have more than {MAX_RULES_PER_SERVICE} rules")
+    db_rule = AlertRule(service_id=service.id, **rule.model_dump())
+    db.add(db_rule)
+    db.commit()
+    db.refresh(db_rule)
+    # L'état est créé au premier check évalué
+    return rule_response(db_rule, None)
+
+@router.delete("/services/{service_id}/rules/{rule_id}", status_code=204)
+def delete_rule(
+    service_id: UUID,
+    rule_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    service = get_user_service(db, service_id, current_user)
+    if db.query(AlertRule).filter(AlertRule.id == rule_id, AlertRule.service_id == service.id).first() is None:
+        raise HTTPException(status_code=404, detail="Rule not found")
+    delete_rule_data(db, [rule_id])
+    db.commit()
+    return None
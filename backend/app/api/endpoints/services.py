@@ -1,14 +1,26 @@
-from typing import List
+from typing import List, Optional
 import uuid
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy import desc
 from sqlalchemy.orm import Session
 from uuid import UUID
 from app.db.session import get_db
-from app.db.models import Service, RefreshFrequency, ServiceStats
-from app.api.models.service import ServiceCreate, ServiceResponse, ServiceStatsCreate, ServiceStatsResponse, ServiceStatsAggregated
+from app.db.models import Service, RefreshFrequency, ServiceStats, StatsRollup, RegionResult, Incident, LatencyBaseline, LatencyHistogram, AlertRule, CheckType
+from app.api.models.service import ServiceCreate, ServiceUpdate, ServiceResponse, ServiceStatsCreate, ServiceStatsResponse, ServiceStatsAggregated, ServiceStatsSeries, StatPoint, IncidentResponse, ServiceIncidents, HeatmapColumn, ServiceLatencyHeatmap
 from app.core.monitor import calculate_period_stats
-from datetime import datetime, timedelta
+from app.core.timeouts import timeout_cache
+from app.core.scheduling import resolve_interval
+from app.core.adaptive import adaptive_frequency
+from app.core.heartbeats import heartbeat_tracker, new_heartbeat_token
+from app.core.ingest import run_ingest_hooks
+from app.core.archive import read_stats, iter_stats, delete_archives, MAX_SERIES_DAYS, MAX_EXPORT_DAYS
+from app.core.incidents import service_incidents, downtime, uptime_percentage, MAX_INCIDENT_DAYS, MAX_INCIDENTS
+from app.core.slo import delete_slo_data
+from app.core.rules import delete_rule_data
+from app.core.heatmap import latency_heatmap, heatmap_resolution, LATENCY_BANDS_MS, MAX_HEATMAP_DAYS
+from app.core.analytics import analytics_cache
+from datetime import datetime, timedelta, timezone
 from app.core.auth import get_current_user
 from app.db.models import User
 
@@ -20,16 +32,65 @@ def create_service(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
+    refresh_frequency, interval_seconds = resolve_interval(service.refresh_frequency, service.interval_seconds)
+    heartbeat_token = new_heartbeat_token() if service.check_type == CheckType.HEARTBEAT else None
     db_service = Service(
         name=service.name,
-        url=str(service.url),
+        url=f"/heartbeat/{heartbeat_token}" if heartbeat_token else str(service.url),
+        check_type=service.check_type,
+        heartbeat_token=heartbeat_token,
+        heartbeat_grace_seconds=service.heartbeat_grace_seconds,
         user_id=current_user.id,
-        refresh_frequency=service.refresh_frequency
+        refresh_frequency=refresh_frequency,
+        interval_seconds=interval_seconds,
+        probe_method=service.probe_method,
+        probe_body_limit=service.probe_body_limit,
+        timeout_override=service.timeout_override,
+        shared_probe=service.shared_probe,
+        adaptive_interval=service.adaptive_interval
     )
     db.add(db_service)
     db.commit()
     db.refresh(db_service)
-    return db_service
+    if heartbeat_token:
+        heartbeat_tracker.register(heartbeat_token, db_service.id)
+    # La flotte de l'utilisateur a changé
+    analytics_cache.invalidate(current_user.id)
+    return ServiceResponse.from_db(db_service)
+
+@router.patch("/services/{service_id}", response_model=ServiceResponse)
+def update_service(
+    service_id: UUID,
+    update: ServiceUpdate,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    service = db.query(Service).filter(Service.id == service_id, Service.user_id == current_user.id).first()
+    if not service:
+        raise HTTPException(status_code=404, detail="Service not found")
+
+    # Seuls les champs envoyés sont modifiés ; null remet la valeur par défaut
+    changes = update.model_dump(exclude_unset=True)
+    if "refresh_frequency" in changes or "interval_seconds" in changes:
+        # Remettre l'intervalle à null n'a pas de sens pour un service "custom"
+        if changes.get("refresh_frequency", service.refresh_frequency) == RefreshFrequency.CUSTOM and changes.get("interval_seconds") is None:
+            raise HTTPException(status_code=422, detail="interval_seconds is required for a custom refresh_frequency")
+        changes["refresh_frequency"], changes["interval_seconds"] = resolve_interval(
+            changes.get("refresh_frequency", service.refresh_frequency),
+            changes.get("interval_seconds")
+        )
+    if changes.keys() & {"refresh_frequency", "adaptive_interval"}:
+        # L'intervalle adaptatif repart de la nouvelle base
+        changes["effective_interval"] = None
+        adaptive_frequency.forget(service.id)
+    for key, value in changes.items():
+        setattr(service, key, value)
+    db.commit()
+    db.refresh(service)
+
+    service_response = ServiceResponse.from_db(service)
+    service_response.effective_timeout = timeout_cache.get(service)
+    return service_response
 
 @router.get("/services/", response_model=List[ServiceResponse])
 def get_services(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
@@ -38,16 +99,17 @@ def get_services(current_user: User = Depends(get_current_user), db: Session = D
     # Pour chaque service, on récupère uniquement la stat la plus récente
     for service in services:
         service_response = ServiceResponse.from_db(service)
+        service_response.effective_timeout = timeout_cache.get(service)
         stats = db.query(ServiceStats)\
-            .filter(ServiceStats.service_id == service.id)\
+            .filter(ServiceStats.service_key == service.stats_key)\
             .order_by(desc(ServiceStats.ping_date))\
             .limit(1)\
             .all()
-        stats_response = [ServiceStatsResponse.from_db(stat) for stat in stats]
+        stats_response = [ServiceStatsResponse.from_db(stat, service.id) for stat in stats]
         service_response.stats = stats_response
 
         total_checks = db.query(ServiceStats)\
-            .filter(ServiceStats.service_id == service.id)\
+            .filter(ServiceStats.service_key == service.stats_key)\
             .count()
         service_response.total_checks = total_checks
         services_response.append(service_response)
@@ -74,17 +136,18 @@ def create_service_stats(
     
     # Create stats
     db_stats = ServiceStats(
-        service_id=service_id,
+        service_key=service.stats_key,
         status=stats.status,
         response_time=stats.response_time,
+        status_code=stats.status_code,
         ping_date=stats.ping_date
     )
     
     db.add(db_stats)
+    run_ingest_hooks(db, [db_stats])
     db.commit()
-    db.refresh(db_stats)
     
-    return db_stats
+    return ServiceStatsResponse.from_db(db_stats, service_id)
 
 @router.delete("/services/{service_id}", status_code=204)
 def delete_service(
@@ -97,11 +160,22 @@ def delete_service(
         raise HTTPException(status_code=404, detail="Service not found")
     
     # Delete associated stats first (due to foreign key constraint)
-    db.query(ServiceStats).filter(ServiceStats.service_id == service_id).delete()
+    db.query(ServiceStats).filter(ServiceStats.service_key == service.stats_key).delete()
+    db.query(StatsRollup).filter(StatsRollup.service_key == service.stats_key).delete()
+    db.query(LatencyHistogram).filter(LatencyHistogram.service_key == service.stats_key).delete()
+    db.query(RegionResult).filter(RegionResult.service_id == service_id).delete()
+    db.query(Incident).filter(Incident.service_id == service_id).delete()
+    delete_slo_data(db, service)
+    db.query(LatencyBaseline).filter(LatencyBaseline.service_key == service.stats_key).delete()
+    delete_rule_data(db, [rule_id for rule_id, in db.query(AlertRule.id).filter(AlertRule.service_id == service_id)])
+    if service.heartbeat_token:
+        heartbeat_tracker.unregister(service.heartbeat_token)
     
     # Delete the service
     db.delete(service)
     db.commit()
+    delete_archives(service_id)
+    analytics_cache.invalidate(current_user.id)
     
     return None
 
@@ -119,13 +193,13 @@ async def get_service_stats_aggregated(
     now = datetime.utcnow()
     
     stats_1h = calculate_period_stats(
-        db, service_id, now - timedelta(hours=1), "1h")
+        db, service.stats_key, now - timedelta(hours=1), "1h")
     stats_24h = calculate_period_stats(
-        db, service_id, now - timedelta(hours=24), "24h")
+        db, service.stats_key, now - timedelta(hours=24), "24h")
     stats_7d = calculate_period_stats(
-        db, service_id, now - timedelta(days=7), "7d")
+        db, service.stats_key, now - timedelta(days=7), "7d")
     stats_30d = calculate_period_stats(
-        db, service_id, now - timedelta(days=30), "30d")
+        db, service.stats_key, now - timedelta(days=30), "30d")
     
     return ServiceStatsAggregated(
         service_id=service_id,
@@ -133,4 +207,117 @@ async def get_service_stats_aggregated(
         stats_24h=stats_24h,
         stats_7d=stats_7d,
         stats_30d=stats_30d
-    )
\ No newline at end of file
+    )
+
+def stats_range(start: Optional[datetime], end: Optional[datetime], default: timedelta, maximum: timedelta):
+    """Naive UTC [start, end) range of a stats query, checked against its maximum length"""
+    end = end or datetime.utcnow()
+    start = start or end - default
+    start, end = (
+        value.astimezone(timezone.utc).replace(tzinfo=None) if value.tzinfo else value
+        for value in (start, end)
+    )
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    if end - start > maximum:
+        raise HTTPException(status_code=400, detail=f"Range cannot exceed {maximum.days} days")
+    return start, end
+
+@router.get("/services/{service_id}/stats/series", response_model=ServiceStatsSeries)
+def get_service_stats_series(
+    service_id: UUID,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    service = db.query(Service).filter(Service.id == service_id, Service.user_id == current_user.id).first()
+    if not service:
+        raise HTTPException(status_code=404, detail="Service not found")
+
+    start, end = stats_range(start, end, timedelta(hours=24), timedelta(days=MAX_SERIES_DAYS))
+    return ServiceStatsSeries(
+        service_id=service_id,
+        start=start,
+        end=end,
+        points=[StatPoint(**stat._asdict()) for stat in read_stats(db, service, start, end)]
+    )
+
+@router.get("/services/{service_id}/stats/heatmap", response_model=ServiceLatencyHeatmap)
+def get_service_latency_heatmap(
+    service_id: UUID,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Histogram of the response times of a service per time bucket, read
+    from the histograms maintained at ingest"""
+    service = db.query(Service).filter(Service.id == service_id, Service.user_id == current_user.id).first()
+    if not service:
+        raise HTTPException(status_code=404, detail="Service not found")
+
+    start, end = stats_range(start, end, timedelta(hours=24), timedelta(days=MAX_HEATMAP_DAYS))
+    resolution = heatmap_resolution(start, end)
+    return ServiceLatencyHeatmap(
+        service_id=service_id,
+        start=start,
+        end=end,
+        resolution_seconds=resolution,
+        bands_ms=list(LATENCY_BANDS_MS),
+        columns=[HeatmapColumn(bucket_start=bucket, counts=counts) for bucket, counts in latency_heatmap(db, service, start, end, resolution)]
+    )
+
+@router.get("/services/{service_id}/stats/export")
+def export_service_stats(
+    service_id: UUID,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """CSV export of the raw stats of a service, archived ones included"""
+    service = db.query(Service).filter(Service.id == service_id, Service.user_id == current_user.id).first()
+    if not service:
+        raise HTTPException(status_code=404, detail="Service not found")
+
+    start, end = stats_range(start, end, timedelta(days=30), timedelta(days=MAX_EXPORT_DAYS))
+
+    def rows():
+        # Les stats sont lues pendant l'envoi, un mois d'archive à la fois ;
+        # la session sert donc encore après l'endpoint et est fermée ici
+        try:
+            yield "ping_date,status,response_time,bytes_read\n"
+            for stat in iter_stats(db, service, start, end):
+                yield f"{stat.ping_date.isoformat()},{'up' if stat.status else 'down'},{'' if stat.response_time is None else stat.response_time},{'' if stat.bytes_read is None else stat.bytes_read}\n"
+        finally:
+            db.close()
+
+    filename = f"{service_id}_{start:%Y%m%d}_{end:%Y%m%d}.csv"
+    return StreamingResponse(rows(), media_type="text/csv", headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+@router.get("/services/{service_id}/incidents", response_model=ServiceIncidents)
+def get_service_incidents(
+    service_id: UUID,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: int = Query(100, ge=1, le=MAX_INCIDENTS),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Incidents of a service over a range (30 days by default), most recent
+    first, with the uptime computed from them"""
+    service = db.query(Service).filter(Service.id == service_id, Service.user_id == current_user.id).first()
+    if not service:
+        raise HTTPException(status_code=404, detail="Service not found")
+
+    start, end = stats_range(start, end, timedelta(days=30), timedelta(days=MAX_INCIDENT_DAYS))
+    incidents = service_incidents(db, service_id, start, end)
+    return ServiceIncidents(
+        service_id=service_id,
+        start=start,
+        end=end,
+        uptime_percentage=uptime_percentage(incidents, start, end),
+        downtime_seconds=downtime(incidents, start, end).total_seconds(),
+        incidents=[IncidentResponse.from_db(incident) for incident in incidents[:limit]]
+    )
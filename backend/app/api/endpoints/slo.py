@@ -0,0 +1,85 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from uuid import UUID
+from app.db.session import get_db
+from app.db.models import Service, ServiceSlo, SloBudget, User
+from app.api.models.slo import SloConfig, SloResponse
+from app.core.auth import get_current_user
+from app.core.slo import budget_status, rebuild_budget, delete_slo_data
+
+router = APIRouter()
+
+def get_user_service(db: Session, service_id: UUID, user: User) -> Service:
+    service = db.query(Service)\
+        .filter(Service.id == service_id, Service.user_id == user.id)\
+        .first()
+    if not service:
+        raise HTTPException(status_code=404, detail="Service not found")
+    return service
+
+def slo_response(service: Service, slo: ServiceSlo, budget: SloBudget) -> SloResponse:
+    return SloResponse(
+        service_id=service.id,
+        availability_target=slo.availability_target,
+        latency_threshold_ms=slo.latency_threshold_ms,
+        latency_target=slo.latency_target,
+        window_days=slo.window_days,
+        window_start=budget.window_start,
+        checks=budget.checks,
+        objectives=budget_status(slo, budget),
+        fast_burn_rate=budget.fast_burn_rate,
+        slow_burn_rate=budget.slow_burn_rate,
+        alert=budget.alert,
+        updated_at=slo.updated_at,
+    )
+
+@router.put("/services/{service_id}/slo", response_model=SloResponse)
+def set_service_slo(
+    service_id: UUID,
+    config: SloConfig,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    service = get_user_service(db, service_id, current_user)
+    slo = db.query(ServiceSlo).filter(ServiceSlo.service_id == service.id).first()
+    if slo is None:
+        slo = ServiceSlo(service_id=service.id)
+        db.add(slo)
+    for key, value in config.model_dump().items():
+        setattr(slo, key, value)
+    db.flush()
+
+    # Objectifs changés : le budget est recalculé depuis les stats brutes de la fenêtre
+    budget = rebuild_budget(db, service, slo)
+    db.commit()
+    return slo_response(service, slo, budget)
+
+@router.get("/services/{service_id}/slo", response_model=SloResponse)
+def get_service_slo(
+    service_id: UUID,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    service = get_user_service(db, service_id, current_user)
+    slo = db.query(ServiceSlo).filter(ServiceSlo.service_id == service.id).first()
+    if slo is None:
+        raise HTTPException(status_code=404, detail="No SLO defined")
+    # Une seule ligne de totaux, quelle que soit la longueur de la fenêtre
+    budget = db.get(SloBudget, service.stats_key)
+    if budget is None:
+        budget = rebuild_budget(db, service, slo)
+        db.commit()
+    return slo_response(service, slo, budget)
+
+@router.delete("/services/{service_id}/slo", status_code=204)
+def delete_service_slo(
+    service_id: UUID,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    service = get_user_service(db, service_id, current_user)
+    if db.query(ServiceSlo).filter(ServiceSlo.service_id == service.id).first() is None:
+        raise HTTPException(status_code=404, detail="No SLO defined")
+    delete_slo_data(db, service)
+    db.commit()
+    return None
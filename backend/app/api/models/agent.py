@@ -0,0 +1,49 @@
+from pydantic import BaseModel, UUID4, Field, field_validator
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from app.db.models import ProbeMethod
+
+class AgentCheck(BaseModel):
+    """Check assigned to a regional agent"""
+    service_id: UUID4
+    url: str
+    probe_method: ProbeMethod
+    probe_body_limit: Optional[int] = None
+    timeout: float
+    interval_seconds: int
+
+class AgentChecksResponse(BaseModel):
+    region: str
+    checks: List[AgentCheck]
+
+class AgentResult(BaseModel):
+    """One probe result pushed by an agent"""
+    service_id: UUID4
+    ping_date: datetime
+    status: bool
+    response_time: Optional[float] = Field(None, ge=0)
+    bytes_read: Optional[int] = Field(None, ge=0)
+
+    @field_validator('ping_date')
+    def to_naive_utc(cls, v):
+        if v.tzinfo is not None:
+            v = v.astimezone(timezone.utc).replace(tzinfo=None)
+        if v > datetime.utcnow():
+            raise ValueError("ping_date cannot be in the future")
+        return v
+
+class IngestResponse(BaseModel):
+    received: int
+    accepted: int
+
+class RegionStatusResponse(BaseModel):
+    status: bool
+    response_time: Optional[float] = None
+    ping_date: datetime
+
+class ServiceRegionsResponse(BaseModel):
+    service_id: UUID4
+    regions: Dict[str, RegionStatusResponse]
+    regions_up: int
+    regions_down: int
+    quorum_down: Optional[bool] = None
@@ -0,0 +1,29 @@
+from pydantic import BaseModel, UUID4
+from datetime import datetime
+from typing import List, Optional
+
+class Reliability(BaseModel):
+    incidents: int
+    downtime_seconds: float
+    longest_outage_seconds: Optional[float] = None
+    mttr_seconds: Optional[float] = None  # None sans incident terminé dans la plage
+    mtbf_seconds: Optional[float] = None  # None sans incident dans la plage
+    availability: float  # Part du temps hors incident
+    checks: int
+    check_availability: Optional[float] = None  # Part des checks up, depuis les rollups horaires
+
+class ServiceReliability(Reliability):
+    service_id: UUID4
+    name: str
+
+class FleetAnalytics(BaseModel):
+    """Reliability of each service of the user and of the whole fleet over a range"""
+    start: datetime
+    end: datetime
+    services_count: int
+    fleet: Reliability
+    services: List[ServiceReliability]
+
+class ServiceAnalytics(ServiceReliability):
+    start: datetime
+    end: datetime
@@ -0,0 +1,41 @@
+from pydantic import BaseModel, Field
+from datetime import datetime
+from typing import List, Optional
+from uuid import UUID
+
+class RateLimitUpdate(BaseModel):
+    checks_per_second: float = Field(gt=0)
+    burst: Optional[int] = Field(None, gt=0)
+
+class RateLimitResponse(BaseModel):
+    rate: float
+    burst: int
+    tokens: float
+
+class UserQuotaUpdate(BaseModel):
+    """Probe quotas of a user; None restores the default"""
+    probe_weight: Optional[float] = Field(None, gt=0, le=100)
+    max_checks_per_minute: Optional[int] = Field(None, gt=0)
+    max_concurrent_probes: Optional[int] = Field(None, gt=0)
+
+class UserQuotaResponse(UserQuotaUpdate):
+    user_id: UUID
+
+class WorkerResponse(BaseModel):
+    worker_id: str
+    role: str
+    hostname: str
+    pid: int
+    started_at: datetime
+    last_seen: datetime
+    is_leader: bool
+    in_flight_checks: int
+    dispatched_checks: int
+    alive: bool = False
+
+    class Config:
+        from_attributes = True
+
+class WorkersHealthResponse(BaseModel):
+    monitoring_running: bool  # Un worker vivant détient le bail du scheduler
+    workers: List[WorkerResponse]
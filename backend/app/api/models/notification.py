@@ -1,7 +1,7 @@
 from pydantic import BaseModel, UUID4, HttpUrl, validator
 from datetime import datetime
 from typing import Optional
-from app.db.models import NotificationMethod, AlertFrequency
+from app.db.models import NotificationMethod, AlertFrequency, LatencySensitivity
 
 class NotificationPreferenceCreate(BaseModel):
     service_id: UUID4
@@ -9,6 +9,7 @@ class NotificationPreferenceCreate(BaseModel):
     alert_frequency: AlertFrequency = AlertFrequency.ALWAYS
     webhook_url: str
     notify_on_recovery: bool = True
+    latency_sensitivity: LatencySensitivity = LatencySensitivity.MEDIUM  # off coupe les alertes de latence
 
 class NotificationPreferenceResponse(NotificationPreferenceCreate):
     id: UUID4
@@ -0,0 +1,37 @@
+from pydantic import BaseModel, UUID4, Field, model_validator
+from datetime import datetime
+from typing import Optional
+from app.db.models import RuleKind
+from app.core.rules import MAX_RULE_CHECKS, MIN_UPTIME_WINDOW_SECONDS, MAX_UPTIME_WINDOW_SECONDS
+
+class AlertRuleCreate(BaseModel):
+    kind: RuleKind
+    threshold: Optional[float] = Field(None, gt=0)  # Millisecondes (latency) ou pourcentage (uptime)
+    status_class: Optional[int] = Field(None, ge=4, le=5)
+    matches: int = Field(1, ge=1, le=MAX_RULE_CHECKS)
+    checks: int = Field(1, ge=1, le=MAX_RULE_CHECKS)
+    window_seconds: Optional[int] = Field(None, ge=MIN_UPTIME_WINDOW_SECONDS, le=MAX_UPTIME_WINDOW_SECONDS)
+
+    @model_validator(mode='after')
+    def fields_of_kind(self):
+        if self.matches > self.checks:
+            raise ValueError("matches cannot exceed checks")
+        if self.kind == RuleKind.LATENCY and self.threshold is None:
+            raise ValueError("threshold is required for latency rules")
+        if self.kind == RuleKind.STATUS_CODE and self.status_class is None:
+            raise ValueError("status_class is required for status_code rules")
+        if self.kind == RuleKind.UPTIME:
+            if self.threshold is None or self.threshold > 100:
+                raise ValueError("threshold must be a percentage for uptime rules")
+            if self.window_seconds is None:
+                raise ValueError("window_seconds is required for uptime rules")
+        return self
+
+class AlertRuleResponse(AlertRuleCreate):
+    id: int
+    service_id: UUID4
+    description: str
+    created_at: datetime
+    firing: bool = False
+    value: Optional[float] = None  # Checks en défaut (latency, status_code) ou uptime en %
+    changed_at: Optional[datetime] = None
@@ -1,19 +1,66 @@
-from pydantic import BaseModel, UUID4, HttpUrl, Field, field_validator
+from pydantic import BaseModel, UUID4, HttpUrl, Field, field_validator, model_validator
 from datetime import datetime
-from app.db.models import RefreshFrequency, Service, ServiceStats
+from app.db.models import RefreshFrequency, ProbeMethod, CheckType, Service, ServiceStats, Incident
 from typing import List, Optional
+from uuid import UUID
 
 from app.api.models.notification import NotificationPreferenceResponse
+from app.core.scheduling import base_interval, service_interval, MIN_INTERVAL_SECONDS, MAX_INTERVAL_SECONDS
 
 class ServiceCreate(BaseModel):
     name: str
-    url: HttpUrl
+    url: Optional[HttpUrl] = None  # Inutile pour un heartbeat
+    check_type: CheckType = CheckType.HTTP
+    heartbeat_grace_seconds: Optional[int] = Field(None, ge=0, le=MAX_INTERVAL_SECONDS)
     refresh_frequency: RefreshFrequency = RefreshFrequency.ONE_HOUR
+    interval_seconds: Optional[int] = Field(None, ge=MIN_INTERVAL_SECONDS, le=MAX_INTERVAL_SECONDS)
+    probe_method: ProbeMethod = ProbeMethod.GET
+    probe_body_limit: Optional[int] = Field(None, gt=0)
+    timeout_override: Optional[float] = Field(None, gt=0, le=60)
+    shared_probe: bool = False
+    adaptive_interval: bool = False
+
+    @model_validator(mode='after')
+    def url_required_for_http(self):
+        if self.check_type == CheckType.HTTP and self.url is None:
+            raise ValueError("url is required for http checks")
+        return self
+
+    @model_validator(mode='after')
+    def interval_required_for_custom(self):
+        # Sans intervalle, "custom" retomberait silencieusement sur une heure
+        if self.refresh_frequency == RefreshFrequency.CUSTOM and self.interval_seconds is None:
+            raise ValueError("interval_seconds is required for a custom refresh_frequency")
+        return self
+
+class ServiceUpdate(BaseModel):
+    name: Optional[str] = None
+    refresh_frequency: Optional[RefreshFrequency] = None
+    interval_seconds: Optional[int] = Field(None, ge=MIN_INTERVAL_SECONDS, le=MAX_INTERVAL_SECONDS)
+    probe_method: Optional[ProbeMethod] = None
+    probe_body_limit: Optional[int] = Field(None, gt=0)
+    timeout_override: Optional[float] = Field(None, gt=0, le=60)
+    shared_probe: Optional[bool] = None
+    adaptive_interval: Optional[bool] = None
+    heartbeat_grace_seconds: Optional[int] = Field(None, ge=0, le=MAX_INTERVAL_SECONDS)
+
+    @field_validator('name', 'refresh_frequency', 'probe_method', 'shared_probe', 'adaptive_interval')
+    def not_null(cls, v):
+        if v is None:
+            raise ValueError("cannot be null")
+        return v
+
+    @model_validator(mode='after')
+    def interval_required_for_custom(self):
+        if self.refresh_frequency == RefreshFrequency.CUSTOM and self.interval_seconds is None:
+            raise ValueError("interval_seconds is required for a custom refresh_frequency")
+        return self
 
 class ServiceStatsCreate(BaseModel):
     service_id: UUID4
     status: bool
     response_time: Optional[float] = Field(None, ge=0)
+    status_code: Optional[int] = Field(None, ge=100, le=599)
     ping_date: datetime
 
     @field_validator('response_time')
@@ -29,22 +76,42 @@ class ServiceStatsCreate(BaseModel):
         return v
 
 class ServiceStatsResponse(ServiceStatsCreate):
-    id: UUID4
+    bytes_read: Optional[int] = None
 
     class Config:
         from_attributes = True
 
     @classmethod
-    def from_db(cls, db_stats: ServiceStats):
-        return cls(**db_stats.__dict__)
+    def from_db(cls, db_stats: ServiceStats, service_id: UUID):
+        # Les stats ne stockent que la clé entière du service
+        return cls(
+            service_id=service_id,
+            status=db_stats.status,
+            response_time=db_stats.response_time,
+            ping_date=db_stats.ping_date,
+            bytes_read=db_stats.bytes_read,
+            status_code=db_stats.status_code,
+        )
 
 class ServiceResponse(BaseModel):
     id: UUID4
     name: str
-    url: HttpUrl
+    url: str  # Pour un heartbeat : chemin de check-in
     user_id: UUID4
     created_at: datetime
     refresh_frequency: RefreshFrequency
+    interval_seconds: Optional[int] = None
+    probe_method: ProbeMethod = ProbeMethod.GET
+    probe_body_limit: Optional[int] = None
+    timeout_override: Optional[float] = None
+    effective_timeout: Optional[float] = None
+    shared_probe: bool = False
+    adaptive_interval: bool = False
+    effective_interval: Optional[int] = None  # Intervalle réellement appliqué (incident, backoff)
+    check_type: CheckType = CheckType.HTTP
+    heartbeat_token: Optional[str] = None
+    heartbeat_grace_seconds: Optional[int] = None
+    last_heartbeat_at: Optional[datetime] = None
     stats: Optional[List[ServiceStatsResponse]] = []
     notification_preferences: Optional[NotificationPreferenceResponse] = None
     total_checks: Optional[int] = None
@@ -60,6 +127,17 @@ class ServiceResponse(BaseModel):
             user_id=db_service.user_id,
             created_at=db_service.created_at,
             refresh_frequency=db_service.refresh_frequency,
+            interval_seconds=base_interval(db_service),
+            probe_method=db_service.probe_method or ProbeMethod.GET,
+            probe_body_limit=db_service.probe_body_limit,
+            timeout_override=db_service.timeout_override,
+            shared_probe=bool(db_service.shared_probe),
+            adaptive_interval=bool(db_service.adaptive_interval),
+            effective_interval=service_interval(db_service),
+            check_type=db_service.check_type or CheckType.HTTP,
+            heartbeat_token=db_service.heartbeat_token,
+            heartbeat_grace_seconds=db_service.heartbeat_grace_seconds,
+            last_heartbeat_at=db_service.last_heartbeat_at,
             notification_preferences=db_service.notification_preferences,
         )
 
@@ -76,4 +154,55 @@ class ServiceStatsAggregated(BaseModel):
     stats_1h: AggregatedStats
     stats_24h: AggregatedStats
     stats_7d: AggregatedStats
-    stats_30d: AggregatedStats
\ No newline at end of file
+    stats_30d: AggregatedStats
+class StatPoint(BaseModel):
+    ping_date: datetime
+    status: bool
+    response_time: Optional[float] = None
+    bytes_read: Optional[int] = None
+
+class ServiceStatsSeries(BaseModel):
+    """Raw stats of a service over a range, archived ones included"""
+    service_id: UUID4
+    start: datetime
+    end: datetime
+    points: List[StatPoint]
+
+class HeatmapColumn(BaseModel):
+    bucket_start: datetime
+    counts: List[int]  # Checks par bande de temps de réponse
+
+class ServiceLatencyHeatmap(BaseModel):
+    """Response times of a service per time bucket, counted in fixed log-scale bands"""
+    service_id: UUID4
+    start: datetime
+    end: datetime
+    resolution_seconds: int
+    bands_ms: List[int]  # Bornes hautes exclues ; la dernière bande va au-delà de la dernière borne
+    columns: List[HeatmapColumn]  # Buckets sans temps de réponse omis
+
+class IncidentResponse(BaseModel):
+    id: int
+    started_at: datetime
+    ended_at: Optional[datetime] = None  # None tant que l'incident est en cours
+    duration_seconds: Optional[float] = None
+    down_checks: int
+
+    @classmethod
+    def from_db(cls, incident: Incident):
+        return cls(
+            id=incident.id,
+            started_at=incident.started_at,
+            ended_at=incident.ended_at,
+            duration_seconds=incident.duration.total_seconds() if incident.duration else None,
+            down_checks=incident.down_checks,
+        )
+
+class ServiceIncidents(BaseModel):
+    """Incidents of a service over a range and the uptime they leave"""
+    service_id: UUID4
+    start: datetime
+    end: datetime
+    uptime_percentage: float  # Part du temps hors incident
+    downtime_seconds: float
+    incidents: List[IncidentResponse]
@@ -0,0 +1,31 @@
+from pydantic import BaseModel, UUID4, Field, model_validator
+from datetime import datetime
+from typing import Dict, Optional
+
+class SloConfig(BaseModel):
+    availability_target: float = Field(99.9, gt=0, lt=100)
+    latency_threshold_ms: Optional[float] = Field(None, gt=0)
+    latency_target: Optional[float] = Field(None, gt=0, lt=100)
+    window_days: int = Field(30, ge=1, le=90)
+
+    @model_validator(mode='after')
+    def latency_objective_complete(self):
+        if (self.latency_threshold_ms is None) != (self.latency_target is None):
+            raise ValueError("latency_threshold_ms and latency_target go together")
+        return self
+
+class ObjectiveStatus(BaseModel):
+    target: float
+    compliance: Optional[float] = None  # None sans check dans la fenêtre
+    budget_remaining: float  # 1 = budget intact, négatif = objectif manqué
+
+class SloResponse(SloConfig):
+    """SLO of a service and the state of its error budget over the window"""
+    service_id: UUID4
+    window_start: datetime
+    checks: int
+    objectives: Dict[str, ObjectiveStatus]
+    fast_burn_rate: Optional[float] = None
+    slow_burn_rate: Optional[float] = None
+    alert: Optional[str] = None  # Règle de burn rate en cours d'alerte
+    updated_at: datetime
@@ -0,0 +1,93 @@
+from typing import Dict, Iterable, Optional, Set
+
+from app.core.scheduling import base_interval, MAX_INTERVAL_SECONDS
+
+# Configuration des constantes
+INCIDENT_INTERVAL_SECONDS = 30  # Cadence d'un service en panne jusqu'à son rétablissement
+INCIDENT_CHECKS_PER_SECOND = 5  # Budget global de checks rapides, tous services et tous workers confondus
+STABLE_CHECKS_BEFORE_BACKOFF = 10  # Succès consécutifs avant d'espacer un service stable
+MAX_BACKOFF_FACTOR = 4  # Un service stable n'est jamais vérifié moins souvent que 4x son intervalle
+
+class AdaptiveFrequency:
+    """Effective interval of each service from its latest results.
+
+    A failing service is probed every INCIDENT_INTERVAL_SECONDS until it
+    recovers, as long as the global budget allows it: at most
+    INCIDENT_CHECKS_PER_SECOND checks per second are spent on incidents,
+    other failing services keep their interval. Services that opted in to
+    adaptive_interval double their interval after STABLE_CHECKS_BEFORE_BACKOFF
+    successes in a row, up to MAX_BACKOFF_FACTOR times their base interval,
+    and come back to it on the first failure.
+
+    With PROBE_SHARDING, each worker gets an equal share of the global
+    budget (set_workers), so the cap holds for the whole fleet.
+
+    next_interval returns the effective interval to store, None meaning the
+    base interval."""
+
+    def __init__(self, incident_checks_per_second: float = INCIDENT_CHECKS_PER_SECOND):
+        self.incident_checks_per_second = incident_checks_per_second
+        self.workers = 1
+        self.max_fast_services = int(incident_checks_per_second * INCIDENT_INTERVAL_SECONDS)
+        self._fast: Set[object] = set()
+        self._streaks: Dict[object, int] = {}
+        self.budget_denied = 0
+        self.backoffs = 0
+
+    def next_interval(self, service, status: bool) -> Optional[int]:
+        base = base_interval(service)
+        if not status:
+            self._streaks.pop(service.id, None)
+            if base <= INCIDENT_INTERVAL_SECONDS:
+                return None
+            if service.id in self._fast or len(self._fast) < self.max_fast_services:
+                self._fast.add(service.id)
+                return INCIDENT_INTERVAL_SECONDS
+            self.budget_denied += 1
+            return None
+
+        self._fast.discard(service.id)
+        current = service.effective_interval
+        if not service.adaptive_interval or (current and current < base):
+            # Pas de backoff, ou fin d'incident : retour à l'intervalle de base
+            self._streaks.pop(service.id, None)
+            return None
+
+        interval = current or base
+        streak = self._streaks.get(service.id, 0) + 1
+        ceiling = min(base * MAX_BACKOFF_FACTOR, MAX_INTERVAL_SECONDS)
+        if streak >= STABLE_CHECKS_BEFORE_BACKOFF and interval < ceiling:
+            interval = min(interval * 2, ceiling)
+            self.backoffs += 1
+            streak = 0
+        self._streaks[service.id] = streak
+        return None if interval == base else interval
+
+    def set_workers(self, workers: int) -> None:
+        """Share the global budget between the workers probing in parallel."""
+        self.workers = max(workers, 1)
+        self.max_fast_services = int(self.incident_checks_per_second * INCIDENT_INTERVAL_SECONDS / self.workers)
+
+    def forget(self, service_id) -> None:
+        """Drop the state of a service whose settings changed."""
+        self._fast.discard(service_id)
+        self._streaks.pop(service_id, None)
+
+    def retain(self, service_ids: Iterable[object]) -> None:
+        """Drop the state of the services that no longer exist, freeing their share of the budget."""
+        service_ids = set(service_ids)
+        self._fast &= service_ids
+        for service_id in self._streaks.keys() - service_ids:
+            del self._streaks[service_id]
+
+    def stats(self) -> dict:
+        return {
+            "incident_services": len(self._fast),
+            "incident_budget": self.max_fast_services,
+            "workers": self.workers,
+            "budget_denied": self.budget_denied,
+            "backoffs": self.backoffs,
+        }
+
+# État partagé par le moteur de probes
+adaptive_frequency = AdaptiveFrequency()
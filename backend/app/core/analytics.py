@@ -0,0 +1,127 @@
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+from uuid import UUID
+from sqlalchemy import Integer, and_, case, func, literal, or_, type_coerce
+from sqlalchemy.orm import Session
+from app.db.models import Service, StatsRollup, Incident, EPOCH
+from app.core.retention import bucket_start, ROLLUP_RESOLUTIONS
+
+# Configuration des constantes
+ANALYTICS_CACHE_SECONDS = 60  # Durée de vie d'un résumé de flotte en cache
+ANALYTICS_CACHE_SIZE = 256  # Résumés gardés au plus (un par utilisateur et par plage)
+MAX_ANALYTICS_DAYS = 366
+
+def to_ms(date: datetime) -> int:
+    return (date - EPOCH) // timedelta(milliseconds=1)
+
+def reliability(incidents: int, downtime_ms: float, longest_ms: Optional[float], recovered: int,
+                recovery_ms: float, period_ms: float, up_checks: int, down_checks: int) -> dict:
+    """Reliability figures of one service, or of a fleet when the inputs are
+    summed over its services (period_ms then covers every service).
+
+    MTTR averages the incidents that recovered; MTBF is the time up divided
+    by the number of failures."""
+    checks = up_checks + down_checks
+    return {
+        "incidents": incidents,
+        "downtime_seconds": round(downtime_ms / 1000, 3),
+        "longest_outage_seconds": None if longest_ms is None else round(longest_ms / 1000, 3),
+        "mttr_seconds": round(recovery_ms / recovered / 1000, 3) if recovered else None,
+        "mtbf_seconds": round((period_ms - downtime_ms) / incidents / 1000, 3) if incidents else None,
+        "availability": round(100 - downtime_ms / period_ms * 100, 4),
+        "checks": checks,
+        "check_availability": round(up_checks / checks * 100, 4) if checks else None,
+    }
+
+def fleet_analytics(db: Session, user_id: UUID, start: datetime, end: datetime) -> dict:
+    """Reliability of every service of a user over [start, end), and of the
+    whole fleet.
+
+    Read from the incident intervals and the hourly rollups, never from the
+    raw stats: one grouped query over the incidents of the fleet and one
+    over its rollups. Check counts cover the hours starting in the range."""
+    start_ms, end_ms = to_ms(start), to_ms(end)
+    period_ms = end_ms - start_ms
+    # Les colonnes en millisecondes sont lues brutes pour calculer les durées en SQL
+    started = type_coerce(Incident.started_at, Integer)
+    ended = func.coalesce(type_coerce(Incident.ended_at, Integer), literal(end_ms, Integer))
+    overlap = func.min(ended, literal(end_ms, Integer)) - func.max(started, literal(start_ms, Integer))
+    recovered = and_(Incident.ended_at.isnot(None), Incident.ended_at <= end)
+
+    services = db.query(Service.id, Service.name).filter(Service.user_id == user_id).order_by(Service.name).all()
+    incident_rows = db.query(
+        Incident.service_id,
+        func.count(),
+        func.total(overlap),
+        func.max(overlap),
+        func.count(case((recovered, 1))),
+        func.total(case((recovered, type_coerce(Incident.ended_at, Integer) - started), else_=0)),
+    )\
+        .join(Service, Service.id == Incident.service_id)\
+        .filter(Service.user_id == user_id, Incident.started_at < end)\
+        .filter(or_(Incident.ended_at.is_(None), Incident.ended_at > start))\
+        .group_by(Incident.service_id)
+    incidents = {row[0]: row[1:] for row in incident_rows}
+    check_rows = db.query(Service.id, func.sum(StatsRollup.up_count), func.sum(StatsRollup.down_count))\
+        .join(StatsRollup, StatsRollup.service_key == Service.stats_key)\
+        .filter(Service.user_id == user_id, StatsRollup.resolution == ROLLUP_RESOLUTIONS["hour"])\
+        .filter(StatsRollup.bucket_start >= bucket_start(start, ROLLUP_RESOLUTIONS["hour"]), StatsRollup.bucket_start < end)\
+        .group_by(Service.id)
+    checks = {service_id: (up or 0, down or 0) for service_id, up, down in check_rows}
+
+    per_service = []
+    totals = [0, 0.0, None, 0, 0.0, 0, 0]
+    for service_id, name in services:
+        count, downtime_ms, longest_ms, recovered_count, recovery_ms = incidents.get(service_id, (0, 0.0, None, 0, 0.0))
+        up_checks, down_checks = checks.get(service_id, (0, 0))
+        per_service.append({
+            "service_id": service_id,
+            "name": name,
+            **reliability(count, downtime_ms, longest_ms, recovered_count, recovery_ms, period_ms, up_checks, down_checks),
+        })
+        totals = [
+            totals[0] + count, totals[1] + downtime_ms,
+            longest_ms if totals[2] is None else max(totals[2], longest_ms or 0),
+            totals[3] + recovered_count, totals[4] + recovery_ms,
+            totals[5] + up_checks, totals[6] + down_checks,
+        ]
+    fleet = reliability(*totals[:5], period_ms * max(len(services), 1), *totals[5:])
+    return {"start": start, "end": end, "services_count": len(services), "fleet": fleet, "services": per_service}
+
+class AnalyticsCache:
+    """Fleet summaries of the last ANALYTICS_CACHE_SECONDS, by user and range.
+
+    The API aligns the ranges on the minute, so the dashboards of a user
+    polling the same range share one computation per minute."""
+
+    def __init__(self):
+        self._entries: "OrderedDict[Tuple[UUID, datetime, datetime], Tuple[float, dict]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, db: Session, user_id: UUID, start: datetime, end: datetime) -> dict:
+        key = (user_id, start, end)
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry[0] < ANALYTICS_CACHE_SECONDS:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry[1]
+        self.misses += 1
+        summary = fleet_analytics(db, user_id, start, end)
+        self._entries[key] = (time.monotonic(), summary)
+        self._entries.move_to_end(key)
+        while len(self._entries) > ANALYTICS_CACHE_SIZE:
+            self._entries.popitem(last=False)
+        return summary
+
+    def invalidate(self, user_id: UUID) -> None:
+        for key in [key for key in self._entries if key[0] == user_id]:
+            del self._entries[key]
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "cached": len(self._entries)}
+
+# Résumés de flotte partagés par les requêtes du process
+analytics_cache = AnalyticsCache()
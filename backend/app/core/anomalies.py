@@ -0,0 +1,131 @@
+import logging
+import math
+from datetime import datetime
+from typing import Dict, List, Optional
+from sqlalchemy.orm import Session, joinedload
+from app.db.models import Service, ServiceStats, LatencyBaseline, NotificationPreference, LatencySensitivity
+from app.core.notifications import send_alert, Alerter
+
+logger = logging.getLogger(__name__)
+
+# Configuration des constantes
+EWMA_ALPHA = 0.05  # Poids d'un nouveau ping dans la moyenne et la variance
+WARMUP_SAMPLES = 30  # Pings appris avant de pouvoir signaler une dégradation
+MIN_DEVIATION_RATIO = 0.1  # Écart-type plancher, en part de la moyenne (services très réguliers)
+MIN_DEVIATION_MS = 5.0
+ANOMALY_STREAK = 3  # Pings consécutifs pour entrer dans l'état dégradé ou en sortir
+# Écart à la moyenne, en écarts-types, à partir duquel un ping est anormal
+SENSITIVITY_THRESHOLDS = {
+    LatencySensitivity.LOW: 6.0,
+    LatencySensitivity.MEDIUM: 4.0,
+    LatencySensitivity.HIGH: 3.0,
+}
+LATENCY_ALERT_SECONDS = 30  # Fréquence d'envoi des changements d'état
+
+def deviation(baseline: LatencyBaseline) -> float:
+    return max(math.sqrt(baseline.variance), baseline.mean * MIN_DEVIATION_RATIO, MIN_DEVIATION_MS)
+
+def observe(baseline: LatencyBaseline, response_time: float, threshold: Optional[float], now: datetime) -> None:
+    """Update a baseline with one response time, in constant time and memory.
+
+    A ping is anomalous when it is more than threshold deviations above the
+    mean; ANOMALY_STREAK anomalous pings in a row mark the service degraded
+    and as many normal ones (under half the threshold) clear it. Anomalous
+    pings are learnt clamped to the threshold, so a slow period does not
+    become the new normal within a few checks."""
+    baseline.last_response_time = response_time
+    learnt = response_time
+    if baseline.samples >= WARMUP_SAMPLES and threshold is not None:
+        score = (response_time - baseline.mean) / deviation(baseline)
+        baseline.last_score = round(score, 2)
+        contradicts = score < threshold / 2 if baseline.degraded else score >= threshold
+        baseline.streak = baseline.streak + 1 if contradicts else 0
+        if baseline.streak >= ANOMALY_STREAK:
+            baseline.degraded = not baseline.degraded
+            baseline.changed_at = now
+            baseline.notified = False
+            baseline.streak = 0
+        if score >= threshold:
+            learnt = baseline.mean + threshold * deviation(baseline)
+
+    # Moyenne arithmétique pendant l'apprentissage, EWMA ensuite
+    baseline.samples += 1
+    alpha = max(EWMA_ALPHA, 1 / baseline.samples)
+    difference = learnt - baseline.mean
+    baseline.mean += alpha * difference
+    baseline.variance = (1 - alpha) * (baseline.variance + alpha * difference * difference)
+
+def update_latency_baselines(db: Session, stats: List[ServiceStats]) -> None:
+    """Ingest hook: feed the response times of the up stats of a batch to the
+    baselines of their services.
+
+    One read of the baselines and preferences of the services of the batch,
+    then O(1) work per stat."""
+    by_key: Dict[int, List[ServiceStats]] = {}
+    for stat in stats:
+        if stat.status and stat.response_time is not None:
+            by_key.setdefault(stat.service_key, []).append(stat)
+    keys = list(by_key)
+    baselines: Dict[int, LatencyBaseline] = {}
+    sensitivities: Dict[int, str] = {}
+    for i in range(0, len(keys), 500):
+        chunk = keys[i:i + 500]
+        baselines.update(
+            (baseline.service_key, baseline)
+            for baseline in db.query(LatencyBaseline).filter(LatencyBaseline.service_key.in_(chunk))
+        )
+        sensitivities.update(
+            db.query(Service.stats_key, NotificationPreference.latency_sensitivity)
+            .join(NotificationPreference, NotificationPreference.service_id == Service.id)
+            .filter(Service.stats_key.in_(chunk))
+        )
+
+    created = False
+    for key, service_stats in by_key.items():
+        baseline = baselines.get(key)
+        if baseline is None:
+            baseline = LatencyBaseline(service_key=key, mean=0.0, variance=0.0, samples=0, streak=0, degraded=False, notified=True)
+            db.add(baseline)
+            created = True
+        # Sans préférence de notification, le profil est appris au seuil par défaut
+        threshold = SENSITIVITY_THRESHOLDS.get(sensitivities.get(key, LatencySensitivity.MEDIUM))
+        for stat in sorted(service_stats, key=lambda stat: stat.ping_date or datetime.utcnow()):
+            observe(baseline, stat.response_time, threshold, stat.ping_date or datetime.utcnow())
+    if created:
+        db.flush()  # Le lot suivant de la même transaction retrouve les nouveaux profils
+
+class LatencyAlerter(Alerter):
+    """Sends the degradation and recovery of the latency of the services,
+    recorded on their baselines at ingest."""
+
+    name = "latency_alerts"
+    interval_seconds = LATENCY_ALERT_SECONDS
+
+    async def notify(self, db: Session, now: datetime) -> int:
+        """Send the pending state changes; returns the number of degradations sent."""
+        rows = db.query(LatencyBaseline, Service)\
+            .join(Service, Service.stats_key == LatencyBaseline.service_key)\
+            .filter(LatencyBaseline.notified.is_(False))\
+            .options(joinedload(Service.notification_preferences))\
+            .all()
+        sent = 0
+        for baseline, service in rows:
+            preference = service.notification_preferences
+            if preference is not None and preference.latency_sensitivity != LatencySensitivity.OFF:
+                delivered = await send_alert(
+                    preference,
+                    "🐢 Latency degraded" if baseline.degraded else "🟢 Latency back to normal",
+                    {
+                        "Service Name": service.name,
+                        "Last response time": f"{baseline.last_response_time or 0:.0f} ms",
+                        "Usual response time": f"{baseline.mean:.0f} ms",
+                    },
+                    resolved=not baseline.degraded,
+                )
+                if delivered and baseline.degraded:
+                    sent += 1
+            baseline.notified = True
+        return sent
+
+# Alertes de dégradation de latence, envoyées par le leader du scheduler
+latency_alerter = LatencyAlerter()
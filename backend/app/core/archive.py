@@ -0,0 +1,294 @@
+import gzip
+import math
+import os
+import shutil
+import struct
+import sys
+import threading
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.db.session import DATA_DIR
+from app.db.models import ServiceStats
+
+# Configuration des constantes
+ARCHIVE_DIR = os.path.join(DATA_DIR, "archive")
+ARCHIVE_CACHE_BYTES = 64 * 1024 * 1024  # Colonnes décompressées gardées en mémoire, tous mois confondus
+SEGMENT_HEADER = struct.Struct("<4sI")  # Marqueur et nombre de lignes d'un segment
+SEGMENT_MAGIC = b"PMS1"
+MONTH_INDEX = struct.Struct("<qQ")  # Dernier horodatage archivé (µs) et taille validée d'un fichier mensuel
+MAX_SERIES_DAYS = 31  # Plage maximale de l'API series
+MAX_EXPORT_DAYS = 366  # Plage maximale de l'export CSV
+HOT_ROWS_BATCH = 1000  # Lignes de la table chaude lues à la fois par une lecture en flux
+EPOCH = datetime(1970, 1, 1)
+
+class ArchivedStat(NamedTuple):
+    ping_date: datetime
+    status: bool
+    response_time: Optional[float]
+    bytes_read: Optional[int]
+
+class MonthColumns(NamedTuple):
+    """Decoded month file, kept in its columnar layout: 25 bytes per stat."""
+    timestamps: array  # Microsecondes depuis l'epoch, croissantes
+    statuses: array
+    response_times: array
+    bytes_read: array
+
+    @property
+    def nbytes(self) -> int:
+        return sum(column.itemsize * len(column) for column in self)
+
+    def stats_between(self, start_micros: int, end_micros: int) -> Iterator[ArchivedStat]:
+        """Stats with start <= timestamp < end, found by bisection."""
+        for i in range(bisect_left(self.timestamps, start_micros), bisect_left(self.timestamps, end_micros)):
+            response_time, bytes_read = self.response_times[i], self.bytes_read[i]
+            yield ArchivedStat(
+                EPOCH + timedelta(microseconds=self.timestamps[i]),
+                bool(self.statuses[i]),
+                None if math.isnan(response_time) else response_time,
+                None if bytes_read < 0 else bytes_read,
+            )
+
+def empty_month() -> MonthColumns:
+    return MonthColumns(array("q"), array("B"), array("d"), array("q"))
+
+def month_of(date: datetime) -> str:
+    return date.strftime("%Y-%m")
+
+def months_between(start: datetime, end: datetime) -> List[str]:
+    """Months overlapping [start, end)."""
+    months = []
+    month_start = datetime(start.year, start.month, 1)
+    while month_start < end:
+        months.append(month_of(month_start))
+        month_start = (month_start + timedelta(days=32)).replace(day=1)
+    return months
+
+def archive_path(service_id, month: str) -> str:
+    return os.path.join(ARCHIVE_DIR, str(service_id), f"{month}.bin.gz")
+
+def index_path(path: str) -> str:
+    return f"{path}.last"
+
+def to_micros(date: datetime) -> int:
+    return (date - EPOCH) // timedelta(microseconds=1)
+
+def _little_endian(column: array) -> bytes:
+    if sys.byteorder == "big":
+        column = array(column.typecode, column)
+        column.byteswap()
+    return column.tobytes()
+
+def _from_little_endian(typecode: str, data: bytes) -> array:
+    column = array(typecode)
+    column.frombytes(data)
+    if sys.byteorder == "big":
+        column.byteswap()
+    return column
+
+def encode_segment(stats: List[ArchivedStat]) -> bytes:
+    """Columnar encoding of a list of stats: epoch microseconds (int64),
+    status (uint8), response time (float64, NaN for None) and bytes read
+    (int64, -1 for None), each column stored contiguously."""
+    timestamps = array("q", (to_micros(stat.ping_date) for stat in stats))
+    statuses = array("B", (1 if stat.status else 0 for stat in stats))
+    response_times = array("d", (math.nan if stat.response_time is None else stat.response_time for stat in stats))
+    bytes_read = array("q", (-1 if stat.bytes_read is None else stat.bytes_read for stat in stats))
+    return SEGMENT_HEADER.pack(SEGMENT_MAGIC, len(stats)) + b"".join(
+        _little_endian(column) for column in (timestamps, statuses, response_times, bytes_read)
+    )
+
+def decode_columns(data: bytes) -> MonthColumns:
+    """Concatenated columns of the segments of a decompressed month file."""
+    month = empty_month()
+    offset = 0
+    while offset < len(data):
+        magic, count = SEGMENT_HEADER.unpack_from(data, offset)
+        if magic != SEGMENT_MAGIC:
+            raise ValueError("Corrupted stats archive")
+        offset += SEGMENT_HEADER.size
+        for column in month:
+            size = column.itemsize * count
+            column.extend(_from_little_endian(column.typecode, data[offset:offset + size]))
+            offset += size
+    return month
+
+def read_index(path: str) -> Optional[Tuple[int, int]]:
+    """(last archived timestamp in epoch microseconds, committed size) of a
+    month file, None for a file written before the index existed."""
+    try:
+        with open(index_path(path), "rb") as index:
+            return MONTH_INDEX.unpack(index.read())
+    except FileNotFoundError:
+        return None
+
+def write_index(path: str, last_micros: int, size: int) -> None:
+    temporary = f"{index_path(path)}.tmp"
+    with open(temporary, "wb") as index:
+        index.write(MONTH_INDEX.pack(last_micros, size))
+        index.flush()
+        os.fsync(index.fileno())
+    os.replace(temporary, index_path(path))
+
+def committed_state(path: str) -> Tuple[Optional[int], int]:
+    """(last archived timestamp or None, committed size) of a month file."""
+    index = read_index(path)
+    if index is not None:
+        return index
+    if not os.path.exists(path):
+        return None, 0
+    # Fichier écrit avant l'index : décodé une seule fois, l'ajout suivant écrit l'index
+    with open(path, "rb") as archive:
+        data = archive.read()
+    timestamps = decode_columns(gzip.decompress(data)).timestamps
+    return (timestamps[-1] if timestamps else None), len(data)
+
+class MonthCache:
+    """Decoded month files, least recently used out first.
+
+    Bounded by the size of their columns rather than by a number of months:
+    a month of a service checked every 10 s weighs about 7 MB, one of an
+    hourly service 20 KB."""
+
+    def __init__(self, max_bytes: int = ARCHIVE_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._months: "OrderedDict[Tuple[str, int], MonthColumns]" = OrderedDict()
+        self._lock = threading.Lock()  # Lectures concurrentes des endpoints synchrones
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path: str, size: int) -> MonthColumns:
+        # La taille validée fait partie de la clé : un mois complété n'est jamais servi depuis le cache
+        key = (path, size)
+        with self._lock:
+            month = self._months.get(key)
+            if month is not None:
+                self.hits += 1
+                self._months.move_to_end(key)
+                return month
+            self.misses += 1
+        with open(path, "rb") as archive:
+            month = decode_columns(gzip.decompress(archive.read(size)))
+        with self._lock:
+            for stale in [cached for cached in self._months if cached[0] == path]:
+                self.bytes -= self._months.pop(stale).nbytes
+            if month.nbytes <= self.max_bytes:
+                self._months[key] = month
+                self.bytes += month.nbytes
+                while self.bytes > self.max_bytes:
+                    self.bytes -= self._months.popitem(last=False)[1].nbytes
+        return month
+
+    def stats(self) -> dict:
+        return {"cache_hits": self.hits, "cache_misses": self.misses, "cached_months": len(self._months), "cached_bytes": self.bytes}
+
+def load_month(service_id, month: str) -> MonthColumns:
+    path = archive_path(service_id, month)
+    index = read_index(path)
+    try:
+        size = index[1] if index else os.stat(path).st_size
+    except FileNotFoundError:
+        return empty_month()
+    return month_cache.get(path, size)
+
+def append_to_archive(service_id, stats: List[ArchivedStat]) -> int:
+    """Add stats to the month files of a service; returns the number of rows
+    written.
+
+    Each call appends one gzip member to the month file, the earlier ones
+    are never read back nor rewritten. A small index next to the file holds
+    the last archived timestamp and the committed size: it is updated once
+    the member is synced, and a member an interrupted call left past that
+    size is truncated by the next one, so a crash never leaves a corrupted
+    archive. Rows not newer than the last archived one are skipped:
+    archiving again stats whose deletion did not commit does not duplicate
+    them."""
+    by_month = {}
+    for stat in sorted(stats, key=lambda stat: stat.ping_date):
+        by_month.setdefault(month_of(stat.ping_date), []).append(stat)
+
+    written = 0
+    for month, month_stats in by_month.items():
+        path = archive_path(service_id, month)
+        last_micros, size = committed_state(path)
+        if last_micros is not None:
+            month_stats = [stat for stat in month_stats if to_micros(stat.ping_date) > last_micros]
+        if not month_stats:
+            continue
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "ab") as archive:
+            archive.truncate(size)
+            archive.write(gzip.compress(encode_segment(month_stats), compresslevel=6))
+            archive.flush()
+            os.fsync(archive.fileno())
+            size = archive.tell()
+        write_index(path, to_micros(month_stats[-1].ping_date), size)
+        written += len(month_stats)
+    return written
+
+def iter_archive(service_id, start: datetime, end: datetime) -> Iterator[ArchivedStat]:
+    """Archived stats of a service with start <= ping_date < end, oldest
+    first, decoding one month at a time."""
+    for month in months_between(start, end):
+        yield from load_month(service_id, month).stats_between(to_micros(start), to_micros(end))
+
+def read_archive(service_id, start: datetime, end: datetime) -> List[ArchivedStat]:
+    return list(iter_archive(service_id, start, end))
+
+def iter_stats(db: Session, service, start: datetime, end: datetime) -> Iterator[ArchivedStat]:
+    """Stats of a service with start <= ping_date < end, oldest first, from
+    the hot table and, for the part of the range before its oldest row,
+    from the archives.
+
+    Streamed: the archives are read a month at a time and the hot table
+    HOT_ROWS_BATCH rows at a time."""
+    hot_start = db.query(func.min(ServiceStats.ping_date)).filter(ServiceStats.service_key == service.stats_key).scalar() or end
+    if start < hot_start:
+        yield from iter_archive(service.id, start, min(end, hot_start))
+    rows = db.query(ServiceStats.ping_date, ServiceStats.status, ServiceStats.response_time, ServiceStats.bytes_read)\
+        .filter(ServiceStats.service_key == service.stats_key)\
+        .filter(ServiceStats.ping_date >= max(start, hot_start), ServiceStats.ping_date < end)\
+        .order_by(ServiceStats.ping_date)\
+        .yield_per(HOT_ROWS_BATCH)
+    for row in rows:
+        yield ArchivedStat(*row)
+
+def read_stats(db: Session, service, start: datetime, end: datetime) -> List[ArchivedStat]:
+    return list(iter_stats(db, service, start, end))
+
+def delete_archives(service_id) -> None:
+    shutil.rmtree(os.path.join(ARCHIVE_DIR, str(service_id)), ignore_errors=True)
+
+def expire_archives(keep_months: int, now: datetime) -> Tuple[int, int]:
+    """Remove the month files older than keep_months; returns (files, bytes) removed."""
+    oldest_kept = now.year * 12 + now.month - 1 - keep_months
+    files = removed_bytes = 0
+    if not os.path.isdir(ARCHIVE_DIR):
+        return 0, 0
+    for service_dir in os.scandir(ARCHIVE_DIR):
+        if not service_dir.is_dir():
+            continue
+        for entry in os.scandir(service_dir.path):
+            month = entry.name.split(".", 1)[0]
+            try:
+                year, month_number = (int(part) for part in month.split("-"))
+            except ValueError:
+                continue
+            if year * 12 + month_number - 1 < oldest_kept:
+                removed_bytes += entry.stat().st_size
+                os.remove(entry.path)
+                # L'index d'un mois part avec son fichier sans compter comme une archive
+                files += not entry.name.endswith(".last")
+    return files, removed_bytes
+
+def archive_stats() -> dict:
+    return month_cache.stats()
+
+# Mois d'archive décompressés, partagés par les lectures du process
+month_cache = MonthCache()
@@ -1,12 +1,14 @@
 from datetime import datetime, timedelta
 from typing import Optional
-from fastapi import Depends, HTTPException, status
+import secrets
+from fastapi import Depends, Header, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from sqlalchemy.orm import Session
 from app.db.session import get_db
 from app.db.models import User
+from app.core.config import settings
 from uuid import UUID
 
 # Configuration
@@ -54,4 +56,28 @@ async def get_current_user(
     user = db.query(User).filter(User.id == UUID(user_id)).first()
     if user is None:
         raise credentials_exception
-    return user 
\ No newline at end of file
+    return user
+
+def require_admin_token(x_admin_token: Optional[str] = Header(None)) -> None:
+    """Protège les endpoints d'administration du moteur de monitoring"""
+    if not settings.MONITORING_ADMIN_TOKEN or not x_admin_token \
+            or not secrets.compare_digest(x_admin_token, settings.MONITORING_ADMIN_TOKEN):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
+
+
+def agent_regions() -> dict:
+    """Jetons des agents régionaux : {token: région}"""
+    regions = {}
+    for entry in settings.AGENT_TOKENS.split(","):
+        region, _, token = entry.strip().partition("=")
+        if region and token:
+            regions[token] = region
+    return regions
+
+def require_agent_region(x_agent_token: Optional[str] = Header(None)) -> str:
+    """Authentifie un agent régional et renvoie sa région"""
+    if x_agent_token:
+        for token, region in agent_regions().items():
+            if secrets.compare_digest(x_agent_token, token):
+                return region
+    raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
@@ -5,6 +5,15 @@ class Settings(BaseSettings):
     VERSION: str = "0.1.0"
     API_STR: str = "/api/"
     SQLITE_URL: str = "sqlite:///./sql_app.db"
+    MONITORING_ADMIN_TOKEN: str = ""  # Vide = endpoints d'administration désactivés
+    RUN_SCHEDULER: bool = True  # False : l'API ne lance pas le monitoring, confié à python -m app.worker
+    PROBE_SHARDING: bool = False  # True : chaque worker vérifie sa part des services au lieu du seul leader
+    PROBE_REGION: str = "local"  # Région des checks faits par le serveur lui-même
+    AGENT_TOKENS: str = ""  # Agents régionaux autorisés : "eu-west=token1,us-east=token2"
+    AGENT_SERVER_URL: str = "http://localhost:8000"  # Mode agent : serveur qui distribue les checks
+    AGENT_TOKEN: str = ""  # Mode agent : jeton de la région
+    STATS_RETENTION: str = "raw=7d,minute=30d,hour=forever"  # Durée de conservation des stats brutes et des rollups
+    STATS_ARCHIVE_MONTHS: int = 12  # Mois de stats brutes gardés en archive compressée après leur rétention, 0 = pas d'archive
 
     class Config:
         env_file = ".env"
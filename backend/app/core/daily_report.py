@@ -3,11 +3,20 @@ import logging
 import os
 from sqlalchemy import func
 from app.db.session import SessionLocal
-from app.db.models import User, Service, ServiceStats
+from app.db.models import User, Service, StatsRollup
 from app.core.notifications import send_slack_notification
+from app.core.retention import ROLLUP_RESOLUTIONS
 
 logger = logging.getLogger(__name__)
 
+def pings_since(db, since):
+    """Number of pings recorded since a date (all of them for None), from the hourly rollups"""
+    query = db.query(func.coalesce(func.sum(StatsRollup.up_count + StatsRollup.down_count), 0))\
+        .filter(StatsRollup.resolution == ROLLUP_RESOLUTIONS["hour"])
+    if since is not None:
+        query = query.filter(StatsRollup.bucket_start >= since)
+    return query.scalar()
+
 def get_daily_stats():
     """Collect daily statistics from the database"""
     db = SessionLocal()
@@ -25,8 +34,9 @@ def get_daily_stats():
             "new_users_list": new_users_list,  # Add new users list to stats
             "total_services": db.query(Service).count(),
             "new_services_24h": db.query(Service).filter(Service.created_at >= yesterday).count(),
-            "total_pings": db.query(ServiceStats).count(),
-            "pings_24h": db.query(ServiceStats).filter(ServiceStats.ping_date >= yesterday).count(),
+            # Les rollups horaires comptent les pings sans parcourir les stats brutes
+            "total_pings": pings_since(db, None),
+            "pings_24h": pings_since(db, yesterday),
         }
         
         return stats
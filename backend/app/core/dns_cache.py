@@ -0,0 +1,177 @@
+import asyncio
+import ipaddress
+import logging
+import socket
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Configuration des constantes
+DNS_DEFAULT_TTL = 300.0  # TTL utilisé quand le resolver ne fournit pas de TTL
+DNS_MIN_TTL = 30.0
+DNS_MAX_TTL = 3600.0
+DNS_NEGATIVE_TTL = 30.0  # Durée de cache d'un échec de résolution
+DNS_MAX_CONCURRENT_LOOKUPS = 8  # Résolutions simultanées vers le resolver système
+
+# Un resolver renvoie les adresses et, s'il le connaît, le TTL de l'enregistrement
+Resolver = Callable[[str], Awaitable[Tuple[List[str], Optional[float]]]]
+
+async def system_resolver(host: str) -> Tuple[List[str], Optional[float]]:
+    """Resolve through getaddrinfo. The system resolver does not expose TTLs."""
+    loop = asyncio.get_running_loop()
+    infos = await loop.getaddrinfo(host, None, type=socket.SOCK_STREAM)
+    addresses = list(dict.fromkeys(info[4][0] for info in infos))
+    return addresses, None
+
+@dataclass
+class DNSEntry:
+    addresses: List[str]
+    expires_at: float
+    error: Optional[str] = None
+
+class DNSCache:
+    """Async DNS cache with TTL, negative caching and a bounded resolver.
+
+    Concurrent lookups of the same host share a single resolver call."""
+
+    def __init__(
+        self,
+        resolver: Resolver = system_resolver,
+        default_ttl: float = DNS_DEFAULT_TTL,
+        negative_ttl: float = DNS_NEGATIVE_TTL,
+        max_concurrent_lookups: int = DNS_MAX_CONCURRENT_LOOKUPS,
+    ):
+        self.resolver = resolver
+        self.default_ttl = default_ttl
+        self.negative_ttl = negative_ttl
+        self._entries: Dict[str, DNSEntry] = {}
+        self._pending: Dict[str, asyncio.Task] = {}
+        self._semaphore = asyncio.Semaphore(max_concurrent_lookups)
+        self.hits = 0
+        self.misses = 0
+        self.negative_hits = 0
+        self.failures = 0
+        self.reresolves = 0
+
+    async def resolve(self, host: str) -> Tuple[List[str], bool]:
+        """Return (addresses, from_cache). Raises httpx.ConnectError if the host does not resolve."""
+        entry = self._entries.get(host)
+        if entry and entry.expires_at > time.monotonic():
+            if entry.error:
+                self.negative_hits += 1
+                raise httpx.ConnectError(f"DNS resolution failed for {host}: {entry.error} (cached)")
+            self.hits += 1
+            return entry.addresses, True
+
+        self.misses += 1
+        pending = self._pending.get(host)
+        if pending is None:
+            pending = asyncio.ensure_future(self._lookup(host))
+            self._pending[host] = pending
+            pending.add_done_callback(lambda _: self._pending.pop(host, None))
+        entry = await asyncio.shield(pending)
+        if entry.error:
+            raise httpx.ConnectError(f"DNS resolution failed for {host}: {entry.error}")
+        return entry.addresses, False
+
+    async def _lookup(self, host: str) -> DNSEntry:
+        async with self._semaphore:
+            try:
+                addresses, ttl = await self.resolver(host)
+                if not addresses:
+                    raise socket.gaierror(f"no address for {host}")
+            except (OSError, UnicodeError) as e:
+                self.failures += 1
+                entry = DNSEntry([], time.monotonic() + self.negative_ttl, error=str(e))
+            else:
+                ttl = min(max(ttl if ttl is not None else self.default_ttl, DNS_MIN_TTL), DNS_MAX_TTL)
+                entry = DNSEntry(addresses, time.monotonic() + ttl)
+        self._entries[host] = entry
+        return entry
+
+    def peek(self, host: str) -> Optional[str]:
+        """First cached address of host, without resolving nor touching the metrics."""
+        entry = self._entries.get(host)
+        if entry and not entry.error and entry.expires_at > time.monotonic():
+            return entry.addresses[0]
+        return None
+
+    def invalidate(self, host: str) -> None:
+        self._entries.pop(host, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.negative_hits
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "negative_hits": self.negative_hits,
+            "failures": self.failures,
+            "reresolves": self.reresolves,
+            "hit_ratio": round((self.hits + self.negative_hits) / lookups, 4) if lookups else 0,
+        }
+
+def is_ip_address(host: str) -> bool:
+    try:
+        ipaddress.ip_address(host)
+        return True
+    except ValueError:
+        return False
+
+class CachingDNSTransport(httpx.AsyncBaseTransport):
+    """httpx transport that connects to addresses from a DNSCache.
+
+    The request URL is rewritten to the resolved IP while the Host header and
+    the TLS SNI / certificate hostname keep the original name. When the
+    connection to a cached address fails or times out, the host is resolved
+    again and the request retried once on another of its addresses when it
+    has one, so a stale entry can't report a service as down."""
+
+    def __init__(self, cache: DNSCache, transport: Optional[httpx.AsyncBaseTransport] = None, reresolve_on_failure: bool = True):
+        self.cache = cache
+        self.transport = transport or httpx.AsyncHTTPTransport()
+        self.reresolve_on_failure = reresolve_on_failure
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        if is_ip_address(host) or host == "localhost":
+            return await self.transport.handle_async_request(request)
+
+        addresses, from_cache = await self.cache.resolve(host)
+        try:
+            return await self._send(request, host, addresses[0])
+        # Une IP périmée refuse la connexion ou, le plus souvent, ne répond pas du tout
+        except (httpx.ConnectError, httpx.ConnectTimeout):
+            if not (self.reresolve_on_failure and from_cache):
+                raise
+            logger.info(f"Connection to cached address of {host} failed, resolving again")
+            failed = addresses[0]
+            self.cache.invalidate(host)
+            self.cache.reresolves += 1
+            addresses, _ = await self.cache.resolve(host)
+            # Une autre adresse de l'hôte plutôt que celle qui vient d'échouer
+            retry = next((address for address in addresses if address != failed), addresses[0])
+            return await self._send(request, host, retry)
+
+    async def _send(self, request: httpx.Request, host: str, address: str) -> httpx.Response:
+        resolved = httpx.Request(
+            request.method,
+            request.url.copy_with(host=address),
+            headers=request.headers,
+            stream=request.stream,
+            extensions={**request.extensions, "sni_hostname": host},
+        )
+        return await self.transport.handle_async_request(resolved)
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+# Cache partagé par toutes les probes du process
+dns_cache = DNSCache()
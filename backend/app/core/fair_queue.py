@@ -0,0 +1,172 @@
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict, Optional
+
+from app.core.timeouts import percentile
+
+# Configuration des constantes
+DEFAULT_USER_WEIGHT = 1.0
+DEFAULT_USER_CHECKS_PER_MINUTE = None  # Pas de quota par défaut, seulement le partage équitable
+DEFAULT_USER_CONCURRENT_PROBES = None  # Par défaut, toute la fenêtre si personne d'autre n'attend
+USER_BURST_SECONDS = 10  # Un utilisateur peut consommer d'un coup 10s de son quota
+USER_LAG_SAMPLES = 200
+REPORTED_USERS = 20  # Utilisateurs les plus en retard listés dans les métriques
+
+class _Waiter:
+    __slots__ = ("finish", "future", "enqueued_at")
+
+    def __init__(self, finish: float, future: asyncio.Future):
+        self.finish = finish
+        self.future = future
+        self.enqueued_at = time.monotonic()
+
+class _UserState:
+    def __init__(self):
+        self.queue: Deque[_Waiter] = deque()
+        self.last_finish = 0.0
+        self.active = 0
+        self.tokens: Optional[float] = None
+        self.updated = time.monotonic()
+        self.granted = 0
+        self.lags: Deque[float] = deque(maxlen=USER_LAG_SAMPLES)
+
+class FairScheduler:
+    """Weighted fair queuing of probe slots across users.
+
+    Each request gets a virtual finish tag (self-clocked fair queueing):
+    start = max(virtual time, user's previous tag), finish = start + 1 / weight.
+    When a slot frees, the eligible user with the smallest head tag gets it,
+    so a user with 5,000 due services is served at its weighted share while
+    others keep theirs. A user is eligible while under its concurrent-probe
+    cap and with a token left in its checks-per-minute bucket; both quotas
+    are optional (None = no limit beyond the fair share)."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.in_use = 0
+        self.virtual_time = 0.0
+        self._users: Dict[object, _UserState] = {}
+        self._limits: Dict[object, tuple] = {}
+        self._timer: Optional[tuple] = None  # (boucle, TimerHandle)
+
+    @asynccontextmanager
+    async def slot(
+        self,
+        user_id,
+        weight: float = DEFAULT_USER_WEIGHT,
+        max_concurrent: Optional[int] = DEFAULT_USER_CONCURRENT_PROBES,
+        checks_per_minute: Optional[int] = DEFAULT_USER_CHECKS_PER_MINUTE,
+    ):
+        user = self._users.get(user_id)
+        if user is None:
+            user = self._users[user_id] = _UserState()
+        self._limits[user_id] = (max_concurrent, checks_per_minute)
+
+        start = max(self.virtual_time, user.last_finish)
+        user.last_finish = start + 1 / max(weight, 0.01)
+        waiter = _Waiter(user.last_finish, asyncio.get_running_loop().create_future())
+        user.queue.append(waiter)
+        self._dispatch()
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                self._release(user_id, user)
+            elif waiter in user.queue:
+                user.queue.remove(waiter)
+            raise
+        try:
+            yield
+        finally:
+            self._release(user_id, user)
+
+    def record_lag(self, user_id, lag_seconds: float) -> None:
+        user = self._users.get(user_id)
+        if user is not None:
+            user.lags.append(max(lag_seconds, 0.0))
+
+    def _release(self, user_id, user: _UserState) -> None:
+        self.in_use -= 1
+        user.active -= 1
+        self._dispatch()
+
+    def _refill(self, user_id, user: _UserState, now: float) -> None:
+        rate = self._limits[user_id][1] / 60
+        burst = max(1.0, rate * USER_BURST_SECONDS)
+        if user.tokens is None:
+            user.tokens = burst
+        else:
+            user.tokens = min(burst, user.tokens + (now - user.updated) * rate)
+        user.updated = now
+
+    def _dispatch(self) -> None:
+        now = time.monotonic()
+        retry_in = None
+        while self.in_use < self.capacity:
+            best = None
+            for user_id, user in self._users.items():
+                while user.queue and user.queue[0].future.done():
+                    user.queue.popleft()  # Attente annulée
+                if not user.queue:
+                    continue
+                max_concurrent, checks_per_minute = self._limits[user_id]
+                if max_concurrent is not None and user.active >= max_concurrent:
+                    continue
+                if checks_per_minute is not None:
+                    self._refill(user_id, user, now)
+                else:
+                    user.tokens = None  # Quota retiré
+                if user.tokens is not None and user.tokens < 1:
+                    wait = (1 - user.tokens) / (checks_per_minute / 60)
+                    retry_in = wait if retry_in is None else min(retry_in, wait)
+                    continue
+                if best is None or user.queue[0].finish < best.queue[0].finish:
+                    best = user
+            if best is None:
+                break
+            waiter = best.queue.popleft()
+            if best.tokens is not None:
+                best.tokens -= 1
+            best.active += 1
+            best.granted += 1
+            self.in_use += 1
+            self.virtual_time = max(self.virtual_time, waiter.finish)
+            waiter.future.set_result(None)
+
+        loop = asyncio.get_running_loop()
+        if retry_in is not None and (self._timer is None or self._timer[0] is not loop):
+            # Un utilisateur attend son quota : on réévalue quand un jeton sera disponible
+            def wake():
+                self._timer = None
+                self._dispatch()
+            self._timer = (loop, loop.call_later(retry_in, wake))
+        self._forget_idle_users()
+
+    def _forget_idle_users(self) -> None:
+        if len(self._users) < 1000:
+            return
+        for user_id in [uid for uid, user in self._users.items() if not user.queue and not user.active]:
+            del self._users[user_id]
+            del self._limits[user_id]
+
+    def stats(self) -> dict:
+        users = []
+        for user_id, user in self._users.items():
+            lags = sorted(user.lags)
+            users.append({
+                "user_id": str(user_id),
+                "queued": len(user.queue),
+                "active": user.active,
+                "granted": user.granted,
+                "lag_p50_seconds": round(percentile(lags, 50), 3) if lags else None,
+                "lag_p95_seconds": round(percentile(lags, 95), 3) if lags else None,
+            })
+        users.sort(key=lambda u: u["lag_p95_seconds"] or 0, reverse=True)
+        return {
+            "capacity": self.capacity,
+            "in_use": self.in_use,
+            "queued": sum(len(user.queue) for user in self._users.values()),
+            "users": users[:REPORTED_USERS],
+        }
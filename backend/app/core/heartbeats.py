@@ -0,0 +1,177 @@
+import asyncio
+import logging
+import secrets
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+from uuid import UUID
+from sqlalchemy.orm import Session, joinedload
+from app.db.session import SessionLocal
+from app.db.models import Service, ServiceStats, CheckType
+from app.core.notifications import send_service_notification
+from app.core.scheduling import service_interval
+from app.core.ingest import save_stats
+
+logger = logging.getLogger(__name__)
+
+# Configuration des constantes
+HEARTBEAT_FLUSH_SECONDS = 2  # Fréquence d'écriture des heartbeats reçus
+HEARTBEAT_TOKEN_RELOAD_SECONDS = 10  # Jetons créés par d'autres process pris en compte après ce délai
+HEARTBEAT_SCAN_SECONDS = 5  # Fréquence de recherche des échéances ratées
+DEFAULT_HEARTBEAT_GRACE_SECONDS = 60
+
+def new_heartbeat_token() -> str:
+    return secrets.token_urlsafe(18)
+
+def heartbeat_deadline(service: Service) -> Optional[datetime]:
+    """Time after which a missing heartbeat is reported."""
+    last = service.last_heartbeat_at or service.created_at
+    if last is None:
+        return None
+    grace = service.heartbeat_grace_seconds if service.heartbeat_grace_seconds is not None else DEFAULT_HEARTBEAT_GRACE_SECONDS
+    return last.replace(tzinfo=None) + timedelta(seconds=service_interval(service) + grace)
+
+class HeartbeatTracker:
+    """In-memory last-seen table of heartbeat services.
+
+    A check-in is a dict lookup and a dict write, without any database
+    access; flush() writes the check-ins received since the previous flush
+    in one batch: one UPDATE of last_heartbeat_at and one "up" stat per
+    service, whatever the number of check-ins."""
+
+    def __init__(self):
+        self._tokens: Dict[str, UUID] = {}
+        self._pending: Dict[UUID, datetime] = {}
+        self.tokens_loaded_at: Optional[datetime] = None
+        self.check_ins = 0
+        self.flushed = 0
+
+    def check_in(self, token: str, now: datetime | None = None) -> bool:
+        service_id = self._tokens.get(token)
+        if service_id is None:
+            return False
+        self._pending[service_id] = now or datetime.utcnow()
+        self.check_ins += 1
+        return True
+
+    def register(self, token: str, service_id: UUID) -> None:
+        self._tokens[token] = service_id
+
+    def unregister(self, token: str) -> None:
+        service_id = self._tokens.pop(token, None)
+        self._pending.pop(service_id, None)
+
+    def load_tokens(self, db: Session) -> None:
+        self._tokens = dict(
+            db.query(Service.heartbeat_token, Service.id)
+            .filter(Service.check_type == CheckType.HEARTBEAT, Service.heartbeat_token.isnot(None))
+        )
+        self.tokens_loaded_at = datetime.utcnow()
+
+    async def flush(self, db: Session) -> int:
+        """Write the pending check-ins; returns the number of services updated."""
+        if not self._pending:
+            return 0
+        pending, self._pending = self._pending, {}
+        try:
+            updated = await self._write(db, pending)
+        except Exception:
+            # Les heartbeats non écrits repartent avec le prochain flush
+            for service_id, seen_at in pending.items():
+                if seen_at > self._pending.get(service_id, seen_at - timedelta(seconds=1)):
+                    self._pending[service_id] = seen_at
+            raise
+        self.flushed += updated
+        return updated
+
+    async def _write(self, db: Session, pending: Dict[UUID, datetime]) -> int:
+        services = db.query(Service)\
+            .options(joinedload(Service.notification_preferences))\
+            .filter(Service.id.in_(list(pending)))\
+            .all()
+        new_stats = []
+        recovered = []
+        for service in services:
+            seen_at = pending[service.id]
+            if service.last_heartbeat_at and service.last_heartbeat_at >= seen_at:
+                continue  # Un autre process a déjà écrit un heartbeat plus récent
+            service.last_heartbeat_at = seen_at
+            new_stat = ServiceStats(service_key=service.stats_key, status=True, response_time=None, ping_date=seen_at)
+            new_stats.append(new_stat)
+            if service.heartbeat_missed_at:
+                service.heartbeat_missed_at = None
+                recovered.append((service, new_stat))
+
+        save_stats(db, new_stats)
+
+        for service, new_stat in recovered:
+            previous_stat = db.query(ServiceStats)\
+                .filter(ServiceStats.service_key == service.stats_key, ServiceStats.status.is_(False))\
+                .order_by(ServiceStats.ping_date.desc())\
+                .first()
+            await send_service_notification(
+                db, service.name, False, new_stat, previous_stat, service.notification_preferences, service.url
+            )
+        db.commit()
+        return len(services)
+
+    def stats(self) -> dict:
+        return {
+            "tracked_tokens": len(self._tokens),
+            "pending": len(self._pending),
+            "check_ins": self.check_ins,
+            "flushed": self.flushed,
+        }
+
+async def scan_missed_heartbeats(db: Session, now: datetime | None = None) -> int:
+    """Record a "down" stat and notify once for every heartbeat service past
+    its deadline. Returns the number of newly missed heartbeats."""
+    now = now or datetime.utcnow()
+    candidates = db.query(Service)\
+        .options(joinedload(Service.notification_preferences))\
+        .filter(Service.check_type == CheckType.HEARTBEAT, Service.heartbeat_missed_at.is_(None))\
+        .all()
+    new_stats = []
+    for service in candidates:
+        deadline = heartbeat_deadline(service)
+        if deadline is None or deadline > now:
+            continue
+        previous_stat = db.query(ServiceStats)\
+            .filter(ServiceStats.service_key == service.stats_key)\
+            .order_by(ServiceStats.ping_date.desc())\
+            .first()
+        new_stat = ServiceStats(service_key=service.stats_key, status=False, response_time=None, ping_date=now)
+        new_stats.append(new_stat)
+        service.heartbeat_missed_at = now
+        await send_service_notification(
+            db, service.name, True, new_stat, previous_stat, service.notification_preferences, service.url
+        )
+    save_stats(db, new_stats)
+    db.commit()
+    if new_stats:
+        logger.info(f"{len(new_stats)} heartbeat services missed their deadline")
+    return len(new_stats)
+
+async def run_heartbeat_flusher(stop: asyncio.Event) -> None:
+    """Background loop of the API process: flush the check-ins every
+    HEARTBEAT_FLUSH_SECONDS and reload the tokens of new services."""
+    while True:
+        db = SessionLocal()
+        try:
+            reload_after = timedelta(seconds=HEARTBEAT_TOKEN_RELOAD_SECONDS)
+            if heartbeat_tracker.tokens_loaded_at is None or datetime.utcnow() - heartbeat_tracker.tokens_loaded_at >= reload_after:
+                heartbeat_tracker.load_tokens(db)
+            await heartbeat_tracker.flush(db)
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error flushing heartbeats: {str(e)}")
+        finally:
+            db.close()
+        if stop.is_set():
+            return
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=HEARTBEAT_FLUSH_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+
+# Table des heartbeats reçus par ce process
+heartbeat_tracker = HeartbeatTracker()
@@ -0,0 +1,63 @@
+from bisect import bisect_right
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+from app.db.models import Service, ServiceStats, LatencyHistogram
+from app.core.config import settings
+from app.core.retention import bucket_start, parse_retention, ROLLUP_RESOLUTIONS
+
+# Configuration des constantes
+# Bornes hautes (exclues) des bandes de temps de réponse, en 1-2-5 : la dernière bande va au-delà de 10 s
+LATENCY_BANDS_MS = (10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+MAX_HEATMAP_DAYS = 366
+HEATMAP_MAX_COLUMNS = 1500  # Au-delà, la résolution horaire est utilisée
+
+def latency_band(response_time: float) -> int:
+    return bisect_right(LATENCY_BANDS_MS, response_time)
+
+def update_latency_histograms(db: Session, stats: List[ServiceStats]) -> None:
+    """Ingest hook: count the response times of a batch of new stats in the
+    bands of their minute and hour buckets, one upsert per band touched."""
+    counts: Dict[Tuple[int, int, datetime, int], int] = {}
+    for stat in stats:
+        if stat.response_time is None:
+            continue
+        ping_date = stat.ping_date or datetime.utcnow()
+        band = latency_band(stat.response_time)
+        for resolution in ROLLUP_RESOLUTIONS.values():
+            key = (stat.service_key, resolution, bucket_start(ping_date, resolution), band)
+            counts[key] = counts.get(key, 0) + 1
+
+    table = LatencyHistogram.__table__
+    for (service_key, resolution, start, band), count in counts.items():
+        statement = insert(table).values(service_key=service_key, resolution=resolution, bucket_start=start, band=band, count=count)
+        db.execute(statement.on_conflict_do_update(
+            index_elements=[table.c.service_key, table.c.resolution, table.c.bucket_start, table.c.band],
+            set_={"count": table.c.count + statement.excluded.count},
+        ))
+
+def heatmap_resolution(start: datetime, end: datetime, now: Optional[datetime] = None) -> int:
+    """Minute buckets when the range is short enough and still within the
+    retention of the minute rollups, hour buckets otherwise."""
+    minute_retention = parse_retention(settings.STATS_RETENTION)["minute"]
+    fits = (end - start) / timedelta(seconds=ROLLUP_RESOLUTIONS["minute"]) <= HEATMAP_MAX_COLUMNS
+    kept = minute_retention is None or start >= (now or datetime.utcnow()) - minute_retention
+    return ROLLUP_RESOLUTIONS["minute"] if fits and kept else ROLLUP_RESOLUTIONS["hour"]
+
+def latency_heatmap(db: Session, service: Service, start: datetime, end: datetime, resolution: int) -> List[Tuple[datetime, List[int]]]:
+    """(bucket start, count per band) of the buckets of a service starting in
+    [start, end) with at least one response time, oldest first.
+
+    A single range scan of the histogram primary key: the cost depends on
+    the number of buckets, not on the number of checks."""
+    rows = db.query(LatencyHistogram.bucket_start, LatencyHistogram.band, LatencyHistogram.count)\
+        .filter(LatencyHistogram.service_key == service.stats_key, LatencyHistogram.resolution == resolution)\
+        .filter(LatencyHistogram.bucket_start >= bucket_start(start, resolution), LatencyHistogram.bucket_start < end)\
+        .order_by(LatencyHistogram.bucket_start)
+    columns: List[Tuple[datetime, List[int]]] = []
+    for start_of_bucket, band, count in rows:
+        if not columns or columns[-1][0] != start_of_bucket:
+            columns.append((start_of_bucket, [0] * (len(LATENCY_BANDS_MS) + 1)))
+        columns[-1][1][band] += count
+    return columns
@@ -0,0 +1,92 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+
+# Configuration des constantes
+MAX_REQUESTS_PER_HOST = 2  # Probes simultanées vers un même nom d'hôte
+MAX_REQUESTS_PER_IP = 4  # Probes simultanées vers une même adresse IP (hôtes virtuels)
+HOST_MIN_INTERVAL = 0.2  # Secondes minimum entre deux démarrages de probe sur un même hôte
+
+class _Slot:
+    def __init__(self, limit: int):
+        self.semaphore = asyncio.Semaphore(limit)
+        self.users = 0
+
+class HostLimiter:
+    """Per-host and per-IP concurrency caps with a politeness delay.
+
+    Slots are acquired before the global semaphore, so probes waiting on a
+    throttled host never hold a global slot and other hosts keep their
+    throughput. Idle slots are dropped so the tables only hold active hosts."""
+
+    def __init__(
+        self,
+        per_host: int = MAX_REQUESTS_PER_HOST,
+        per_ip: int = MAX_REQUESTS_PER_IP,
+        min_interval: float = HOST_MIN_INTERVAL,
+    ):
+        self.per_host = per_host
+        self.per_ip = per_ip
+        self.min_interval = min_interval
+        self._hosts: Dict[str, _Slot] = {}
+        self._ips: Dict[str, _Slot] = {}
+        self._next_start: Dict[str, float] = {}
+        self.throttled = 0
+
+    @asynccontextmanager
+    async def slot(self, host: str, address: Optional[str] = None):
+        host_slot = self._enter(self._hosts, host, self.per_host)
+        ip_slot = self._enter(self._ips, address, self.per_ip) if address else None
+        try:
+            if host_slot.semaphore.locked() or (ip_slot and ip_slot.semaphore.locked()):
+                self.throttled += 1
+            async with host_slot.semaphore:
+                if ip_slot:
+                    await ip_slot.semaphore.acquire()
+                try:
+                    await self._wait_turn(host)
+                    yield
+                finally:
+                    if ip_slot:
+                        ip_slot.semaphore.release()
+        finally:
+            self._leave(self._hosts, host, host_slot)
+            if ip_slot:
+                self._leave(self._ips, address, ip_slot)
+
+    async def _wait_turn(self, host: str) -> None:
+        """Space out probe starts on the same host by min_interval."""
+        now = time.monotonic()
+        if len(self._next_start) > 2 * len(self._hosts) + 100:
+            self._next_start = {h: t for h, t in self._next_start.items() if t > now}
+        start = max(now, self._next_start.get(host, 0.0))
+        self._next_start[host] = start + self.min_interval
+        if start > now:
+            await asyncio.sleep(start - now)
+
+    @staticmethod
+    def _enter(table: Dict[str, _Slot], key: str, limit: int) -> _Slot:
+        slot = table.get(key)
+        if slot is None:
+            slot = table[key] = _Slot(limit)
+        slot.users += 1
+        return slot
+
+    @staticmethod
+    def _leave(table: Dict[str, _Slot], key: str, slot: _Slot) -> None:
+        slot.users -= 1
+        if slot.users == 0 and table.get(key) is slot:
+            del table[key]
+
+    def stats(self) -> dict:
+        return {
+            "active_hosts": len(self._hosts),
+            "active_ips": len(self._ips),
+            "throttled": self.throttled,
+            "per_host": self.per_host,
+            "per_ip": self.per_ip,
+        }
+
+# Limiteur partagé par toutes les probes du process
+host_limiter = HostLimiter()
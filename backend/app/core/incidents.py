@@ -0,0 +1,84 @@
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from uuid import UUID
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+from app.db.models import Service, ServiceStats, Incident
+from app.core.config import settings
+from app.core.regions import quorum_is_down
+
+# Configuration des constantes
+MAX_INCIDENT_DAYS = 366  # Plage maximale de l'API des incidents
+MAX_INCIDENTS = 1000  # Incidents renvoyés au plus par requête
+
+def update_incidents(db: Session, stats: List[ServiceStats]) -> None:
+    """Ingest hook: open an incident on the first down stat of a service and
+    close it on the next up stat. With regional agents (settings.AGENT_TOKENS),
+    a down stat only opens an incident when the quorum of the regions
+    confirms it, as for the down alert.
+
+    Only the open incidents of the services of the batch are read, so the
+    cost does not depend on the history of the services."""
+    by_key: Dict[int, List[ServiceStats]] = {}
+    for stat in stats:
+        by_key.setdefault(stat.service_key, []).append(stat)
+
+    services = {}
+    keys = list(by_key)
+    for i in range(0, len(keys), 500):
+        services.update(
+            (service.stats_key, service)
+            for service in db.query(
+                Service.stats_key, Service.id, Service.refresh_frequency, Service.interval_seconds, Service.effective_interval
+            ).filter(Service.stats_key.in_(keys[i:i + 500]))
+        )
+    open_incidents: Dict[UUID, Incident] = {}
+    ids = [service.id for service in services.values()]
+    for i in range(0, len(ids), 500):
+        open_incidents.update(
+            (incident.service_id, incident)
+            for incident in db.query(Incident).filter(Incident.service_id.in_(ids[i:i + 500]), Incident.ended_at.is_(None))
+        )
+
+    for key, service_stats in by_key.items():
+        service = services.get(key)
+        if service is None:
+            continue  # Service supprimé entre le check et l'écriture
+        service_id = service.id
+        incident = open_incidents.get(service_id)
+        for stat in sorted(service_stats, key=lambda stat: stat.ping_date):
+            if incident is not None and stat.ping_date < incident.started_at:
+                continue  # Stat plus ancienne que l'incident en cours, arrivée en retard
+            if not stat.status:
+                if incident is None:
+                    if settings.AGENT_TOKENS and not quorum_is_down(db, service, stat.status, stat.ping_date):
+                        continue  # Panne locale que le quorum des régions ne confirme pas
+                    incident = Incident(service_id=service_id, started_at=stat.ping_date, down_checks=0)
+                    db.add(incident)
+                incident.down_checks += 1
+            elif incident is not None:
+                incident.ended_at = stat.ping_date
+                incident = None
+
+def service_incidents(db: Session, service_id: UUID, start: datetime, end: datetime) -> List[Incident]:
+    """Incidents of a service overlapping [start, end), most recent first."""
+    return db.query(Incident)\
+        .filter(Incident.service_id == service_id, Incident.started_at < end)\
+        .filter(or_(Incident.ended_at.is_(None), Incident.ended_at > start))\
+        .order_by(Incident.started_at.desc())\
+        .all()
+
+def downtime(incidents: List[Incident], start: datetime, end: datetime, now: Optional[datetime] = None) -> timedelta:
+    """Part of [start, end) covered by the incidents; an open incident lasts until now."""
+    now = now or datetime.utcnow()
+    total = timedelta()
+    for incident in incidents:
+        overlap = min(end, incident.ended_at or now) - max(start, incident.started_at)
+        if overlap > timedelta():
+            total += overlap
+    return total
+
+def uptime_percentage(incidents: List[Incident], start: datetime, end: datetime, now: Optional[datetime] = None) -> float:
+    """Time-based uptime over [start, end), from the incidents overlapping it
+    instead of the pings."""
+    return round(100 - downtime(incidents, start, end, now) / (end - start) * 100, 3)
@@ -0,0 +1,36 @@
+from typing import Callable, List
+from sqlalchemy.orm import Session
+from app.db.models import ServiceStats
+from app.core.retention import update_rollups
+from app.core.heatmap import update_latency_histograms
+from app.core.incidents import update_incidents
+from app.core.slo import update_slo_budgets
+from app.core.anomalies import update_latency_baselines
+from app.core.rules import evaluate_rules
+
+# Traitements appliqués à chaque lot de nouvelles stats, dans la transaction qui les enregistre
+INGEST_HOOKS: List[Callable[[Session, List[ServiceStats]], None]] = [
+    update_rollups,
+    update_latency_histograms,
+    update_incidents,
+    update_slo_budgets,
+    update_latency_baselines,
+    evaluate_rules,
+]
+
+def run_ingest_hooks(db: Session, stats: List[ServiceStats]) -> None:
+    """Run the ingest hooks on stats already added to the session."""
+    if not stats:
+        return
+    for hook in INGEST_HOOKS:
+        hook(db, stats)
+
+def save_stats(db: Session, stats: List[ServiceStats]) -> None:
+    """Add new stats to the session and run the ingest hooks on them.
+
+    Every stat should be written through here (or run_ingest_hooks) so that
+    what is derived from the stats stays in sync; the caller commits."""
+    if not stats:
+        return
+    db.bulk_save_objects(stats)
+    run_ingest_hooks(db, stats)
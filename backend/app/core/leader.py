@@ -0,0 +1,94 @@
+import logging
+import os
+import socket
+from datetime import datetime, timedelta
+from uuid import uuid4
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.db.models import SchedulerLease
+
+logger = logging.getLogger(__name__)
+
+# Configuration des constantes
+LEASE_NAME = "scheduler"
+LEASE_SECONDS = 15  # Un leader mort est remplacé au plus tard après cette durée
+RENEW_SECONDS = 5  # Fréquence de renouvellement du bail (et de candidature des autres process)
+
+class LeaderElection:
+    """Lease-based leader election on a row of the shared database.
+
+    Every process calls renew() every RENEW_SECONDS. The lease row is taken
+    with a single conditional UPDATE (still ours, or expired), which SQLite
+    serializes across processes, so at most one process holds it. A leader
+    that cannot renew stops acting as leader once its own lease expires,
+    before anyone else can take it over."""
+
+    def __init__(self, name: str = LEASE_NAME, lease_seconds: int = LEASE_SECONDS):
+        self.name = name
+        self.lease_seconds = lease_seconds
+        self.holder_id = f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:8]}"
+        self._expires_at: datetime | None = None
+        self.elections_won = 0
+
+    def is_leader(self, now: datetime | None = None) -> bool:
+        now = now or datetime.utcnow()
+        return self._expires_at is not None and now < self._expires_at
+
+    def renew(self, db: Session, now: datetime | None = None) -> bool:
+        """Take or extend the lease. Returns True when this process is leader;
+        False on contention and on database errors."""
+        now = now or datetime.utcnow()
+        expires_at = now + timedelta(seconds=self.lease_seconds)
+        was_leader = self.is_leader(now)
+        try:
+            updated = db.query(SchedulerLease)\
+                .filter(SchedulerLease.name == self.name)\
+                .filter((SchedulerLease.holder == self.holder_id) | (SchedulerLease.expires_at < now))\
+                .update({"holder": self.holder_id, "expires_at": expires_at, "renewed_at": now}, synchronize_session=False)
+            if not updated:
+                db.add(SchedulerLease(name=self.name, holder=self.holder_id, expires_at=expires_at, renewed_at=now))
+            db.commit()
+        except IntegrityError:
+            # La ligne existe et appartient à un leader vivant
+            db.rollback()
+            if was_leader:
+                logger.warning(f"Lost scheduler leadership ({self.holder_id})")
+            self._expires_at = None
+            return False
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error renewing scheduler lease: {str(e)}")
+            return self.is_leader(now)
+
+        self._expires_at = expires_at
+        if not was_leader:
+            self.elections_won += 1
+            logger.info(f"Acquired scheduler leadership ({self.holder_id})")
+        return True
+
+    def release(self, db: Session) -> None:
+        """Give the lease up on shutdown so another process takes over at once."""
+        if not self.is_leader():
+            return
+        try:
+            db.query(SchedulerLease)\
+                .filter(SchedulerLease.name == self.name, SchedulerLease.holder == self.holder_id)\
+                .update({"expires_at": datetime.utcnow()}, synchronize_session=False)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error releasing scheduler lease: {str(e)}")
+        self._expires_at = None
+
+    def stats(self, db: Session) -> dict:
+        lease = db.query(SchedulerLease).filter(SchedulerLease.name == self.name).first()
+        return {
+            "holder_id": self.holder_id,
+            "is_leader": self.is_leader(),
+            "leader": lease.holder if lease and lease.expires_at > datetime.utcnow() else None,
+            "lease_expires_at": lease.expires_at if lease else None,
+            "elections_won": self.elections_won,
+        }
+
+# Élection partagée par les jobs du scheduler de ce process
+leader_election = LeaderElection()
@@ -0,0 +1,97 @@
+import logging
+import os
+from datetime import datetime
+from typing import Dict, Optional
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from app.db.session import SQLITE_URL, TIMESERIES_DB_PATH, TIMESERIES_SCHEMA
+
+logger = logging.getLogger(__name__)
+
+# Configuration des constantes
+CONFIG_SCHEMA = "main"
+CONFIG_CHECKPOINT_SECONDS = 3600  # Peu d'écritures : le WAL de la configuration reste petit
+TIMESERIES_CHECKPOINT_SECONDS = 300  # Écritures continues : WAL des séries tronqué souvent
+TIMESERIES_VACUUM_SECONDS = 900
+TIMESERIES_VACUUM_PAGES = 5000  # Pages rendues au système par passage (~20 Mo avec des pages de 4 Ko)
+DATABASE_FILES = {
+    CONFIG_SCHEMA: SQLITE_URL.removeprefix("sqlite:///"),
+    TIMESERIES_SCHEMA: TIMESERIES_DB_PATH,
+}
+
+def file_size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except FileNotFoundError:
+        return 0
+
+class DatabaseMaintenance:
+    """WAL checkpoints and vacuums of the configuration and time-series
+    databases, each on its own schedule.
+
+    The configuration database is small and rarely written: an hourly
+    checkpoint and a daily full VACUUM keep it compact, and copying it is
+    instant. The time-series database is written continuously: its WAL is
+    truncated every few minutes, and instead of a full VACUUM (which would
+    rewrite the whole file under the write lock) the pages freed by the
+    retention compactor are given back by bounded incremental vacuums."""
+
+    def __init__(self):
+        self.checkpoints: Dict[str, int] = {schema: 0 for schema in DATABASE_FILES}
+        self.vacuums: Dict[str, int] = {schema: 0 for schema in DATABASE_FILES}
+        self.last_checkpoint: Dict[str, Optional[datetime]] = {schema: None for schema in DATABASE_FILES}
+        self.last_vacuum: Dict[str, Optional[datetime]] = {schema: None for schema in DATABASE_FILES}
+
+    def checkpoint(self, db: Session, schema: str) -> bool:
+        """Copy the WAL of a database into its file and truncate it; returns
+        False when readers kept part of it (retried at the next run)."""
+        busy, _, _ = db.execute(text(f"PRAGMA {schema}.wal_checkpoint(TRUNCATE)")).one()
+        self.checkpoints[schema] += 1
+        self.last_checkpoint[schema] = datetime.utcnow()
+        if busy:
+            logger.info(f"WAL checkpoint of {schema} blocked by readers, retried later")
+        return not busy
+
+    def vacuum_config(self, db: Session) -> None:
+        db.execute(text(f"VACUUM {CONFIG_SCHEMA}"))
+        self._record_vacuum(CONFIG_SCHEMA)
+
+    def vacuum_timeseries(self, db: Session, pages: int = TIMESERIES_VACUUM_PAGES) -> int:
+        """Give up to pages free pages back to the file system; returns the
+        number of pages released."""
+        before = db.execute(text(f"PRAGMA {TIMESERIES_SCHEMA}.freelist_count")).scalar()
+        db.commit()
+        # executescript fait tourner le pragma jusqu'au bout : execute() ne libère qu'une page par appel
+        db.connection().connection.dbapi_connection.executescript(f"PRAGMA {TIMESERIES_SCHEMA}.incremental_vacuum({pages})")
+        released = before - db.execute(text(f"PRAGMA {TIMESERIES_SCHEMA}.freelist_count")).scalar()
+        self._record_vacuum(TIMESERIES_SCHEMA)
+        if released:
+            logger.info(f"Incremental vacuum released {released} pages of the time-series database")
+        return released
+
+    def backup_config(self, db: Session, path: str) -> int:
+        """Consistent, compacted copy of the configuration database; returns its size."""
+        if os.path.exists(path):
+            os.remove(path)
+        db.execute(text(f"VACUUM {CONFIG_SCHEMA} INTO :path"), {"path": path})
+        return file_size(path)
+
+    def _record_vacuum(self, schema: str) -> None:
+        self.vacuums[schema] += 1
+        self.last_vacuum[schema] = datetime.utcnow()
+
+    def stats(self) -> dict:
+        return {
+            schema: {
+                "file_bytes": file_size(path),
+                "wal_bytes": file_size(f"{path}-wal"),
+                "checkpoints": self.checkpoints[schema],
+                "last_checkpoint": self.last_checkpoint[schema],
+                "vacuums": self.vacuums[schema],
+                "last_vacuum": self.last_vacuum[schema],
+            }
+            for schema, path in DATABASE_FILES.items()
+        }
+
+# Maintenance des deux bases, lancée par le leader du scheduler
+database_maintenance = DatabaseMaintenance()
@@ -0,0 +1,40 @@
+from fastapi.encoders import jsonable_encoder
+from app.core.dns_cache import dns_cache
+from app.core.host_limiter import host_limiter
+from app.core.timeouts import timeout_cache
+from app.core.scheduling import probe_starts
+from app.core.pipeline import check_rate_limiter, pipeline_metrics
+from app.core.shared_probes import shared_probe_stats
+from app.core.adaptive import adaptive_frequency
+from app.core.heartbeats import heartbeat_tracker
+from app.core.retention import stats_compactor
+from app.core.maintenance import database_maintenance
+from app.core.slo import slo_alerter
+from app.core.anomalies import latency_alerter
+from app.core.rules import rule_alerter
+from app.core.monitor import check_schedule, fair_scheduler, shard_membership
+
+def process_metrics() -> dict:
+    """Internal metrics of the probe engine of this process.
+
+    They only exist in the process running the scheduler: the worker
+    publishes them with its heartbeat and the API serves them from there."""
+    return jsonable_encoder({
+        "shards": shard_membership.stats(),
+        "dns": dns_cache.stats(),
+        "hosts": host_limiter.stats(),
+        "timeouts": timeout_cache.stats(),
+        "rate_limit": check_rate_limiter.stats(),
+        "pipeline": pipeline_metrics.stats(),
+        "schedule": check_schedule.stats(),
+        "fairness": fair_scheduler.stats(),
+        "shared_probes": shared_probe_stats.stats(),
+        "adaptive": adaptive_frequency.stats(),
+        "heartbeats": heartbeat_tracker.stats(),
+        "retention": stats_compactor.stats(),
+        "storage": database_maintenance.stats(),
+        "slo": slo_alerter.stats(),
+        "latency_alerts": latency_alerter.stats(),
+        "rule_alerts": rule_alerter.stats(),
+        "observed_load_per_second": probe_starts.stats(),
+    })
@@ -2,152 +2,400 @@ from datetime import datetime, timedelta
 import httpx
 import asyncio
 import logging
-from sqlalchemy.orm import Session
+import time
+from sqlalchemy.orm import Session, joinedload
 from app.db.session import SessionLocal
-from app.db.models import Service, ServiceStats
+from app.db.models import Service, ServiceStats, StatsRollup, ProbeMethod, CheckType
 from app.api.models.service import AggregatedStats
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, NamedTuple
 from sqlalchemy import func
 from uuid import UUID
 from app.core.notifications import send_service_notification
+from app.core.dns_cache import CachingDNSTransport, dns_cache
+from app.core.host_limiter import host_limiter
+from app.core.timeouts import timeout_cache
+from app.core.scheduling import service_interval, phase_offset, is_due, probe_starts, CheckSchedule, EPOCH
+from app.core.pipeline import check_rate_limiter, pipeline_metrics, load_rate_limit
+from app.core.adaptive import adaptive_frequency
+from app.core.shared_probes import phase_key, group_shared_probes, shared_probe_stats
+from app.core.sharding import ShardMembership, claim_checks
+from app.core.leader import leader_election
+from app.core.workers import live_workers
+from app.core.config import settings
+from app.core.regions import quorum_is_down
+from app.core.ingest import save_stats
+from app.core.retention import raw_cutoff, ROLLUP_RESOLUTIONS
+from app.core.fair_queue import FairScheduler, DEFAULT_USER_WEIGHT, DEFAULT_USER_CHECKS_PER_MINUTE, DEFAULT_USER_CONCURRENT_PROBES
+from contextlib import nullcontext
+from itertools import chain, zip_longest
+from urllib.parse import urlsplit
 
 logger = logging.getLogger(__name__)
 
 # Configuration des constantes
-MAX_CONCURRENT_REQUESTS = 20  # Limite de requêtes simultanées
-REQUEST_TIMEOUT = 10.0  # Timeout en secondes
-BATCH_SIZE = 50  # Nombre de services traités par lot
+MAX_CONCURRENT_REQUESTS = 20  # Fenêtre de probes simultanées
+COMMIT_BATCH_SIZE = 50  # Résultats enregistrés par commit
+DNS_RERESOLVE_ON_FAILURE = True  # Re-résout l'hôte si la connexion à l'adresse en cache échoue
+DEFAULT_BODY_LIMIT = 64 * 1024  # Octets lus au maximum en mode GET
+HEAD_FALLBACK_STATUSES = {405, 501}  # Serveurs qui refusent HEAD : on retente en GET sans corps
 
-async def ping_service(service: Service) -> tuple[bool, float | None]:
-    """Ping a service and return its status and response time."""
+class ProbeResult(NamedTuple):
+    status: bool
+    response_time: float | None
+    bytes_read: int | None = None
+    status_code: int | None = None
+
+def get_probe_transport() -> httpx.AsyncBaseTransport:
+    """Transport HTTP utilisé par les probes, résolution DNS via le cache partagé."""
+    return CachingDNSTransport(dns_cache, reresolve_on_failure=DNS_RERESOLVE_ON_FAILURE)
+
+async def read_limited_body(response: httpx.Response, limit: int) -> int:
+    """Stream the body and stop once `limit` bytes have been read.
+
+    Chunks are discarded as they arrive, the remaining body is never downloaded:
+    closing the stream drops the connection. Returns the number of bytes
+    downloaded (before decompression)."""
+    body_size = 0
+    async for chunk in response.aiter_bytes():
+        body_size += len(chunk)
+        if body_size >= limit:
+            break
+    return response.num_bytes_downloaded
+
+async def send_probe(client: httpx.AsyncClient, url: str, method: str, body_limit: int) -> tuple[int, int]:
+    """Send the probe request and return (status_code, bytes_read)."""
+    if method == ProbeMethod.HEAD:
+        response = await client.head(url)
+        if response.status_code not in HEAD_FALLBACK_STATUSES:
+            return response.status_code, 0
+        method = ProbeMethod.GET_HEADERS
+
+    async with client.stream("GET", url) as response:
+        if method == ProbeMethod.GET_HEADERS:
+            return response.status_code, 0
+        return response.status_code, await read_limited_body(response, body_limit)
+
+async def ping_service(service: Service) -> ProbeResult:
+    """Ping a service and return its status, response time and body bytes read."""
+    method = service.probe_method or ProbeMethod.GET
+    body_limit = service.probe_body_limit or DEFAULT_BODY_LIMIT
     try:
-        async with httpx.AsyncClient(timeout=REQUEST_TIMEOUT) as client:
-            start_time = datetime.utcnow()
-            response = await client.get(str(service.url))
-            end_time = datetime.utcnow()
-            
-            response_time = (end_time - start_time).total_seconds() * 1000
-            return response.status_code < 400, response_time
+        async with httpx.AsyncClient(timeout=timeout_cache.get(service), transport=get_probe_transport()) as client:
+            start_time = time.perf_counter()
+            status_code, bytes_read = await send_probe(client, str(service.url), method, body_limit)
+            response_time = (time.perf_counter() - start_time) * 1000
+            return ProbeResult(status_code < 400, response_time, bytes_read, status_code)
     except Exception as e:
         logger.error(f"Error pinging service {service.name}: {str(e)}")
-        return False, None
+        return ProbeResult(False, None)
 
-async def process_service_batch(services: List[Service], semaphore: asyncio.Semaphore, db: Session) -> List[ServiceStats]:
-    """Process a batch of services concurrently with rate limiting."""
-    async def process_single_service(service: Service) -> ServiceStats:
-        async with semaphore:
-            previous_stat = db.query(ServiceStats)\
-                .filter(ServiceStats.service_id == service.id)\
-                .order_by(ServiceStats.ping_date.desc())\
-                .first()
-            status, response_time = await ping_service(service)
-            
-            new_stat = ServiceStats(
-                service_id=service.id,
-                status=status,
-                response_time=response_time,
-                ping_date=datetime.utcnow()
-            )
+# Fenêtre de probes simultanées partagée équitablement entre utilisateurs
+fair_scheduler = FairScheduler(MAX_CONCURRENT_REQUESTS)
+
+def user_slot(service: Service):
+    """Fair-queued probe slot, with the quotas of the service owner."""
+    user = service.user
+    return fair_scheduler.slot(
+        service.user_id,
+        weight=(user and user.probe_weight) or DEFAULT_USER_WEIGHT,
+        max_concurrent=(user and user.max_concurrent_probes) or DEFAULT_USER_CONCURRENT_PROBES,
+        checks_per_minute=(user and user.max_checks_per_minute) or DEFAULT_USER_CHECKS_PER_MINUTE,
+    )
+
+def service_host(service: Service) -> str:
+    return (urlsplit(str(service.url)).hostname or "").lower()
+
+def interleave_by_host(services: List[Service]) -> List[Service]:
+    """Round-robin services across hosts so same-host checks are spread over
+    the whole run instead of landing in the same batch."""
+    by_host: Dict[str, List[Service]] = {}
+    for service in services:
+        by_host.setdefault(service_host(service), []).append(service)
+    rounds = zip_longest(*by_host.values())
+    return [service for service in chain.from_iterable(rounds) if service is not None]
 
+async def probe_group(
+    group: List[Tuple[Service, datetime | None]],
+    db: Session,
+    semaphore: asyncio.Semaphore | None = None,
+) -> List[ServiceStats]:
+    """Probe the first service of a group once and build a stat for every
+    member, sending their notifications if needed.
+
+    A group has several members only for shared probes: they all target the
+    same URL the same way, so one request answers for all of them."""
+    leader = group[0][0]
+    host = service_host(leader)
+    # Le slot de l'hôte est pris avant la file équitable : un hôte saturé
+    # ne bloque pas les probes vers les autres hôtes
+    async with host_limiter.slot(host, dns_cache.peek(host)), user_slot(leader), semaphore or nullcontext():
+        await check_rate_limiter.acquire()
+        probe_starts.record()
+        started = datetime.utcnow()
+        for service, due_at in group:
+            lag = (started - due_at).total_seconds() if due_at else None
+            pipeline_metrics.record_start(lag)
+            if lag is not None:
+                fair_scheduler.record_lag(service.user_id, lag)
+        result = await ping_service(leader)
+    if leader.shared_probe:
+        shared_probe_stats.record(len(group))
+
+    new_stats = []
+    for service, _ in group:
+        previous_stat = db.query(ServiceStats)\
+            .filter(ServiceStats.service_key == service.stats_key)\
+            .order_by(ServiceStats.ping_date.desc())\
+            .first()
+        new_stat = ServiceStats(
+            service_key=service.stats_key,
+            status=result.status,
+            response_time=result.response_time,
+            bytes_read=result.bytes_read,
+            status_code=result.status_code,
+            ping_date=datetime.utcnow()
+        )
+
+        if result.status:
+            # Pas de retour signalé pour une panne que le quorum n'a jamais confirmée
+            notify = service.unconfirmed_down_at is None
+            service.unconfirmed_down_at = None
+        else:
+            # Avec des agents régionaux, une panne n'est signalée que si le quorum des régions la confirme
+            notify = not settings.AGENT_TOKENS or quorum_is_down(db, service, result.status)
+            if notify:
+                service.unconfirmed_down_at = None
+            elif previous_stat is None or not previous_stat.is_down:
+                service.unconfirmed_down_at = new_stat.ping_date  # Début d'une panne non confirmée
+        if notify:
             await send_service_notification(
                 db,
                 service.name,
-                not status,  # is_down
+                not result.status,  # is_down
                 new_stat,
                 previous_stat,
                 service.notification_preferences,
                 service.url
             )
 
-            return new_stat
+        effective_interval = adaptive_frequency.next_interval(service, result.status)
+        if effective_interval != service.effective_interval:
+            service.effective_interval = effective_interval  # Enregistré au prochain commit
+
+        pipeline_metrics.record_completion()
+        new_stats.append(new_stat)
+    return new_stats
+
+async def process_service(
+    service: Service,
+    semaphore: asyncio.Semaphore | None,
+    db: Session,
+    due_at: datetime | None = None,
+) -> ServiceStats:
+    """Probe one service and build its stat, sending notifications if needed."""
+    new_stats = await probe_group([(service, due_at)], db, semaphore)
+    return new_stats[0]
 
-    # Traite les services en parallèle avec le sémaphore
-    tasks = [process_single_service(service) for service in services]
+async def process_service_batch(services: List[Service], semaphore: asyncio.Semaphore, db: Session) -> List[ServiceStats]:
+    """Process a batch of services concurrently with rate limiting."""
+    tasks = [process_service(service, semaphore, db) for service in services]
     return await asyncio.gather(*tasks, return_exceptions=True)
 
-async def check_services(db: Session) -> None:
-    """Check all services that need to be monitored based on their frequency."""
-    try:
-        # Récupère tous les services qui doivent être vérifiés
-        services_to_check = []
-        services = db.query(Service).all()
-        
-        current_time = datetime.utcnow()
-        for service in services:
-            last_stat = db.query(ServiceStats)\
-                .filter(ServiceStats.service_id == service.id)\
-                .order_by(ServiceStats.ping_date.desc())\
-                .first()
-            
-            if should_check_service(service, last_stat, current_time):
-                services_to_check.append(service)
-
-        if not services_to_check:
-            logger.info("No services need checking at this time")
-            return
-
-        # Crée un sémaphore pour limiter les requêtes concurrentes
-        semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
-        
-        # Traite les services par lots
-        for i in range(0, len(services_to_check), BATCH_SIZE):
-            batch = services_to_check[i:i + BATCH_SIZE]
-            results = await process_service_batch(batch, semaphore, db)
-            
-            # Filtre les résultats valides et les ajoute à la base de données
-            valid_stats = [r for r in results if isinstance(r, ServiceStats)]
-            db.bulk_save_objects(valid_stats)
+async def run_check_pipeline(due_services: List[Tuple[Service, datetime | None]], db: Session) -> int:
+    """Probe all due services as a continuous pipeline.
+
+    Every probe is queued at once; the fair in-flight window (shared across
+    users by weighted fair queuing) and the global token bucket decide when
+    each one starts, so a new probe starts
+    as soon as a slot frees instead of waiting for a whole batch. Results are
+    committed every COMMIT_BATCH_SIZE completions. Services in shared-probe
+    mode that target the same URL share a single request. Returns the number
+    of stats saved."""
+    tasks = [
+        asyncio.create_task(probe_group(group, db))
+        for group in group_shared_probes(due_services)
+    ]
+
+    saved = 0
+    pending_stats = []
+    for next_done in asyncio.as_completed(tasks):
+        try:
+            pending_stats.extend(await next_done)
+        except Exception as e:
+            logger.error(f"Error processing service: {str(e)}")
+            continue
+        if len(pending_stats) >= COMMIT_BATCH_SIZE:
+            save_stats(db, pending_stats)
             db.commit()
-            
-            logger.info(f"Processed batch of {len(valid_stats)} services")
-            
-            # Petit délai entre les lots pour éviter la surcharge
-            if i + BATCH_SIZE < len(services_to_check):
-                await asyncio.sleep(1)
+            saved += len(pending_stats)
+            pending_stats = []
+
+    if pending_stats:
+        save_stats(db, pending_stats)
+        db.commit()
+        saved += len(pending_stats)
+    return saved
+
+check_schedule = CheckSchedule()
+shard_membership = ShardMembership(leader_election.holder_id)
+shard_keys: Dict[UUID, object] = {}  # Clé de répartition : les abonnés d'une sonde partagée restent ensemble
+in_flight_services: set = set()
+_background_runs: set = set()
+
+def sync_schedule(db: Session, now: float, schedule: CheckSchedule = check_schedule) -> None:
+    """Reload service slots; last pings are only read for new or changed services.
+
+    The adaptive timeouts are refreshed here too, when they are stale, and
+    the probe rate set through the API is applied."""
+    timeout_cache.refresh_if_stale(db)
+    load_rate_limit(db)
+    intervals = {}
+    phases = {}
+    stats_keys = {}
+    base_intervals = set()  # Services revenus à leur intervalle de base
+    for row in db.query(
+        Service.id, Service.url, Service.interval_seconds, Service.refresh_frequency,
+        Service.probe_method, Service.probe_body_limit, Service.timeout_override, Service.shared_probe,
+        Service.effective_interval, Service.stats_key
+    ).filter(Service.check_type == CheckType.HTTP):
+        intervals[row.id] = service_interval(row)
+        shard_keys[row.id] = phase_key(row)
+        phases[row.id] = phase_offset(shard_keys[row.id], intervals[row.id])
+        stats_keys[row.stats_key] = row.id
+        if row.effective_interval is None:
+            base_intervals.add(row.id)
+    changed = [
+        stats_key for stats_key, service_id in stats_keys.items()
+        if schedule.slot_of(service_id) != (intervals[service_id], phases[service_id])
+    ]
+    reset = [
+        service_id for service_id in map(stats_keys.get, changed)
+        if service_id in base_intervals and schedule.known(service_id)
+    ]
+    last_checks = {}
+    for i in range(0, len(changed), 500):
+        for stats_key, last_check in db.query(ServiceStats.service_key, func.max(ServiceStats.ping_date))\
+                .filter(ServiceStats.service_key.in_(changed[i:i + 500]))\
+                .group_by(ServiceStats.service_key):
+            last_checks[stats_keys[stats_key]] = last_check
+    schedule.sync(intervals, last_checks, now, phases)
+    for service_id in shard_keys.keys() - intervals.keys():
+        del shard_keys[service_id]
+    # Les services supprimés ou modifiés depuis l'API libèrent leur part du budget des checks rapides
+    adaptive_frequency.retain(intervals)
+    for service_id in reset:
+        adaptive_frequency.forget(service_id)
+
+async def run_due_checks(db: Session, due: List[Tuple[UUID, float]]) -> int:
+    """Probe the popped (service_id, due_at) checks; returns the number of stats saved."""
+    due_times = {service_id: EPOCH + timedelta(seconds=due_at) for service_id, due_at in due}
+    services = db.query(Service).options(joinedload(Service.user)).filter(Service.id.in_(due_times)).all()
+    services = interleave_by_host(services)
+    timeout_cache.plan_capacity(services, MAX_CONCURRENT_REQUESTS)
+    return await run_check_pipeline([(service, due_times[service.id]) for service in services], db)
+
+async def run_dispatched_checks(due: List[Tuple[UUID, float]]) -> None:
+    db = SessionLocal()
+    try:
+        await run_due_checks(db, due)
+    except Exception as e:
+        logger.error(f"Error in dispatched checks: {str(e)}")
+        db.rollback()
+    finally:
+        in_flight_services.difference_update(service_id for service_id, _ in due)
+        db.close()
+
+async def dispatch_due_checks(db: Session) -> int:
+    """Scheduler tick: start the checks whose slot has come, without waiting for them.
 
+    The probes run in a background task, so the next tick happens on time even
+    while slow probes are in flight. A service still being probed is skipped
+    (its slot is coalesced with the running check).
+
+    With PROBE_SHARDING, every worker runs this tick for the services of its
+    shard and claims each check in the database before probing it."""
+    now = time.time()
+    if check_schedule.needs_sync(now):
+        sync_schedule(db, now)
+        if settings.PROBE_SHARDING:
+            shard_membership.update([worker.worker_id for worker in live_workers(db)], now)
+            adaptive_frequency.set_workers(len(shard_membership.ring.nodes))
+    due = [(service_id, due_at) for service_id, due_at in check_schedule.pop_due(now) if service_id not in in_flight_services]
+    if settings.PROBE_SHARDING:
+        due = [(service_id, due_at) for service_id, due_at in due if shard_membership.owns(shard_keys.get(service_id, service_id), now)]
+        if due:
+            intervals = {service_id: check_schedule.interval_of(service_id) for service_id, _ in due}
+            due = claim_checks(db, shard_membership.worker_id, due, intervals, datetime.utcnow())
+    if not due:
+        return 0
+
+    in_flight_services.update(service_id for service_id, _ in due)
+    task = asyncio.create_task(run_dispatched_checks(due))
+    _background_runs.add(task)
+    task.add_done_callback(_background_runs.discard)
+    return len(due)
+
+async def check_services(db: Session) -> int:
+    """Run every check that is due now once and wait for the results.
+
+    Same path as the scheduler tick, on a throw-away schedule rebuilt from
+    the last pings; used by one-off runs and tests. Returns the number of
+    stats saved."""
+    now = time.time()
+    schedule = CheckSchedule()
+    try:
+        sync_schedule(db, now, schedule)
+        due = schedule.pop_due(now)
+        if not due:
+            logger.debug("No services need checking at this time")
+            return 0
+        saved = await run_due_checks(db, due)
+        logger.info(f"Saved stats for {saved} services")
+        return saved
     except Exception as e:
         logger.error(f"Error in check_services: {str(e)}")
         db.rollback()
         raise
-    finally:
-        logger.info(f"Finished checking {len(services_to_check)} services")
 
 def should_check_service(service: Service, last_stat: ServiceStats, current_time: datetime) -> bool:
-    """Determine if a service should be checked based on its frequency."""
+    """Determine if a service should be checked based on its frequency.
+
+    Checks are aligned on a per-service phase offset inside the interval so
+    the load is spread over the minute / hour instead of bursting at :00."""
     if not last_stat:
         return True
-        
-    frequency_minutes = {
-        "1 minute": 1,
-        "10 minutes": 10,
-        "1 hour": 60
-    }.get(service.refresh_frequency, 60)
-    
-    next_check = last_stat.ping_date + timedelta(minutes=frequency_minutes)
-    return current_time >= next_check
+
+    interval = service_interval(service)
+    return is_due(last_stat.ping_date, current_time, interval, phase_offset(phase_key(service), interval))
 
 async def monitor_loop():
-    """Main monitoring loop that runs continuously."""
+    """Standalone monitoring loop: one scheduler tick per second."""
     while True:
+        db = SessionLocal()
         try:
-            db = SessionLocal()
-            await check_services(db)
+            await dispatch_due_checks(db)
         except Exception as e:
             logger.error(f"Error in monitor loop: {str(e)}")
         finally:
             db.close()
-        
-        # Wait for 1 minute before next iteration
-        await asyncio.sleep(60) 
+        await asyncio.sleep(1)
 
-def calculate_period_stats(db: Session, service_id: UUID, start_time: datetime, period: str) -> AggregatedStats:
+def calculate_period_stats(db: Session, service_key: int, start_time: datetime, period: str) -> AggregatedStats:
+    # Avant le début de la fenêtre des stats brutes, les rollups horaires prennent le relais
+    cutoff = raw_cutoff()
     stats = db.query(ServiceStats)\
-        .filter(ServiceStats.service_id == service_id)\
-        .filter(ServiceStats.ping_date >= start_time)\
+        .filter(ServiceStats.service_key == service_key)\
+        .filter(ServiceStats.ping_date >= (max(start_time, cutoff) if cutoff else start_time))\
         .order_by(ServiceStats.ping_date.desc())\
         .all()
+    rollups = []
+    if cutoff and start_time < cutoff:
+        rollups = db.query(StatsRollup)\
+            .filter(StatsRollup.service_key == service_key, StatsRollup.resolution == ROLLUP_RESOLUTIONS["hour"])\
+            .filter(StatsRollup.bucket_start >= start_time, StatsRollup.bucket_start < cutoff)\
+            .all()
 
-    if not stats:
+    if not stats and not rollups:
         return AggregatedStats(
             period=period,
             uptime_percentage=0,
@@ -157,63 +405,52 @@ def calculate_period_stats(db: Session, service_id: UUID, start_time: datetime,
             response_times=[]
         )
 
+    def period_key(date: datetime) -> datetime:
+        if period == "1h":
+            # Garder tous les points de la dernière heure
+            return date
+        if period == "24h":
+            # Agrégation par heure pour les dernières 24h
+            return date.replace(minute=0, second=0, microsecond=0)
+        # Agrégation par jour pour 7d et 30d
+        return date.replace(hour=0, minute=0, second=0, microsecond=0)
+
     aggregated_data = {}
-    if period == "1h":
-        # Garder tous les points de la dernière heure
-        for stat in stats:
-            stat_time = stat.ping_date
-            if stat_time not in aggregated_data:
-                aggregated_data[stat_time] = {"up": 0, "down": 0, "response_times": []}
-            
-            if stat.response_time is not None:
-                aggregated_data[stat_time]["response_times"].append(stat.response_time)
-            if stat.status:
-                aggregated_data[stat_time]["up"] += 1
-            else:
-                aggregated_data[stat_time]["down"] += 1
-    elif period == "24h":
-        # Agrégation par heure pour les dernières 24h
-        for stat in stats:
-            hour_key = stat.ping_date.replace(minute=0, second=0, microsecond=0)
-            if hour_key not in aggregated_data:
-                aggregated_data[hour_key] = {"up": 0, "down": 0, "response_times": []}
-            
-            if stat.response_time is not None:
-                aggregated_data[hour_key]["response_times"].append(stat.response_time)
-            if stat.status:
-                aggregated_data[hour_key]["up"] += 1
-            else:
-                aggregated_data[hour_key]["down"] += 1
-    else:
-        # Code existant pour 7d et 30d
-        for stat in stats:
-            day_key = stat.ping_date.replace(hour=0, minute=0, second=0, microsecond=0)
-            if day_key not in aggregated_data:
-                aggregated_data[day_key] = {"up": 0, "down": 0, "response_times": []}
-            
-            if stat.response_time is not None:
-                aggregated_data[day_key]["response_times"].append(stat.response_time)
-            if stat.status:
-                aggregated_data[day_key]["up"] += 1
-            else:
-                aggregated_data[day_key]["down"] += 1
+    for stat in stats:
+        period_data = aggregated_data.setdefault(
+            period_key(stat.ping_date), {"up": 0, "down": 0, "response_time_sum": 0.0, "response_time_count": 0}
+        )
+        if stat.response_time is not None:
+            period_data["response_time_sum"] += stat.response_time
+            period_data["response_time_count"] += 1
+        if stat.status:
+            period_data["up"] += 1
+        else:
+            period_data["down"] += 1
+    for rollup in rollups:
+        period_data = aggregated_data.setdefault(
+            period_key(rollup.bucket_start), {"up": 0, "down": 0, "response_time_sum": 0.0, "response_time_count": 0}
+        )
+        period_data["response_time_sum"] += rollup.response_time_sum
+        period_data["response_time_count"] += rollup.response_time_count
+        period_data["up"] += rollup.up_count
+        period_data["down"] += rollup.down_count
 
     # Calcul des statistiques finales
     total_up = sum(period_data["up"] for period_data in aggregated_data.values())
     total_down = sum(period_data["down"] for period_data in aggregated_data.values())
     total_checks = total_up + total_down
-
-    all_response_times = [rt for period_data in aggregated_data.values() 
-                         for rt in period_data["response_times"] if rt is not None]
+    response_time_sum = sum(period_data["response_time_sum"] for period_data in aggregated_data.values())
+    response_time_count = sum(period_data["response_time_count"] for period_data in aggregated_data.values())
 
     return AggregatedStats(
         period=period,
         uptime_percentage=round((total_up / total_checks * 100) if total_checks > 0 else 0, 2),
-        avg_response_time=round(sum(all_response_times) / len(all_response_times) if all_response_times else 0, 2),
+        avg_response_time=round(response_time_sum / response_time_count if response_time_count else 0, 2),
         status_counts={"up": total_up, "down": total_down},
         timestamps=sorted(aggregated_data.keys()),
-        response_times=[round(sum(data["response_times"]) / len(data["response_times"]), 2) 
-                       if data["response_times"] else 0 
+        response_times=[round(data["response_time_sum"] / data["response_time_count"], 2)
+                       if data["response_time_count"] else 0
                        for data in [aggregated_data[ts] for ts in sorted(aggregated_data.keys())]]
     ) 
 
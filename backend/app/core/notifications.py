@@ -1,8 +1,9 @@
 import logging
+from abc import ABC, abstractmethod
 from datetime import datetime, timedelta
 import httpx
 from app.db.models import NotificationMethod, AlertFrequency, NotificationPreference, ServiceStats
-from typing import Optional
+from typing import Dict, Optional
 
 logger = logging.getLogger(__name__)
 
@@ -121,3 +122,83 @@ async def send_service_notification(
         return success
 
     return False
+
+async def send_alert(
+    preference: Optional[NotificationPreference],
+    title: str,
+    fields: Dict[str, str],
+    resolved: bool = False,
+) -> bool:
+    """Send an alert of a service, or its end, through its notification preference.
+
+    An end is only sent with notify_on_recovery; with the DAILY frequency a
+    new alert is only sent a day after the previous one. last_alert_time is
+    updated on success, the caller commits."""
+    if not preference or (resolved and not preference.notify_on_recovery):
+        return False
+    if not resolved and preference.alert_frequency == AlertFrequency.DAILY and preference.last_alert_time \
+            and datetime.utcnow() - preference.last_alert_time <= timedelta(days=1):
+        return False
+
+    blocks = [
+        {
+            "type": "header",
+            "text": {
+                "type": "plain_text",
+                "text": title
+            }
+        },
+        {
+            "type": "section",
+            "fields": [{"type": "mrkdwn", "text": f"*{name}:*\n{value}"} for name, value in fields.items()]
+        },
+        {
+            "type": "context",
+            "elements": [
+                {
+                    "type": "mrkdwn",
+                    "text": "Message delivered by: <https://pingmaster.fr/dashboard|PingMaster>"
+                }
+            ]
+        }
+    ]
+
+    if preference.notification_method == NotificationMethod.SLACK:
+        success = await send_slack_notification(preference.webhook_url, {"blocks": blocks})
+        if success:
+            preference.last_alert_time = datetime.utcnow()
+        return success
+    return False
+
+class Alerter(ABC):
+    """Base of the alerters run by the leader of the scheduler.
+
+    The ingest hooks (or the alerter itself) record state changes; `notify`
+    sends the pending ones with send_alert, from the leader only, so an
+    alert is sent once whatever process wrote the stats. `name` and
+    `interval_seconds` define its scheduler job."""
+
+    name = "alerts"
+    interval_seconds = 60
+
+    def __init__(self):
+        self.runs = 0
+        self.alerts_sent = 0
+        self.last_run: Optional[datetime] = None
+
+    async def run(self, db_session, now: Optional[datetime] = None) -> int:
+        """Send the pending alerts and commit; returns the number of alerts started."""
+        now = now or datetime.utcnow()
+        started = await self.notify(db_session, now)
+        db_session.commit()
+        self.runs += 1
+        self.alerts_sent += started
+        self.last_run = now
+        return started
+
+    @abstractmethod
+    async def notify(self, db_session, now: datetime) -> int:
+        """Send the alerts pending at `now`; returns how many were started."""
+
+    def stats(self) -> dict:
+        return {"runs": self.runs, "alerts_sent": self.alerts_sent, "last_run": self.last_run}
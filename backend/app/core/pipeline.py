@@ -0,0 +1,104 @@
+import asyncio
+import time
+from collections import deque
+from datetime import datetime
+from typing import Deque
+from sqlalchemy.orm import Session
+
+from app.core.timeouts import percentile
+from app.db.models import ProbeRateLimit
+
+# Configuration des constantes
+CHECKS_PER_SECOND = 100.0  # Débit global de démarrage des probes
+CHECKS_BURST = 100  # Probes pouvant démarrer d'un coup quand le seau est plein
+THROUGHPUT_WINDOW = 60  # Secondes prises en compte pour le débit
+LAG_SAMPLES = 1000  # Derniers retards conservés pour les percentiles
+RATE_LIMIT_NAME = "global"
+
+class TokenBucket:
+    """Global token bucket limiting how many probes start per second.
+
+    Tokens may go negative: each caller reserves the next token and sleeps
+    until it is due, so waiters are served in arrival order without a lock."""
+
+    def __init__(self, rate: float = CHECKS_PER_SECOND, burst: int = CHECKS_BURST):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self) -> None:
+        self._refill(time.monotonic())
+        self.tokens -= 1
+        if self.tokens < 0:
+            await asyncio.sleep(-self.tokens / self.rate)
+
+    def set_rate(self, rate: float, burst: int | None = None) -> None:
+        self._refill(time.monotonic())
+        self.rate = rate
+        if burst is not None:
+            self.burst = burst
+            self.tokens = min(self.tokens, burst)
+
+    def stats(self) -> dict:
+        return {"rate": self.rate, "burst": self.burst, "tokens": round(self.tokens, 2)}
+
+class PipelineMetrics:
+    """Throughput of completed checks and scheduler lag (probe start - due time)."""
+
+    def __init__(self):
+        self._completed: Deque[float] = deque()
+        self._lags: Deque[float] = deque(maxlen=LAG_SAMPLES)
+        self.total_completed = 0
+
+    def record_start(self, lag_seconds: float | None) -> None:
+        if lag_seconds is not None:
+            self._lags.append(max(lag_seconds, 0.0))
+
+    def record_completion(self, now: float | None = None) -> None:
+        now = now if now is not None else time.monotonic()
+        self._completed.append(now)
+        self.total_completed += 1
+        self._prune(now)
+
+    def _prune(self, now: float) -> None:
+        while self._completed and self._completed[0] < now - THROUGHPUT_WINDOW:
+            self._completed.popleft()
+
+    def stats(self) -> dict:
+        self._prune(time.monotonic())
+        lags = sorted(self._lags)
+        return {
+            "total_completed": self.total_completed,
+            "checks_per_second": round(len(self._completed) / THROUGHPUT_WINDOW, 2),
+            "lag_p50_seconds": round(percentile(lags, 50), 3) if lags else None,
+            "lag_p95_seconds": round(percentile(lags, 95), 3) if lags else None,
+            "lag_max_seconds": round(lags[-1], 3) if lags else None,
+        }
+
+def store_rate_limit(db: Session, rate: float, burst: int | None = None) -> ProbeRateLimit:
+    """Record the probe rate for every process that probes; the caller commits."""
+    limit = db.get(ProbeRateLimit, RATE_LIMIT_NAME)
+    if limit is None:
+        limit = ProbeRateLimit(name=RATE_LIMIT_NAME, burst=check_rate_limiter.burst)
+        db.add(limit)
+    limit.checks_per_second = rate
+    if burst is not None:
+        limit.burst = burst
+    limit.updated_at = datetime.utcnow()
+    return limit
+
+def load_rate_limit(db: Session, limiter: "TokenBucket | None" = None) -> None:
+    """Apply the probe rate recorded through the API, if it changed."""
+    limiter = limiter or check_rate_limiter
+    limit = db.get(ProbeRateLimit, RATE_LIMIT_NAME)
+    if limit is not None and (limit.checks_per_second, limit.burst) != (limiter.rate, limiter.burst):
+        limiter.set_rate(limit.checks_per_second, limit.burst)
+
+# Limiteur et métriques partagés par le moteur de probes
+check_rate_limiter = TokenBucket()
+pipeline_metrics = PipelineMetrics()
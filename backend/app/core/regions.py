@@ -0,0 +1,107 @@
+import gzip
+import json
+import zlib
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from sqlalchemy.orm import Session
+from app.db.models import Service, ServiceStats, RegionResult
+from app.core.config import settings
+from app.core.scheduling import service_interval
+
+# Configuration des constantes
+MAX_INGEST_RESULTS = 5000  # Résultats acceptés par lot
+MAX_INGEST_BYTES = 10 * 1024 * 1024  # Taille décompressée maximale d'un lot
+REGION_FRESHNESS_INTERVALS = 3  # Un résultat régional compte pendant 3 intervalles du service
+MIN_FRESHNESS_SECONDS = 60
+
+class BatchTooLarge(ValueError):
+    pass
+
+def decode_batch(body: bytes, content_encoding: Optional[str]) -> list:
+    """JSON list of results from a request body, gzip-compressed or not.
+
+    Decompression is bounded so a small compressed body cannot expand
+    into an arbitrary amount of memory."""
+    if content_encoding and content_encoding.lower() == "gzip":
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        body = decompressor.decompress(body, MAX_INGEST_BYTES + 1)
+        if len(body) > MAX_INGEST_BYTES or decompressor.unconsumed_tail:
+            raise BatchTooLarge(f"Batch larger than {MAX_INGEST_BYTES} bytes")
+    elif len(body) > MAX_INGEST_BYTES:
+        raise BatchTooLarge(f"Batch larger than {MAX_INGEST_BYTES} bytes")
+    results = json.loads(body)
+    if not isinstance(results, list):
+        raise ValueError("Batch must be a JSON list")
+    if len(results) > MAX_INGEST_RESULTS:
+        raise BatchTooLarge(f"Batch has more than {MAX_INGEST_RESULTS} results")
+    return results
+
+def encode_batch(results: List[dict]) -> bytes:
+    return gzip.compress(json.dumps(results, default=str).encode())
+
+def ingest_results(db: Session, region: str, results: List[dict]) -> int:
+    """Bulk-insert results pushed by an agent; results of unknown (deleted)
+    services are dropped. Returns the number of rows inserted."""
+    service_ids = list({result["service_id"] for result in results})
+    known = set()
+    for i in range(0, len(service_ids), 500):
+        known.update(
+            service_id for service_id, in db.query(Service.id).filter(Service.id.in_(service_ids[i:i + 500]))
+        )
+    received_at = datetime.utcnow()
+    rows = [
+        {**result, "region": region, "received_at": received_at}
+        for result in results
+        if result["service_id"] in known
+    ]
+    db.bulk_insert_mappings(RegionResult, rows)
+    db.commit()
+    return len(rows)
+
+def freshness(service: Service) -> timedelta:
+    return timedelta(seconds=max(service_interval(service) * REGION_FRESHNESS_INTERVALS, MIN_FRESHNESS_SECONDS))
+
+def latest_by_region(db: Session, service: Service, now: datetime | None = None) -> Dict[str, RegionResult]:
+    """Most recent fresh result of each agent region for a service."""
+    now = now or datetime.utcnow()
+    latest: Dict[str, RegionResult] = {}
+    rows = db.query(RegionResult)\
+        .filter(RegionResult.service_id == service.id, RegionResult.ping_date >= now - freshness(service))\
+        .order_by(RegionResult.ping_date.desc())
+    for row in rows:
+        latest.setdefault(row.region, row)
+    return latest
+
+def quorum_down(statuses: List[bool]) -> bool:
+    """A service is down when a strict majority of the regions see it down."""
+    return sum(1 for status in statuses if not status) * 2 > len(statuses)
+
+def quorum_is_down(db: Session, service: Service, local_status: bool, now: datetime | None = None) -> bool:
+    """Down status used for alerts: the local result alone when no agent
+    reported recently, the quorum of the local and agent results otherwise."""
+    remote = latest_by_region(db, service, now)
+    remote.pop(settings.PROBE_REGION, None)
+    if not remote:
+        return not local_status
+    return quorum_down([local_status] + [row.status for row in remote.values()])
+
+def region_status(db: Session, service: Service, now: datetime | None = None) -> dict:
+    """Per-region status of a service, the server's own checks included."""
+    now = now or datetime.utcnow()
+    regions = {
+        region: {"status": row.status, "response_time": row.response_time, "ping_date": row.ping_date}
+        for region, row in latest_by_region(db, service, now).items()
+    }
+    local = db.query(ServiceStats)\
+        .filter(ServiceStats.service_key == service.stats_key, ServiceStats.ping_date >= now - freshness(service))\
+        .order_by(ServiceStats.ping_date.desc())\
+        .first()
+    if local:
+        regions[settings.PROBE_REGION] = {"status": local.status, "response_time": local.response_time, "ping_date": local.ping_date}
+    statuses = [region["status"] for region in regions.values()]
+    return {
+        "regions": regions,
+        "regions_up": sum(statuses),
+        "regions_down": len(statuses) - sum(statuses),
+        "quorum_down": quorum_down(statuses) if statuses else None,
+    }
@@ -0,0 +1,276 @@
+import asyncio
+import logging
+import re
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import func, select, text, tuple_
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+from app.db.session import TIMESERIES_SCHEMA
+from app.db.models import Service, ServiceStats, StatsRollup, LatencyHistogram, RegionResult
+from app.core.config import settings
+from app.core.archive import ArchivedStat, append_to_archive, expire_archives, archive_stats
+from app.core.regions import freshness
+
+logger = logging.getLogger(__name__)
+
+# Configuration des constantes
+ROLLUP_RESOLUTIONS = {"minute": 60, "hour": 3600}  # Tiers de rollup et durée de leurs buckets
+RETENTION_TIERS = ("raw",) + tuple(ROLLUP_RESOLUTIONS)
+MIN_RAW_RETENTION = timedelta(days=1)  # Les graphes 1h et 24h lisent les stats brutes
+COMPACTION_INTERVAL_SECONDS = 600
+COMPACTION_CHUNK_ROWS = 2000  # Lignes supprimées par transaction : le verrou d'écriture est rendu entre deux lots
+COMPACTION_PAUSE_SECONDS = 0.05  # Pause entre deux lots pour laisser passer les écritures du monitor
+DURATION_UNITS = {"m": 60, "h": 3600, "d": 86400}
+
+def parse_retention(spec: str) -> Dict[str, Optional[timedelta]]:
+    """Retention of each tier from "raw=7d,minute=30d,hour=forever".
+
+    Durations are a number followed by m, h or d; "forever" (or a tier left
+    out) keeps the data indefinitely."""
+    retention: Dict[str, Optional[timedelta]] = {tier: None for tier in RETENTION_TIERS}
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        tier, _, value = entry.partition("=")
+        tier, value = tier.strip(), value.strip().lower()
+        if tier not in retention:
+            raise ValueError(f"Unknown retention tier: {tier}")
+        if value == "forever":
+            continue
+        match = re.fullmatch(r"(\d+)([mhd])", value)
+        if not match:
+            raise ValueError(f"Invalid retention for {tier}: {value}")
+        retention[tier] = timedelta(seconds=int(match.group(1)) * DURATION_UNITS[match.group(2)])
+    if retention["raw"] is not None and retention["raw"] < MIN_RAW_RETENTION:
+        raise ValueError(f"Raw stats must be kept at least {MIN_RAW_RETENTION}")
+    return retention
+
+def bucket_start(ping_date: datetime, resolution: int) -> datetime:
+    ping_date = ping_date.replace(tzinfo=None)
+    return ping_date - timedelta(
+        seconds=(ping_date.minute * 60 + ping_date.second) % resolution,
+        microseconds=ping_date.microsecond,
+    )
+
+def raw_cutoff(now: datetime | None = None, retention: Dict[str, Optional[timedelta]] | None = None) -> Optional[datetime]:
+    """Start of the raw stats window, aligned on a day: the hourly rollups
+    before it and the raw stats after it never overlap, and archives
+    receive whole days. None when raw stats are kept forever."""
+    retention = retention or parse_retention(settings.STATS_RETENTION)
+    if retention["raw"] is None:
+        return None
+    return ((now or datetime.utcnow()) - retention["raw"]).replace(hour=0, minute=0, second=0, microsecond=0)
+
+def update_rollups(db: Session, stats: List[ServiceStats]) -> None:
+    """Ingest hook: add a batch of new stats to their minute and hour rollups,
+    one upsert per bucket touched."""
+    buckets: Dict[Tuple[object, int, datetime], dict] = {}
+    for stat in stats:
+        ping_date = stat.ping_date or datetime.utcnow()
+        for resolution in ROLLUP_RESOLUTIONS.values():
+            key = (stat.service_key, resolution, bucket_start(ping_date, resolution))
+            row = buckets.setdefault(key, {
+                "up_count": 0, "down_count": 0,
+                "response_time_sum": 0.0, "response_time_count": 0,
+                "response_time_min": None, "response_time_max": None,
+            })
+            row["up_count" if stat.status else "down_count"] += 1
+            if stat.response_time is not None:
+                row["response_time_sum"] += stat.response_time
+                row["response_time_count"] += 1
+                if row["response_time_min"] is None or stat.response_time < row["response_time_min"]:
+                    row["response_time_min"] = stat.response_time
+                if row["response_time_max"] is None or stat.response_time > row["response_time_max"]:
+                    row["response_time_max"] = stat.response_time
+
+    table = StatsRollup.__table__
+    for (service_key, resolution, start), values in buckets.items():
+        statement = insert(table).values(service_key=service_key, resolution=resolution, bucket_start=start, **values)
+        excluded = statement.excluded
+        db.execute(statement.on_conflict_do_update(
+            index_elements=[table.c.service_key, table.c.resolution, table.c.bucket_start],
+            set_={
+                "up_count": table.c.up_count + excluded.up_count,
+                "down_count": table.c.down_count + excluded.down_count,
+                "response_time_sum": table.c.response_time_sum + excluded.response_time_sum,
+                "response_time_count": table.c.response_time_count + excluded.response_time_count,
+                # min()/max() de SQLite renvoient NULL dès qu'un argument est NULL
+                "response_time_min": func.min(
+                    func.coalesce(table.c.response_time_min, excluded.response_time_min),
+                    func.coalesce(excluded.response_time_min, table.c.response_time_min),
+                ),
+                "response_time_max": func.max(
+                    func.coalesce(table.c.response_time_max, excluded.response_time_max),
+                    func.coalesce(excluded.response_time_max, table.c.response_time_max),
+                ),
+            },
+        ))
+
+def delete_expired_stats(db: Session, service_id, service_key: int, cutoff: datetime) -> int:
+    chunk = select(ServiceStats.ping_date)\
+        .where(ServiceStats.service_key == service_key, ServiceStats.ping_date < cutoff)\
+        .order_by(ServiceStats.ping_date)\
+        .limit(COMPACTION_CHUNK_ROWS)
+    return db.query(ServiceStats)\
+        .filter(ServiceStats.service_key == service_key, ServiceStats.ping_date.in_(chunk))\
+        .delete(synchronize_session=False)
+
+async def archive_expired_stats(db: Session, service_id, service_key: int, cutoff: datetime) -> int:
+    """Move the oldest chunk of expired raw stats of a service to its archive.
+
+    The archive file is compressed and synced in a thread: the event loop
+    of the scheduler keeps running meanwhile."""
+    chunk = db.query(ServiceStats)\
+        .filter(ServiceStats.service_key == service_key, ServiceStats.ping_date < cutoff)\
+        .order_by(ServiceStats.ping_date)\
+        .limit(COMPACTION_CHUNK_ROWS)\
+        .all()
+    if not chunk:
+        return 0
+    await asyncio.to_thread(append_to_archive, service_id, [
+        ArchivedStat(stat.ping_date, stat.status, stat.response_time, stat.bytes_read)
+        for stat in chunk
+    ])
+    # Les lignes ne quittent la table qu'une fois l'archive écrite sur disque
+    return db.query(ServiceStats)\
+        .filter(ServiceStats.service_key == service_key, ServiceStats.ping_date <= chunk[-1].ping_date)\
+        .delete(synchronize_session=False)
+
+def delete_expired_rollups(db: Session, service_key: int, resolution: int, cutoff: datetime) -> int:
+    chunk = select(StatsRollup.bucket_start)\
+        .where(StatsRollup.service_key == service_key, StatsRollup.resolution == resolution, StatsRollup.bucket_start < cutoff)\
+        .limit(COMPACTION_CHUNK_ROWS)
+    return db.query(StatsRollup)\
+        .filter(StatsRollup.service_key == service_key, StatsRollup.resolution == resolution, StatsRollup.bucket_start.in_(chunk))\
+        .delete(synchronize_session=False)
+
+def delete_expired_histograms(db: Session, service_key: int, resolution: int, cutoff: datetime) -> int:
+    # Un bucket a une ligne par bande : le lot est choisi par clé primaire complète pour rester borné
+    chunk = select(LatencyHistogram.bucket_start, LatencyHistogram.band)\
+        .where(LatencyHistogram.service_key == service_key, LatencyHistogram.resolution == resolution, LatencyHistogram.bucket_start < cutoff)\
+        .limit(COMPACTION_CHUNK_ROWS)
+    return db.query(LatencyHistogram)\
+        .filter(
+            LatencyHistogram.service_key == service_key,
+            LatencyHistogram.resolution == resolution,
+            tuple_(LatencyHistogram.bucket_start, LatencyHistogram.band).in_(chunk),
+        )\
+        .delete(synchronize_session=False)
+
+def delete_expired_region_results(db: Session, service_id, cutoff: datetime) -> int:
+    chunk = select(RegionResult.id)\
+        .where(RegionResult.service_id == service_id, RegionResult.ping_date < cutoff)\
+        .order_by(RegionResult.ping_date)\
+        .limit(COMPACTION_CHUNK_ROWS)
+    return db.query(RegionResult)\
+        .filter(RegionResult.id.in_(chunk))\
+        .delete(synchronize_session=False)
+
+def freed_bytes(db: Session) -> int:
+    page_size = db.execute(text(f"PRAGMA {TIMESERIES_SCHEMA}.page_size")).scalar()
+    return db.execute(text(f"PRAGMA {TIMESERIES_SCHEMA}.freelist_count")).scalar() * page_size
+
+class StatsCompactor:
+    """Enforces the retention tiers of settings.STATS_RETENTION.
+
+    Expired raw stats and rollups are deleted service by service, through
+    their (service_key, date) primary keys, in transactions of at most
+    COMPACTION_CHUNK_ROWS rows with a short pause in between: the monitor
+    never waits long for the write lock. Raw stats are only deleted before
+    raw_cutoff(), the hourly rollups already hold their aggregates. With
+    settings.STATS_ARCHIVE_MONTHS, they are moved to the compressed monthly
+    archives of app.core.archive instead, and archives past that age are
+    removed. Results pushed by the regional agents are only read within
+    the quorum freshness window of their service and are deleted past it.
+
+    Reclaimed bytes are the pages given back to SQLite's free list (reused
+    by new rows, the file itself shrinks on the incremental vacuum of
+    app.core.maintenance) plus the size of the expired archive files."""
+
+    def __init__(self):
+        self.runs = 0
+        self.rows_deleted: Dict[str, int] = {tier: 0 for tier in RETENTION_TIERS}
+        self.histogram_rows_deleted = 0
+        self.region_rows_deleted = 0
+        self.bytes_reclaimed = 0
+        self.last_run: Optional[dict] = None
+
+    async def run(self, db: Session, now: datetime | None = None) -> dict:
+        now = now or datetime.utcnow()
+        retention = parse_retention(settings.STATS_RETENTION)
+        started = datetime.utcnow()
+        freed_before = freed_bytes(db)
+        services = db.query(
+            Service.id, Service.stats_key, Service.refresh_frequency, Service.interval_seconds, Service.effective_interval
+        ).all()
+
+        deleted = {tier: 0 for tier in RETENTION_TIERS}
+        histograms_deleted = 0
+        region_deleted = 0
+        cutoff = raw_cutoff(now, retention)
+        for service in services:
+            service_id, service_key = service.id, service.stats_key
+            if cutoff is not None:
+                # Avec l'archive, les stats brutes expirées sont déplacées dans les fichiers mensuels au lieu d'être perdues
+                delete_chunk = archive_expired_stats if settings.STATS_ARCHIVE_MONTHS else delete_expired_stats
+                deleted["raw"] += await self._drain(db, delete_chunk, service_id, service_key, cutoff)
+            for tier, resolution in ROLLUP_RESOLUTIONS.items():
+                if retention[tier] is not None:
+                    deleted[tier] += await self._drain(db, delete_expired_rollups, service_key, resolution, now - retention[tier])
+                    # Les histogrammes de latence suivent la rétention des rollups de même résolution
+                    histograms_deleted += await self._drain(db, delete_expired_histograms, service_key, resolution, now - retention[tier])
+            # Le quorum ne lit que les résultats régionaux de la fenêtre de fraîcheur
+            region_deleted += await self._drain(db, delete_expired_region_results, service_id, now - freshness(service))
+
+        archive_files, archive_bytes = (
+            await asyncio.to_thread(expire_archives, settings.STATS_ARCHIVE_MONTHS, now) if settings.STATS_ARCHIVE_MONTHS else (0, 0)
+        )
+        reclaimed = max(freed_bytes(db) - freed_before, 0) + archive_bytes
+        self.runs += 1
+        self.bytes_reclaimed += reclaimed
+        for tier, count in deleted.items():
+            self.rows_deleted[tier] += count
+        self.histogram_rows_deleted += histograms_deleted
+        self.region_rows_deleted += region_deleted
+        self.last_run = {
+            "ran_at": now,
+            "rows_deleted": deleted,
+            "histogram_rows_deleted": histograms_deleted,
+            "region_rows_deleted": region_deleted,
+            "rows_archived": deleted["raw"] if settings.STATS_ARCHIVE_MONTHS else 0,
+            "archive_files_deleted": archive_files,
+            "bytes_reclaimed": reclaimed,
+            "duration_seconds": round((datetime.utcnow() - started).total_seconds(), 3),
+        }
+        if any(deleted.values()) or histograms_deleted or region_deleted:
+            logger.info(f"Stats compaction deleted {deleted}, {histograms_deleted} histogram rows and {region_deleted} region results, {reclaimed} bytes reclaimed")
+        return self.last_run
+
+    async def _drain(self, db: Session, delete_chunk, *args) -> int:
+        """Run delete_chunk (a function or a coroutine function) in its own
+        transaction until it deletes less than a full chunk."""
+        deleted = 0
+        while True:
+            count = delete_chunk(db, *args)
+            if asyncio.iscoroutine(count):
+                count = await count
+            db.commit()
+            deleted += count
+            if count < COMPACTION_CHUNK_ROWS:
+                return deleted
+            await asyncio.sleep(COMPACTION_PAUSE_SECONDS)
+
+    def stats(self) -> dict:
+        return {
+            "policy": settings.STATS_RETENTION,
+            "archive_months": settings.STATS_ARCHIVE_MONTHS,
+            "archive": archive_stats(),
+            "runs": self.runs,
+            "rows_deleted": self.rows_deleted,
+            "histogram_rows_deleted": self.histogram_rows_deleted,
+            "region_rows_deleted": self.region_rows_deleted,
+            "bytes_reclaimed": self.bytes_reclaimed,
+            "last_run": self.last_run,
+        }
+
+# Compacteur des stats, lancé par le leader du scheduler
+stats_compactor = StatsCompactor()
@@ -0,0 +1,173 @@
+import logging
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+from sqlalchemy.orm import Session, joinedload
+from app.db.models import Service, ServiceStats, AlertRule, AlertRuleState, RuleKind, EPOCH
+from app.core.notifications import send_alert, Alerter
+
+logger = logging.getLogger(__name__)
+
+# Configuration des constantes
+MAX_RULES_PER_SERVICE = 20  # Borne le travail par ping, quel que soit le nombre de règles de l'utilisateur
+MAX_RULE_CHECKS = 32  # Taille maximale de la fenêtre en checks (bits de AlertRuleState.history)
+UPTIME_BUCKETS = 12  # Sous-fenêtres d'une règle uptime : la fenêtre glisse par 1/12e
+MIN_UPTIME_WINDOW_SECONDS = 300
+MAX_UPTIME_WINDOW_SECONDS = 7 * 86400
+UPTIME_MIN_CHECKS = 3  # Pas d'alerte uptime sur moins de checks
+RULE_ALERT_SECONDS = 30  # Fréquence d'envoi des changements d'état
+
+class CountEvaluator(NamedTuple):
+    """Fires when at least `matches` of the last `checks` stats match."""
+    matches_stat: Callable[[ServiceStats], bool]
+    matches: int
+    checks: int
+
+    def update(self, state: AlertRuleState, stat: ServiceStats) -> Optional[bool]:
+        state.history = ((state.history << 1) | int(self.matches_stat(stat))) & ((1 << self.checks) - 1)
+        state.seen = min(state.seen + 1, self.checks)
+        state.value = bin(state.history).count("1")
+        return state.value >= self.matches
+
+class UptimeEvaluator(NamedTuple):
+    """Fires when the share of up stats over the window falls under the
+    threshold; the window slides by 1/UPTIME_BUCKETS of its length."""
+    window_ms: int
+    threshold: float
+
+    def update(self, state: AlertRuleState, stat: ServiceStats) -> Optional[bool]:
+        ping_ms = ((stat.ping_date or datetime.utcnow()) - EPOCH) // timedelta(milliseconds=1)
+        width = self.window_ms // UPTIME_BUCKETS
+        start = ping_ms - ping_ms % width
+        buckets = [bucket for bucket in state.buckets or [] if bucket[0] > ping_ms - self.window_ms]
+        if buckets and buckets[-1][0] == start:
+            buckets[-1] = [start, buckets[-1][1] + int(bool(stat.status)), buckets[-1][2] + 1]
+        elif not buckets or buckets[-1][0] < start:
+            buckets.append([start, int(bool(stat.status)), 1])
+        else:
+            return None  # Stat plus ancienne que la sous-fenêtre en cours, arrivée en retard
+        state.buckets = buckets  # Nouvelle liste : le JSON est marqué modifié
+        up, checks = sum(bucket[1] for bucket in buckets), sum(bucket[2] for bucket in buckets)
+        state.value = round(up / checks * 100, 3)
+        if checks < UPTIME_MIN_CHECKS:
+            return None
+        return state.value < self.threshold
+
+def slower_than(threshold_ms: float) -> Callable[[ServiceStats], bool]:
+    return lambda stat: stat.response_time is not None and stat.response_time > threshold_ms
+
+def status_class_is(status_class: int) -> Callable[[ServiceStats], bool]:
+    return lambda stat: stat.status_code is not None and stat.status_code // 100 == status_class
+
+@lru_cache(maxsize=1024)
+def compile_rule(kind: str, threshold: Optional[float], status_class: Optional[int], matches: int,
+                 checks: int, window_seconds: Optional[int]):
+    """Evaluator of a rule; rules with the same definition share one."""
+    if kind == RuleKind.LATENCY:
+        return CountEvaluator(slower_than(threshold), matches, checks)
+    if kind == RuleKind.STATUS_CODE:
+        return CountEvaluator(status_class_is(status_class), matches, checks)
+    if kind == RuleKind.UPTIME:
+        return UptimeEvaluator(window_seconds * 1000, threshold)
+    raise ValueError(f"Unknown rule kind: {kind}")
+
+def evaluator_of(rule: AlertRule):
+    return compile_rule(rule.kind, rule.threshold, rule.status_class, rule.matches, rule.checks, rule.window_seconds)
+
+def describe(rule: AlertRule) -> str:
+    if rule.kind == RuleKind.LATENCY:
+        return f"response time > {rule.threshold:g} ms for {rule.matches} of {rule.checks} checks"
+    if rule.kind == RuleKind.STATUS_CODE:
+        return f"status code {rule.status_class}xx for {rule.matches} of {rule.checks} checks"
+    return f"uptime over {timedelta(seconds=rule.window_seconds)} < {rule.threshold:g}%"
+
+def evaluate_rules(db: Session, stats: List[ServiceStats]) -> None:
+    """Ingest hook: feed each new stat to the rules of its service.
+
+    The rules and their state are read once per batch; each stat then costs
+    one update of fixed size per rule of its service, never a read of the
+    history."""
+    by_key: Dict[int, List[ServiceStats]] = {}
+    for stat in stats:
+        by_key.setdefault(stat.service_key, []).append(stat)
+    keys = list(by_key)
+    rules: Dict[int, List[AlertRule]] = {}
+    for i in range(0, len(keys), 500):
+        for service_key, rule in db.query(Service.stats_key, AlertRule)\
+                .join(AlertRule, AlertRule.service_id == Service.id)\
+                .filter(Service.stats_key.in_(keys[i:i + 500])):
+            rules.setdefault(service_key, []).append(rule)
+    if not rules:
+        return
+    rule_ids = [rule.id for service_rules in rules.values() for rule in service_rules]
+    states: Dict[int, AlertRuleState] = {}
+    for i in range(0, len(rule_ids), 500):
+        states.update(
+            (state.rule_id, state)
+            for state in db.query(AlertRuleState).filter(AlertRuleState.rule_id.in_(rule_ids[i:i + 500]))
+        )
+
+    created = False
+    for key, service_rules in rules.items():
+        evaluators: List[Tuple[object, AlertRuleState]] = []
+        for rule in service_rules:
+            state = states.get(rule.id)
+            if state is None:
+                state = AlertRuleState(rule_id=rule.id, history=0, seen=0, firing=False, notified=True)
+                db.add(state)
+                created = True
+            evaluators.append((evaluator_of(rule), state))
+        for stat in sorted(by_key[key], key=lambda stat: stat.ping_date or datetime.utcnow()):
+            for evaluator, state in evaluators:
+                firing = evaluator.update(state, stat)
+                if firing is not None and firing != state.firing:
+                    state.firing = firing
+                    state.changed_at = stat.ping_date or datetime.utcnow()
+                    # Un retour à la normale avant l'envoi de l'alerte annule les deux
+                    state.notified = not state.notified
+    if created:
+        db.flush()  # Le lot suivant de la même transaction retrouve les nouveaux états
+
+def delete_rule_data(db: Session, rule_ids: List[int]) -> None:
+    db.query(AlertRuleState).filter(AlertRuleState.rule_id.in_(rule_ids)).delete(synchronize_session=False)
+    db.query(AlertRule).filter(AlertRule.id.in_(rule_ids)).delete(synchronize_session=False)
+
+class RuleAlerter(Alerter):
+    """Sends the rules that started or stopped firing at ingest."""
+
+    name = "rule_alerts"
+    interval_seconds = RULE_ALERT_SECONDS
+
+    async def notify(self, db: Session, now: datetime) -> int:
+        """Send the pending state changes; returns the number of rules that started firing."""
+        pending = db.query(AlertRuleState).filter(AlertRuleState.notified.is_(False)).all()
+        rules = {
+            rule.id: rule
+            for rule in db.query(AlertRule)
+                .options(joinedload(AlertRule.service).joinedload(Service.notification_preferences))
+                .filter(AlertRule.id.in_([state.rule_id for state in pending]))
+        }
+        sent = 0
+        for state in pending:
+            rule = rules.get(state.rule_id)
+            if rule is not None:
+                delivered = await send_alert(
+                    rule.service.notification_preferences,
+                    "🚨 Alert rule triggered" if state.firing else "🟢 Alert rule resolved",
+                    {
+                        "Service Name": rule.service.name,
+                        "Rule": describe(rule),
+                        "Current value": f"{state.value if state.value is not None else '-'}",
+                    },
+                    resolved=not state.firing,
+                )
+                if delivered and state.firing:
+                    sent += 1
+            state.notified = True
+        return sent
+
+    def stats(self) -> dict:
+        return {**super().stats(), "compiled_rules": compile_rule.cache_info().currsize}
+
+# Alertes des règles de seuil, envoyées par le leader du scheduler
+rule_alerter = RuleAlerter()
@@ -1,38 +1,257 @@
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
-from app.core.monitor import check_services
+from apscheduler.triggers.interval import IntervalTrigger
+from app.core.monitor import dispatch_due_checks, check_schedule, in_flight_services
 from app.core.daily_report import generate_daily_report
+from app.core.leader import leader_election, RENEW_SECONDS
+from app.core.workers import record_heartbeat, WORKER_HEARTBEAT_SECONDS
+from app.core.metrics import process_metrics
+from app.core.heartbeats import scan_missed_heartbeats, HEARTBEAT_SCAN_SECONDS
+from app.core.retention import stats_compactor, COMPACTION_INTERVAL_SECONDS
+from app.core.notifications import Alerter
+from app.core.slo import slo_alerter
+from app.core.anomalies import latency_alerter
+from app.core.rules import rule_alerter
+from app.core.maintenance import (
+    database_maintenance, CONFIG_SCHEMA, CONFIG_CHECKPOINT_SECONDS,
+    TIMESERIES_CHECKPOINT_SECONDS, TIMESERIES_VACUUM_SECONDS,
+)
+from app.db.session import TIMESERIES_SCHEMA
+from app.core.config import settings
 from app.db.session import SessionLocal
+import asyncio
 import logging
+from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+MONITORING_TICK_SECONDS = 1  # Résolution du scheduler : chaque service est vérifié à sa phase
+
 scheduler = AsyncIOScheduler()
+monitoring_lock = asyncio.Lock()
+
+async def leadership_job():
+    """Job that takes or renews the scheduler lease; only the leader runs the other jobs"""
+    db = SessionLocal()
+    try:
+        was_leader = leader_election.is_leader()
+        if leader_election.renew(db) and not was_leader and not settings.PROBE_SHARDING:
+            # Le planning en mémoire date d'un éventuel mandat précédent
+            check_schedule.clear()
+    finally:
+        db.close()
+
+async def heartbeat_job(role: str):
+    """Job that records the health of this process for the API and the other workers"""
+    db = SessionLocal()
+    try:
+        record_heartbeat(
+            db,
+            leader_election.holder_id,
+            role,
+            leader_election.is_leader(),
+            in_flight_checks=len(in_flight_services),
+            dispatched_checks=check_schedule.dispatched,
+            metrics=process_metrics(),
+        )
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error recording worker heartbeat: {str(e)}")
+    finally:
+        db.close()
 
 async def monitoring_job():
-    """Job that runs every minute to check services"""
+    """Job that runs every second to start the checks whose slot has come"""
+    if not (settings.PROBE_SHARDING or leader_election.is_leader()):
+        # Sans sharding, seul le leader vérifie les services
+        return
+    if monitoring_lock.locked():
+        # Le passage précédent est encore en cours, les services dus seront pris au suivant
+        return
+    async with monitoring_lock:
+        try:
+            db = SessionLocal()
+            dispatched = await dispatch_due_checks(db)
+            logger.debug(f"Monitoring job dispatched {dispatched} checks")
+        except Exception as e:
+            logger.error(f"Error in monitoring job: {str(e)}")
+        finally:
+            db.close()
+
+async def missed_heartbeats_job():
+    """Job that flags the heartbeat services past their deadline (leader only)"""
+    if not leader_election.is_leader():
+        return
+    db = SessionLocal()
+    try:
+        await scan_missed_heartbeats(db)
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error scanning heartbeats: {str(e)}")
+    finally:
+        db.close()
+
+async def compaction_job():
+    """Job that enforces the stats retention tiers (leader only)"""
+    if not leader_election.is_leader():
+        return
+    db = SessionLocal()
+    try:
+        await stats_compactor.run(db)
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error compacting stats: {str(e)}")
+    finally:
+        db.close()
+
+async def alerts_job(alerter: Alerter):
+    """Job that sends the pending alerts of one alerter (leader only)"""
+    if not leader_election.is_leader():
+        return
+    db = SessionLocal()
+    try:
+        await alerter.run(db)
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error sending {alerter.name}: {str(e)}")
+    finally:
+        db.close()
+
+async def checkpoint_job(schema: str):
+    """Job that truncates the WAL of one database (leader only)"""
+    if not leader_election.is_leader():
+        return
+    db = SessionLocal()
+    try:
+        database_maintenance.checkpoint(db, schema)
+    except Exception as e:
+        logger.error(f"Error checkpointing {schema}: {str(e)}")
+    finally:
+        db.close()
+
+async def vacuum_job(schema: str):
+    """Job that vacuums one database (leader only)"""
+    if not leader_election.is_leader():
+        return
+    db = SessionLocal()
     try:
-        db = SessionLocal()
-        await check_services(db)
-        logger.info("Monitoring job completed successfully")
+        if schema == TIMESERIES_SCHEMA:
+            database_maintenance.vacuum_timeseries(db)
+        else:
+            database_maintenance.vacuum_config(db)
     except Exception as e:
-        logger.error(f"Error in monitoring job: {str(e)}")
+        db.rollback()
+        logger.error(f"Error vacuuming {schema}: {str(e)}")
     finally:
         db.close()
 
-def init_scheduler():
-    """Initialize the scheduler with all jobs"""
+async def daily_report_job():
+    """Send the daily report from the leader only"""
+    if leader_election.is_leader():
+        await generate_daily_report()
+
+def init_scheduler(role: str = "api"):
+    """Initialize the scheduler with all jobs
+
+    role is recorded in the worker heartbeat: "api" when the scheduler runs
+    inside the API process, "worker" for python -m app.worker."""
     try:
-        # Ajoute la tâche de monitoring pour s'exécuter chaque minute
+        # Élection du process qui exécute les jobs (un seul parmi les workers / instances)
+        scheduler.add_job(
+            leadership_job,
+            IntervalTrigger(seconds=RENEW_SECONDS),
+            id='leadership_job',
+            name='Scheduler leader election',
+            next_run_time=datetime.now(),
+            coalesce=True,
+            replace_existing=True
+        )
+        scheduler.add_job(
+            heartbeat_job,
+            IntervalTrigger(seconds=WORKER_HEARTBEAT_SECONDS),
+            args=[role],
+            id='heartbeat_job',
+            name='Worker heartbeat',
+            next_run_time=datetime.now(),
+            coalesce=True,
+            replace_existing=True
+        )
+        # Ajoute la tâche de monitoring pour s'exécuter chaque seconde
         scheduler.add_job(
             monitoring_job,
-            CronTrigger(minute='*'),  # Toutes les minutes
+            IntervalTrigger(seconds=MONITORING_TICK_SECONDS),
             id='monitoring_job',
             name='Check all services status',
+            max_instances=2,  # Le verrou de monitoring_job écarte les passages qui se chevauchent
+            coalesce=True,
+            replace_existing=True
+        )
+        scheduler.add_job(
+            missed_heartbeats_job,
+            IntervalTrigger(seconds=HEARTBEAT_SCAN_SECONDS),
+            id='missed_heartbeats_job',
+            name='Flag missed heartbeats',
+            coalesce=True,
             replace_existing=True
         )
         scheduler.add_job(
-            generate_daily_report,
+            compaction_job,
+            IntervalTrigger(seconds=COMPACTION_INTERVAL_SECONDS),
+            id='compaction_job',
+            name='Enforce stats retention',
+            coalesce=True,
+            replace_existing=True
+        )
+        # Alertes SLO, de latence et des règles : un job par alerteur
+        for alerter in (slo_alerter, latency_alerter, rule_alerter):
+            scheduler.add_job(
+                alerts_job,
+                IntervalTrigger(seconds=alerter.interval_seconds),
+                args=[alerter],
+                id=f'{alerter.name}_job',
+                name=f'Send {alerter.name.replace("_", " ")}',
+                coalesce=True,
+                replace_existing=True
+            )
+        # Les deux bases ont leurs propres checkpoints et vacuums
+        scheduler.add_job(
+            checkpoint_job,
+            IntervalTrigger(seconds=TIMESERIES_CHECKPOINT_SECONDS),
+            args=[TIMESERIES_SCHEMA],
+            id='timeseries_checkpoint_job',
+            name='Checkpoint the time-series WAL',
+            coalesce=True,
+            replace_existing=True
+        )
+        scheduler.add_job(
+            checkpoint_job,
+            IntervalTrigger(seconds=CONFIG_CHECKPOINT_SECONDS),
+            args=[CONFIG_SCHEMA],
+            id='config_checkpoint_job',
+            name='Checkpoint the configuration WAL',
+            coalesce=True,
+            replace_existing=True
+        )
+        scheduler.add_job(
+            vacuum_job,
+            IntervalTrigger(seconds=TIMESERIES_VACUUM_SECONDS),
+            args=[TIMESERIES_SCHEMA],
+            id='timeseries_vacuum_job',
+            name='Incremental vacuum of the time-series database',
+            coalesce=True,
+            replace_existing=True
+        )
+        scheduler.add_job(
+            vacuum_job,
+            CronTrigger(hour=4, minute=17),
+            args=[CONFIG_SCHEMA],
+            id='config_vacuum_job',
+            name='Vacuum the configuration database',
+            coalesce=True,
+            replace_existing=True
+        )
+        scheduler.add_job(
+            daily_report_job,
             CronTrigger(hour=7, minute=1),
             id='daily_report',
             replace_existing=True,
@@ -43,4 +262,13 @@ def init_scheduler():
         logger.info("Scheduler started successfully")
     except Exception as e:
         logger.error(f"Failed to initialize scheduler: {str(e)}")
-        raise
\ No newline at end of file
+        raise
+
+def shutdown_scheduler():
+    """Stop the jobs and hand the lease over to another process"""
+    scheduler.shutdown()
+    db = SessionLocal()
+    try:
+        leader_election.release(db)
+    finally:
+        db.close()
@@ -0,0 +1,247 @@
+import heapq
+import math
+import time
+import zlib
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+
+# Configuration des constantes
+FREQUENCY_SECONDS = {
+    "10 seconds": 10,
+    "30 seconds": 30,
+    "1 minute": 60,
+    "5 minutes": 300,
+    "10 minutes": 600,
+    "15 minutes": 900,
+    "1 hour": 3600,
+}
+DEFAULT_FREQUENCY_SECONDS = 3600
+MIN_INTERVAL_SECONDS = 10
+MAX_INTERVAL_SECONDS = 86400
+SCHEDULE_RELOAD_SECONDS = 10  # Fréquence de synchronisation du planning avec la base
+MIN_SPACING_RATIO = 0.75  # Écart minimum entre deux checks, en fraction de l'intervalle
+LOAD_HISTORY_SECONDS = 300  # Historique des démarrages de probes conservé
+
+EPOCH = datetime(1970, 1, 1)
+
+def frequency_seconds(refresh_frequency: str) -> int:
+    return FREQUENCY_SECONDS.get(refresh_frequency, DEFAULT_FREQUENCY_SECONDS)
+
+def base_interval(service) -> int:
+    """Interval chosen by the user, in seconds; rows created before
+    interval_seconds existed fall back on their refresh_frequency."""
+    return service.interval_seconds or frequency_seconds(service.refresh_frequency)
+
+def service_interval(service) -> int:
+    """Interval the service is checked at: its adaptive effective interval
+    (incident or backoff) when set, its base interval otherwise."""
+    return service.effective_interval or base_interval(service)
+
+def resolve_interval(refresh_frequency: Optional[str], interval_seconds: Optional[int]) -> Tuple[str, int]:
+    """(refresh_frequency, interval_seconds) to store: an explicit interval wins and
+    maps back to its named frequency when there is one, "custom" otherwise."""
+    if interval_seconds is None:
+        return refresh_frequency, frequency_seconds(refresh_frequency)
+    for name, seconds in FREQUENCY_SECONDS.items():
+        if seconds == interval_seconds:
+            return name, interval_seconds
+    return "custom", interval_seconds
+
+def phase_offset(service_id, interval_seconds: int) -> int:
+    """Stable offset of a service inside its interval, hashed from its id.
+
+    crc32 rather than hash(): it must not change between processes."""
+    return zlib.crc32(str(service_id).encode()) % interval_seconds
+
+def slot_index(moment: datetime, interval_seconds: int, phase: int) -> int:
+    """Index of the phase-aligned slot containing `moment`."""
+    return math.floor(((moment - EPOCH).total_seconds() - phase) / interval_seconds)
+
+def slot_start(moment: datetime, interval_seconds: int, phase: int) -> datetime:
+    """Start of the phase-aligned slot containing `moment`."""
+    return EPOCH + timedelta(seconds=slot_index(moment, interval_seconds, phase) * interval_seconds + phase)
+
+def due_time(last_check: datetime, current_time: datetime, interval_seconds: int, phase: int) -> datetime:
+    """When a check that is due at `current_time` became due."""
+    earliest = last_check + timedelta(seconds=interval_seconds * MIN_SPACING_RATIO)
+    return max(slot_start(current_time, interval_seconds, phase), earliest)
+
+def is_due(last_check: datetime, current_time: datetime, interval_seconds: int, phase: int) -> bool:
+    """A check is due once a new aligned slot has started since the last one.
+
+    The minimum spacing prevents a late check from being followed by another
+    one right after, at the start of the next slot."""
+    elapsed = (current_time - last_check).total_seconds()
+    if elapsed < interval_seconds * MIN_SPACING_RATIO:
+        return False
+    return slot_index(current_time, interval_seconds, phase) > slot_index(last_check, interval_seconds, phase)
+
+def to_epoch(moment: datetime) -> float:
+    return (moment - EPOCH).total_seconds()
+
+def next_slot_after(timestamp: float, interval_seconds: int, phase: int) -> float:
+    """Epoch start of the first phase-aligned slot strictly after timestamp."""
+    return phase + (math.floor((timestamp - phase) / interval_seconds) + 1) * interval_seconds
+
+def evenness(counts: List[float]) -> dict:
+    """Summary of a per-second load histogram: a perfectly flat load has
+    peak_to_mean == 1 and cv == 0."""
+    if not counts or not any(counts):
+        return {"seconds": len(counts), "mean": 0, "max": 0, "peak_to_mean": 0, "cv": 0}
+    mean = sum(counts) / len(counts)
+    variance = sum((count - mean) ** 2 for count in counts) / len(counts)
+    return {
+        "seconds": len(counts),
+        "mean": round(mean, 3),
+        "max": round(max(counts), 3),
+        "peak_to_mean": round(max(counts) / mean, 3),
+        "cv": round(math.sqrt(variance) / mean, 3),
+    }
+
+def expected_load(schedule: Iterable[Tuple[object, int]], window_seconds: int) -> List[float]:
+    """Expected checks per second over a window, from (service_id, interval) pairs.
+
+    A service checked every `interval` seconds lands on second
+    (phase + k * interval) % window; intervals longer than the window
+    contribute window / interval checks at a single second."""
+    counts = [0.0] * window_seconds
+    for service_id, interval in schedule:
+        phase = phase_offset(service_id, interval)
+        if interval >= window_seconds:
+            counts[phase % window_seconds] += window_seconds / interval
+        else:
+            for second in range(phase % interval, window_seconds, interval):
+                counts[second] += 1
+    return counts
+
+class LoadRecorder:
+    """Counts probe starts per wall-clock second over the last few minutes."""
+
+    def __init__(self, history_seconds: int = LOAD_HISTORY_SECONDS):
+        self.history_seconds = history_seconds
+        self._counts: Deque[List[int]] = deque()
+
+    def record(self, now: float | None = None) -> None:
+        second = int(now if now is not None else time.time())
+        if self._counts and self._counts[-1][0] == second:
+            self._counts[-1][1] += 1
+        else:
+            self._counts.append([second, 1])
+        while self._counts and self._counts[0][0] <= second - self.history_seconds:
+            self._counts.popleft()
+
+    def per_second(self, now: float | None = None) -> List[int]:
+        """Starts for each of the last history_seconds seconds, idle seconds included."""
+        end = int(now if now is not None else time.time())
+        by_second: Dict[int, int] = {second: count for second, count in self._counts}
+        return [by_second.get(second, 0) for second in range(end - self.history_seconds + 1, end + 1)]
+
+    def stats(self) -> dict:
+        return evenness(self.per_second())
+
+class CheckSchedule:
+    """In-memory min-heap of the next check time of every service.
+
+    A tick only pops the entries that are due, so its cost depends on the
+    number of due checks, not on the number of services. A service that
+    missed several slots (stall, restart) is checked once and moved to its
+    next slot after now: missed slots are coalesced, never replayed."""
+
+    def __init__(self):
+        self._heap: List[Tuple[float, int, object]] = []
+        self._entries: Dict[object, Tuple[int, int, int]] = {}  # id -> (interval, phase, version)
+        self._version = 0
+        self.synced_at: Optional[float] = None
+        self.dispatched = 0
+        self.coalesced_slots = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        """Forget every service; the next sync rebuilds the schedule from the last pings."""
+        self._heap = []
+        self._entries = {}
+        self.synced_at = None
+
+    def needs_sync(self, now: float) -> bool:
+        return self.synced_at is None or now - self.synced_at >= SCHEDULE_RELOAD_SECONDS
+
+    def known(self, service_id) -> bool:
+        return service_id in self._entries
+
+    def interval_of(self, service_id) -> Optional[int]:
+        entry = self._entries.get(service_id)
+        return entry[0] if entry else None
+
+    def slot_of(self, service_id) -> Optional[Tuple[int, int]]:
+        """(interval, phase) the service is scheduled with."""
+        entry = self._entries.get(service_id)
+        return entry[:2] if entry else None
+
+    def sync(
+        self,
+        intervals: Dict[object, int],
+        last_checks: Dict[object, Optional[datetime]],
+        now: float,
+        phases: Optional[Dict[object, int]] = None,
+    ) -> None:
+        """Align the schedule on the services in the database.
+
+        `last_checks` only needs the services that are new or whose slot
+        changed; unknown services without a previous check are due now.
+        `phases` defaults to the phase hashed from each service id."""
+        for service_id in list(self._entries):
+            if service_id not in intervals:
+                del self._entries[service_id]  # Les entrées du tas sont ignorées au pop
+        for service_id, interval in intervals.items():
+            phase = phases[service_id] if phases else phase_offset(service_id, interval)
+            if self.slot_of(service_id) == (interval, phase):
+                continue
+            last_check = last_checks.get(service_id)
+            if last_check is None:
+                due = now
+            else:
+                last = to_epoch(last_check)
+                due = max(next_slot_after(last, interval, phase), last + interval * MIN_SPACING_RATIO)
+            self._push(service_id, interval, phase, due)
+        if len(self._heap) > 2 * len(self._entries) + 1000:
+            # Purge des entrées obsolètes (services supprimés ou replanifiés)
+            self._heap = [item for item in self._heap if self._entries.get(item[2], (0, 0, None))[2] == item[1]]
+            heapq.heapify(self._heap)
+        self.synced_at = now
+
+    def _push(self, service_id, interval: int, phase: int, due: float) -> None:
+        self._version += 1
+        self._entries[service_id] = (interval, phase, self._version)
+        heapq.heappush(self._heap, (due, self._version, service_id))
+
+    def pop_due(self, now: float) -> List[Tuple[object, float]]:
+        """Pop every due service, reschedule it and return (service_id, due_at)."""
+        due_services = []
+        while self._heap and self._heap[0][0] <= now:
+            due, version, service_id = heapq.heappop(self._heap)
+            entry = self._entries.get(service_id)
+            if entry is None or entry[2] != version:
+                continue
+            interval, phase, _ = entry
+            self.coalesced_slots += max(int((now - due) // interval), 0)
+            next_due = max(next_slot_after(now, interval, phase), now + interval * MIN_SPACING_RATIO)
+            self._push(service_id, interval, phase, next_due)
+            due_services.append((service_id, due))
+        self.dispatched += len(due_services)
+        return due_services
+
+    def stats(self, now: float | None = None) -> dict:
+        now = now if now is not None else time.time()
+        return {
+            "scheduled_services": len(self._entries),
+            "heap_size": len(self._heap),
+            "next_due_in_seconds": round(self._heap[0][0] - now, 3) if self._heap else None,
+            "dispatched": self.dispatched,
+            "coalesced_slots": self.coalesced_slots,
+        }
+
+# Démarrages de probes observés dans ce process
+probe_starts = LoadRecorder()
@@ -0,0 +1,111 @@
+import bisect
+import hashlib
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+from app.db.models import Service
+from app.core.scheduling import MIN_SPACING_RATIO, SCHEDULE_RELOAD_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Configuration des constantes
+SHARD_VNODES = 64  # Points par worker sur l'anneau : répartition homogène des services
+REBALANCE_GRACE_SECONDS = 2 * SCHEDULE_RELOAD_SECONDS  # Un worker garde ses anciens services le temps que les autres voient le changement
+
+def ring_hash(key: str) -> int:
+    # md5 plutôt que hash() : l'anneau doit être identique dans tous les process
+    return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], "big")
+
+class HashRing:
+    """Consistent hashing of services onto workers.
+
+    When a worker joins or leaves, only the services of the arcs it takes
+    or gives back change owner (about 1/N of them)."""
+
+    def __init__(self, nodes: Iterable[str], vnodes: int = SHARD_VNODES):
+        self.nodes = sorted(set(nodes))
+        self._ring = sorted((ring_hash(f"{node}#{i}"), node) for node in self.nodes for i in range(vnodes))
+        self._hashes = [point for point, _ in self._ring]
+
+    def owner(self, key) -> Optional[str]:
+        if not self._ring:
+            return None
+        index = bisect.bisect(self._hashes, ring_hash(str(key))) % len(self._ring)
+        return self._ring[index][1]
+
+class ShardMembership:
+    """Shard of this worker, from the live workers seen in the heartbeats.
+
+    Workers notice a join or a leave at different times. To never leave a
+    service without owner meanwhile, a worker keeps checking the services of
+    its previous shard for REBALANCE_GRACE_SECONDS after a change; the
+    per-slot claim in the database (claim_checks) makes sure only one of the
+    two owners actually probes it."""
+
+    def __init__(self, worker_id: str):
+        self.worker_id = worker_id
+        self.ring = HashRing([worker_id])
+        self._previous: Optional[HashRing] = None
+        self._grace_until = 0.0
+        self.rebalances = 0
+
+    def update(self, worker_ids: Iterable[str], now: float) -> bool:
+        """Rebuild the ring if the members changed; returns True on a rebalance."""
+        members = sorted(set(worker_ids) | {self.worker_id})
+        if members == self.ring.nodes:
+            return False
+        logger.info(f"Rebalancing probe shards over {len(members)} workers")
+        self._previous = self.ring
+        self._grace_until = now + REBALANCE_GRACE_SECONDS
+        self.ring = HashRing(members)
+        self.rebalances += 1
+        return True
+
+    def owns(self, key, now: float) -> bool:
+        if self.ring.owner(key) == self.worker_id:
+            return True
+        return self._previous is not None and now < self._grace_until and self._previous.owner(key) == self.worker_id
+
+    def stats(self) -> dict:
+        return {
+            "worker_id": self.worker_id,
+            "workers": self.ring.nodes,
+            "rebalances": self.rebalances,
+        }
+
+def claim_checks(
+    db: Session,
+    worker_id: str,
+    due: List[Tuple[object, float]],
+    intervals: Dict[object, int],
+    now: datetime,
+) -> List[Tuple[object, float]]:
+    """Claim due checks in the database, at most once per slot and service.
+
+    A claim only succeeds if the previous one is older than the minimum
+    spacing between two checks: when two workers own a service during a
+    rebalance, the first one to claim the slot probes it, the other skips it."""
+    by_interval: Dict[int, List[object]] = {}
+    for service_id, _ in due:
+        by_interval.setdefault(intervals[service_id], []).append(service_id)
+
+    for interval, service_ids in by_interval.items():
+        threshold = now - timedelta(seconds=interval * MIN_SPACING_RATIO)
+        for i in range(0, len(service_ids), 500):
+            db.query(Service)\
+                .filter(Service.id.in_(service_ids[i:i + 500]))\
+                .filter(or_(Service.claimed_at.is_(None), Service.claimed_at <= threshold))\
+                .update({"claimed_at": now, "claimed_by": worker_id}, synchronize_session=False)
+    db.commit()
+
+    claimed = set()
+    service_ids = [service_id for service_id, _ in due]
+    for i in range(0, len(service_ids), 500):
+        claimed.update(
+            service_id for service_id, in db.query(Service.id)
+            .filter(Service.id.in_(service_ids[i:i + 500]))
+            .filter(Service.claimed_by == worker_id, Service.claimed_at == now)
+        )
+    return [(service_id, due_at) for service_id, due_at in due if service_id in claimed]
@@ -0,0 +1,83 @@
+from datetime import datetime
+from typing import Dict, List, Tuple
+from urllib.parse import urlsplit, urlunsplit
+
+from app.db.models import ProbeMethod
+from app.core.scheduling import service_interval
+
+# Configuration des constantes
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+def normalize_url(url: str) -> str:
+    """Canonical form of a probed URL: scheme and host lowercased, default port,
+    fragment and trailing "?" dropped, empty path as "/". The query string and
+    credentials are kept as is, they can change what the server answers."""
+    parts = urlsplit(str(url).strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if ":" in host:
+        host = f"[{host}]"  # IPv6
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    if parts.username is not None:
+        userinfo = parts.username if parts.password is None else f"{parts.username}:{parts.password}"
+        host = f"{userinfo}@{host}"
+    return urlunsplit((scheme, host, parts.path or "/", parts.query, ""))
+
+def shared_probe_key(service) -> tuple:
+    """Services with the same key get the same answer from a single request:
+    same target, same way of probing it and same interval."""
+    return (
+        normalize_url(service.url),
+        service.probe_method or ProbeMethod.GET,
+        service.probe_body_limit,
+        service.timeout_override,
+        service_interval(service),
+    )
+
+def phase_key(service):
+    """Key hashed into the phase offset of a service. Shared services use their
+    probe key so that every subscriber of a target is due in the same tick."""
+    return shared_probe_key(service) if service.shared_probe else service.id
+
+def group_shared_probes(due_services: List[Tuple[object, datetime | None]]) -> List[List[Tuple[object, datetime | None]]]:
+    """Split due services into probe groups: one group per shared target,
+    a group of one for every other service. Order follows the first member."""
+    groups: List[List[Tuple[object, datetime | None]]] = []
+    shared: Dict[tuple, List[Tuple[object, datetime | None]]] = {}
+    for service, due_at in due_services:
+        if not service.shared_probe:
+            groups.append([(service, due_at)])
+            continue
+        key = shared_probe_key(service)
+        group = shared.get(key)
+        if group is None:
+            group = shared[key] = []
+            groups.append(group)
+        group.append((service, due_at))
+    return groups
+
+class SharedProbeStats:
+    """Counts the requests saved by fanning shared probes out."""
+
+    def __init__(self):
+        self.shared_requests = 0
+        self.subscribers_served = 0
+
+    def record(self, subscribers: int) -> None:
+        self.shared_requests += 1
+        self.subscribers_served += subscribers
+
+    @property
+    def requests_saved(self) -> int:
+        return self.subscribers_served - self.shared_requests
+
+    def stats(self) -> dict:
+        return {
+            "shared_requests": self.shared_requests,
+            "subscribers_served": self.subscribers_served,
+            "requests_saved": self.requests_saved,
+        }
+
+# Compteurs partagés par le moteur de probes
+shared_probe_stats = SharedProbeStats()
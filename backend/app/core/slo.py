@@ -0,0 +1,284 @@
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import case, func, text
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session, joinedload
+from app.db.models import Service, ServiceStats, ServiceSlo, SloBucket, SloBudget
+from app.core.notifications import send_alert, Alerter
+from app.core.retention import bucket_start
+
+logger = logging.getLogger(__name__)
+
+# Configuration des constantes
+SLO_BUCKET_SECONDS = 300  # Granularité des fenêtres de burn rate
+SLO_ALERT_SECONDS = 60  # Fréquence d'évaluation des alertes
+# Règles multi-fenêtres : (fenêtre longue, fenêtre courte, part du budget consommée sur la fenêtre longue)
+BURN_RATE_RULES = {
+    "fast": (3600, 300, 0.02),  # 2 % du budget en 1 h, encore en cours sur les 5 dernières minutes
+    "slow": (6 * 3600, 1800, 0.05),  # 5 % du budget en 6 h, encore en cours sur les 30 dernières minutes
+}
+
+def burn_rate_threshold(rule: str, window_days: int) -> float:
+    """Burn rate at which a rule consumes its share of the budget: 14.4 for
+    the fast rule and 6 for the slow one with a 30-day window."""
+    long_seconds, _, budget_share = BURN_RATE_RULES[rule]
+    return budget_share * window_days * 86400 / long_seconds
+
+def error_ratios(slo: ServiceSlo, checks: int, down_checks: int, slow_checks: int) -> Dict[str, Optional[float]]:
+    """Share of bad events of each objective; None without any valid event.
+
+    Availability counts every check, latency only the checks that were up."""
+    ratios = {"availability": down_checks / checks if checks else None}
+    if slo.latency_threshold_ms is not None and slo.latency_target is not None:
+        up_checks = checks - down_checks
+        ratios["latency"] = slow_checks / up_checks if up_checks else None
+    return ratios
+
+def targets(slo: ServiceSlo) -> Dict[str, float]:
+    return {"availability": slo.availability_target, "latency": slo.latency_target}
+
+def burn_rate(slo: ServiceSlo, checks: int, down_checks: int, slow_checks: int) -> float:
+    """Speed at which the budget is consumed (1 = exactly the budget over the
+    window), the worst of the objectives."""
+    rates = [
+        ratio / max(1 - targets(slo)[objective] / 100, 1e-9)
+        for objective, ratio in error_ratios(slo, checks, down_checks, slow_checks).items()
+        if ratio is not None
+    ]
+    return max(rates, default=0.0)
+
+def budget_status(slo: ServiceSlo, budget: Optional[SloBudget]) -> dict:
+    """Compliance and remaining error budget of each objective, from the
+    running totals of the window."""
+    checks, down_checks, slow_checks = (budget.checks, budget.down_checks, budget.slow_checks) if budget else (0, 0, 0)
+    status = {}
+    for objective, ratio in error_ratios(slo, checks, down_checks, slow_checks).items():
+        allowed = max(1 - targets(slo)[objective] / 100, 1e-9)
+        status[objective] = {
+            "target": targets(slo)[objective],
+            "compliance": None if ratio is None else round((1 - ratio) * 100, 4),
+            "budget_remaining": 1.0 if ratio is None else round(1 - ratio / allowed, 4),
+        }
+    return status
+
+def update_slo_budgets(db: Session, stats: List[ServiceStats]) -> None:
+    """Ingest hook: add a batch of new stats to the buckets and running totals
+    of the services that have an SLO, and drop from the totals the buckets
+    that left the window.
+
+    The window moves one bucket at a time, so the rows read and written per
+    batch do not depend on the length of the window."""
+    keys = list({stat.service_key for stat in stats})
+    slos: Dict[int, ServiceSlo] = {}
+    for i in range(0, len(keys), 500):
+        slos.update(
+            db.query(Service.stats_key, ServiceSlo)
+            .join(ServiceSlo, ServiceSlo.service_id == Service.id)
+            .filter(Service.stats_key.in_(keys[i:i + 500]))
+        )
+    if not slos:
+        return
+
+    buckets: Dict[Tuple[int, datetime], List[int]] = {}
+    latest: Dict[int, datetime] = {}
+    for stat in stats:
+        slo = slos.get(stat.service_key)
+        if slo is None:
+            continue
+        ping_date = stat.ping_date or datetime.utcnow()
+        counts = buckets.setdefault((stat.service_key, bucket_start(ping_date, SLO_BUCKET_SECONDS)), [0, 0, 0])
+        counts[0] += 1
+        if not stat.status:
+            counts[1] += 1
+        elif slo.latency_threshold_ms is not None and stat.response_time is not None and stat.response_time > slo.latency_threshold_ms:
+            counts[2] += 1
+        latest[stat.service_key] = max(latest.get(stat.service_key, ping_date), ping_date)
+
+    window_starts = {
+        service_key: bucket_start(ping_date, SLO_BUCKET_SECONDS) - timedelta(days=slos[service_key].window_days)
+        for service_key, ping_date in latest.items()
+    }
+    totals: Dict[int, List[int]] = {}
+    buckets_table = SloBucket.__table__
+    for (service_key, start), counts in buckets.items():
+        if start < window_starts[service_key]:
+            continue  # Bucket déjà sorti de la fenêtre
+        statement = insert(buckets_table).values(
+            service_key=service_key, bucket_start=start, checks=counts[0], down_checks=counts[1], slow_checks=counts[2]
+        )
+        db.execute(statement.on_conflict_do_update(
+            index_elements=[buckets_table.c.service_key, buckets_table.c.bucket_start],
+            set_={
+                "checks": buckets_table.c.checks + statement.excluded.checks,
+                "down_checks": buckets_table.c.down_checks + statement.excluded.down_checks,
+                "slow_checks": buckets_table.c.slow_checks + statement.excluded.slow_checks,
+            },
+        ))
+        total = totals.setdefault(service_key, [0, 0, 0])
+        for i, count in enumerate(counts):
+            total[i] += count
+
+    # Incréments faits par SQLite : deux process qui écrivent des stats ne perdent pas de mise à jour
+    budgets_table = SloBudget.__table__
+    for service_key, (checks, down_checks, slow_checks) in totals.items():
+        statement = insert(budgets_table).values(
+            service_key=service_key, window_start=window_starts[service_key],
+            checks=checks, down_checks=down_checks, slow_checks=slow_checks
+        )
+        db.execute(statement.on_conflict_do_update(
+            index_elements=[budgets_table.c.service_key],
+            set_={
+                "checks": budgets_table.c.checks + statement.excluded.checks,
+                "down_checks": budgets_table.c.down_checks + statement.excluded.down_checks,
+                "slow_checks": budgets_table.c.slow_checks + statement.excluded.slow_checks,
+            },
+        ))
+
+    previous_starts = dict(
+        db.query(SloBudget.service_key, SloBudget.window_start).filter(SloBudget.service_key.in_(list(window_starts)))
+    )
+    for service_key, window_start in window_starts.items():
+        if service_key in previous_starts and window_start > previous_starts[service_key]:
+            expire_buckets(db, service_key, window_start)
+
+def expire_buckets(db: Session, service_key: int, window_start: datetime) -> None:
+    """Subtract the buckets older than window_start from the totals, then delete them."""
+    expired = db.query(SloBucket).filter(SloBucket.service_key == service_key, SloBucket.bucket_start < window_start)
+    checks, down_checks, slow_checks = expired.with_entities(
+        func.coalesce(func.sum(SloBucket.checks), 0),
+        func.coalesce(func.sum(SloBucket.down_checks), 0),
+        func.coalesce(func.sum(SloBucket.slow_checks), 0),
+    ).one()
+    expired.delete(synchronize_session=False)
+    db.query(SloBudget).filter(SloBudget.service_key == service_key).update({
+        "checks": SloBudget.checks - checks,
+        "down_checks": SloBudget.down_checks - down_checks,
+        "slow_checks": SloBudget.slow_checks - slow_checks,
+        "window_start": window_start,
+    }, synchronize_session=False)
+
+def rebuild_budget(db: Session, service: Service, slo: ServiceSlo, now: Optional[datetime] = None) -> SloBudget:
+    """Rebuild the buckets and totals of a service from its raw stats, when
+    its SLO is created or changed; the caller commits. The alert state of
+    the budget is kept.
+
+    Only the raw stats still kept (settings.STATS_RETENTION) are counted:
+    the part of the window before them starts with an empty budget use."""
+    now = now or datetime.utcnow()
+    window_start = bucket_start(now, SLO_BUCKET_SECONDS) - timedelta(days=slo.window_days)
+    db.query(SloBucket).filter(SloBucket.service_key == service.stats_key).delete(synchronize_session=False)
+    bucket_ms = SLO_BUCKET_SECONDS * 1000
+    threshold = slo.latency_threshold_ms if slo.latency_threshold_ms is not None else -1
+    db.execute(text(f"""
+        INSERT INTO {SloBucket.__table__.fullname} (service_key, bucket_start, checks, down_checks, slow_checks)
+        SELECT service_key, ts / {bucket_ms} * {bucket_ms}, count(*), count(*) - sum(status),
+               sum(CASE WHEN status AND :threshold >= 0 AND latency_ms > :threshold THEN 1 ELSE 0 END)
+        FROM {ServiceStats.__table__.fullname}
+        WHERE service_key = :service_key AND ts >= :window_start
+        GROUP BY ts / {bucket_ms}
+    """), {
+        "service_key": service.stats_key,
+        "window_start": int((window_start - datetime(1970, 1, 1)).total_seconds() * 1000),
+        "threshold": threshold,
+    })
+    checks, down_checks, slow_checks = db.query(
+        func.coalesce(func.sum(SloBucket.checks), 0),
+        func.coalesce(func.sum(SloBucket.down_checks), 0),
+        func.coalesce(func.sum(SloBucket.slow_checks), 0),
+    ).filter(SloBucket.service_key == service.stats_key).one()
+    # Mise à jour en place : une alerte en cours reste connue et sa fin sera envoyée
+    budget = db.get(SloBudget, service.stats_key)
+    if budget is None:
+        budget = SloBudget(service_key=service.stats_key)
+        db.add(budget)
+    budget.window_start = window_start
+    budget.checks, budget.down_checks, budget.slow_checks = checks, down_checks, slow_checks
+    return budget
+
+def delete_slo_data(db: Session, service: Service) -> None:
+    db.query(SloBucket).filter(SloBucket.service_key == service.stats_key).delete(synchronize_session=False)
+    db.query(SloBudget).filter(SloBudget.service_key == service.stats_key).delete(synchronize_session=False)
+    db.query(ServiceSlo).filter(ServiceSlo.service_id == service.id).delete(synchronize_session=False)
+
+class SloAlerter(Alerter):
+    """Multi-window burn-rate alerts of the SLOs.
+
+    A rule fires when the budget burns faster than its threshold over both
+    its long window (significant consumption) and its short one (still
+    going on), so an alert is sent quickly on a real burn and stops soon
+    after it ends. One Slack message when a service starts burning, one
+    when it stops, through the notification preferences of the service."""
+
+    name = "slo_alerts"
+    interval_seconds = SLO_ALERT_SECONDS
+
+    async def notify(self, db: Session, now: datetime) -> int:
+        """Evaluate the rules of every SLO; returns the number of alerts started."""
+        rows = db.query(Service, ServiceSlo, SloBudget)\
+            .join(ServiceSlo, ServiceSlo.service_id == Service.id)\
+            .join(SloBudget, SloBudget.service_key == Service.stats_key)\
+            .options(joinedload(Service.notification_preferences))\
+            .all()
+        windows = window_sums(db, [service.stats_key for service, _, _ in rows], now)
+
+        started = 0
+        for service, slo, budget in rows:
+            sums = windows.get(service.stats_key, {})
+            rates = {
+                seconds: burn_rate(slo, *sums.get(seconds, (0, 0, 0)))
+                for rule in BURN_RATE_RULES.values() for seconds in rule[:2]
+            }
+            budget.fast_burn_rate = round(rates[BURN_RATE_RULES["fast"][0]], 3)
+            budget.slow_burn_rate = round(rates[BURN_RATE_RULES["slow"][0]], 3)
+            firing = next((
+                rule for rule, (long_seconds, short_seconds, _) in BURN_RATE_RULES.items()
+                if min(rates[long_seconds], rates[short_seconds]) >= burn_rate_threshold(rule, slo.window_days)
+            ), None)
+            if firing == budget.alert or (firing and budget.alert):
+                continue  # Pas de changement, ou alerte déjà en cours
+            rule = firing or budget.alert
+            remaining = min(objective["budget_remaining"] for objective in budget_status(slo, budget).values())
+            await send_alert(
+                service.notification_preferences,
+                "🔥 SLO error budget burning" if firing else "🟢 SLO burn rate back to normal",
+                {
+                    "Service Name": service.name,
+                    "Rule": rule,
+                    "Burn rate": f"{rates[BURN_RATE_RULES[rule][0]]:.1f}x",
+                    "Budget remaining": f"{remaining * 100:.1f}%",
+                },
+                resolved=firing is None,
+            )
+            if firing:
+                started += 1
+                budget.alerted_at = now
+            budget.alert = firing
+        return started
+
+def window_sums(db: Session, service_keys: List[int], now: datetime) -> Dict[int, Dict[int, Tuple[int, int, int]]]:
+    """(checks, down, slow) of each service over each window of the rules,
+    in one pass over the buckets of the longest window. A window includes
+    the bucket it starts in, so the shortest one is never empty just after
+    a bucket boundary."""
+    windows = sorted({seconds for rule in BURN_RATE_RULES.values() for seconds in rule[:2]})
+    columns = [
+        func.coalesce(func.sum(case((SloBucket.bucket_start > now - timedelta(seconds=seconds + SLO_BUCKET_SECONDS), column), else_=0)), 0)
+        for seconds in windows
+        for column in (SloBucket.checks, SloBucket.down_checks, SloBucket.slow_checks)
+    ]
+    sums = {}
+    for i in range(0, len(service_keys), 500):
+        rows = db.query(SloBucket.service_key, *columns)\
+            .filter(SloBucket.service_key.in_(service_keys[i:i + 500]))\
+            .filter(SloBucket.bucket_start > now - timedelta(seconds=windows[-1] + SLO_BUCKET_SECONDS))\
+            .group_by(SloBucket.service_key)
+        for service_key, *values in rows:
+            sums[service_key] = {
+                seconds: tuple(values[3 * j:3 * j + 3])
+                for j, seconds in enumerate(windows)
+            }
+    return sums
+
+# Alertes de burn rate, évaluées par le leader du scheduler
+slo_alerter = SloAlerter()
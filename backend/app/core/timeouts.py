@@ -0,0 +1,102 @@
+import logging
+import math
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List
+from uuid import UUID
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.db.models import Service, ServiceStats
+
+logger = logging.getLogger(__name__)
+
+# Configuration des constantes
+DEFAULT_TIMEOUT = 10.0  # Secondes, tant que le profil de latence est insuffisant
+MIN_TIMEOUT = 2.0
+MAX_TIMEOUT = 30.0
+P99_MULTIPLIER = 3.0  # Timeout = p99 x multiplicateur, borné par MIN/MAX_TIMEOUT
+PROFILE_WINDOW = 200  # Nombre de pings récents utilisés pour le profil
+MIN_SAMPLES = 20  # En dessous, DEFAULT_TIMEOUT
+REFRESH_INTERVAL = timedelta(minutes=15)
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    rank = max(math.ceil(q / 100 * len(values)) - 1, 0)
+    return values[rank]
+
+def compute_timeout(response_times_ms: List[float]) -> float:
+    if len(response_times_ms) < MIN_SAMPLES:
+        return DEFAULT_TIMEOUT
+    p99 = percentile(sorted(response_times_ms), 99) / 1000
+    return round(min(max(p99 * P99_MULTIPLIER, MIN_TIMEOUT), MAX_TIMEOUT), 2)
+
+class TimeoutCache:
+    """Per-service probe timeouts computed from their latency profile.
+
+    Values are recomputed for all services in a single query every
+    REFRESH_INTERVAL; a user-defined timeout_override always wins."""
+
+    def __init__(self):
+        self._timeouts: Dict[UUID, float] = {}
+        self.refreshed_at: datetime | None = None
+        self.last_plan: dict = {}
+
+    def get(self, service: Service) -> float:
+        if service.timeout_override:
+            return service.timeout_override
+        return self._timeouts.get(service.id, DEFAULT_TIMEOUT)
+
+    def refresh(self, db: Session) -> None:
+        ranked = db.query(
+            ServiceStats.service_key,
+            ServiceStats.response_time,
+            func.row_number().over(
+                partition_by=ServiceStats.service_key,
+                order_by=ServiceStats.ping_date.desc()
+            ).label("rank")
+        ).filter(ServiceStats.response_time.isnot(None)).subquery()
+
+        samples: Dict[UUID, List[float]] = {}
+        rows = db.query(Service.id, ranked.c.response_time)\
+            .join(ranked, ranked.c.service_key == Service.stats_key)\
+            .filter(ranked.c.rank <= PROFILE_WINDOW)\
+            .all()
+        for service_id, response_time in rows:
+            samples.setdefault(service_id, []).append(response_time)
+
+        self._timeouts = {service_id: compute_timeout(times) for service_id, times in samples.items()}
+        self.refreshed_at = datetime.utcnow()
+        logger.info(f"Refreshed adaptive timeouts for {len(self._timeouts)} services")
+
+    def refresh_if_stale(self, db: Session) -> None:
+        if self.refreshed_at is None or datetime.utcnow() - self.refreshed_at >= REFRESH_INTERVAL:
+            self.refresh(db)
+
+    def plan_capacity(self, services: Iterable[Service], concurrency: int, interval_seconds: float = 60) -> dict:
+        """Worst-case duration of a run if every probe hits its timeout."""
+        timeouts = [self.get(service) for service in services]
+        worst_case = sum(timeouts) / concurrency if timeouts else 0
+        self.last_plan = {
+            "services": len(timeouts),
+            "concurrency": concurrency,
+            "total_timeout_seconds": round(sum(timeouts), 2),
+            "worst_case_run_seconds": round(worst_case, 2),
+            "fits_interval": worst_case <= interval_seconds,
+        }
+        if worst_case > interval_seconds:
+            logger.warning(
+                f"Worst-case run time {worst_case:.1f}s exceeds the {interval_seconds}s interval "
+                f"for {len(timeouts)} services at concurrency {concurrency}"
+            )
+        return self.last_plan
+
+    def stats(self) -> dict:
+        timeouts = sorted(self._timeouts.values())
+        return {
+            "profiled_services": len(timeouts),
+            "refreshed_at": self.refreshed_at,
+            "median_timeout": percentile(timeouts, 50) if timeouts else None,
+            "last_plan": self.last_plan,
+        }
+
+# Cache partagé par le moteur de probes
+timeout_cache = TimeoutCache()
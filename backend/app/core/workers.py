@@ -0,0 +1,59 @@
+import logging
+import os
+import socket
+from datetime import datetime, timedelta
+from typing import List, Optional
+from sqlalchemy.orm import Session
+from app.db.models import WorkerHeartbeat
+
+logger = logging.getLogger(__name__)
+
+# Configuration des constantes
+WORKER_HEARTBEAT_SECONDS = 5
+WORKER_STALE_SECONDS = 30  # Un worker silencieux depuis plus longtemps est considéré mort
+WORKER_FORGET_AFTER = timedelta(days=1)  # Les lignes des workers arrêtés sont ensuite supprimées
+
+STARTED_AT = datetime.utcnow()
+
+def record_heartbeat(
+    db: Session,
+    worker_id: str,
+    role: str,
+    is_leader: bool,
+    in_flight_checks: int = 0,
+    dispatched_checks: int = 0,
+    now: datetime | None = None,
+    metrics: Optional[dict] = None,
+) -> None:
+    """Upsert the health record of this process and drop long-dead workers.
+
+    `metrics` are the internal metrics of the process, served by the API
+    even when it does not run the scheduler itself."""
+    now = now or datetime.utcnow()
+    db.merge(WorkerHeartbeat(
+        worker_id=worker_id,
+        role=role,
+        hostname=socket.gethostname(),
+        pid=os.getpid(),
+        started_at=STARTED_AT,
+        last_seen=now,
+        is_leader=is_leader,
+        in_flight_checks=in_flight_checks,
+        dispatched_checks=dispatched_checks,
+        metrics=metrics,
+    ))
+    db.query(WorkerHeartbeat)\
+        .filter(WorkerHeartbeat.last_seen < now - WORKER_FORGET_AFTER)\
+        .delete(synchronize_session=False)
+    db.commit()
+
+def is_alive(heartbeat: WorkerHeartbeat, now: datetime | None = None) -> bool:
+    now = now or datetime.utcnow()
+    return heartbeat.last_seen >= now - timedelta(seconds=WORKER_STALE_SECONDS)
+
+def live_workers(db: Session, now: datetime | None = None) -> List[WorkerHeartbeat]:
+    now = now or datetime.utcnow()
+    return db.query(WorkerHeartbeat)\
+        .filter(WorkerHeartbeat.last_seen >= now - timedelta(seconds=WORKER_STALE_SECONDS))\
+        .order_by(WorkerHeartbeat.worker_id)\
+        .all()
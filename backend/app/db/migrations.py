@@ -0,0 +1,169 @@
+import logging
+from sqlalchemy import inspect, text
+from app.db.session import TIMESERIES_SCHEMA
+from app.db.models import ServiceStats, StatsRollup, StatsKeySequence, RegionResult, Incident, LatencyHistogram
+from app.core.heatmap import LATENCY_BANDS_MS
+
+logger = logging.getLogger(__name__)
+
+# Configuration des constantes
+ROLLUP_BUCKETS_MS = (60_000, 3_600_000)  # Rollups minute et heure
+# Date SQLite -> millisecondes depuis l'epoch
+EPOCH_MS_SQL = "CAST(round((julianday({column}) - 2440587.5) * 86400000) AS INTEGER)"
+
+def columns_of(conn, table: str, schema: str = "main") -> set:
+    return {column["name"] for column in inspect(conn).get_columns(table, schema=schema)}
+
+def has_table(conn, table: str, schema: str = "main") -> bool:
+    return inspect(conn).has_table(table, schema=schema)
+
+def assign_stats_keys(conn) -> None:
+    """Give an integer stats key to the services created before it existed."""
+    if "stats_key" not in columns_of(conn, "services"):
+        conn.execute(text("ALTER TABLE services ADD COLUMN stats_key INTEGER"))
+    # rowid est unique : les clés attribuées ne se chevauchent pas
+    conn.execute(text(
+        "UPDATE services SET stats_key = (SELECT coalesce(max(stats_key), 0) FROM services) + rowid "
+        "WHERE stats_key IS NULL"
+    ))
+    # La séquence reprend après la plus grande clé attribuée
+    StatsKeySequence.__table__.create(conn, checkfirst=True)
+    conn.execute(text(
+        "INSERT INTO stats_key_sequence (id) SELECT max(stats_key) FROM services "
+        "HAVING max(stats_key) > (SELECT coalesce(max(id), 0) FROM stats_key_sequence)"
+    ))
+
+def migrate_legacy_stats(conn) -> None:
+    """Copy the UUID-keyed service_stats rows of the main database into the
+    compact table of the time-series database.
+
+    Rows of deleted services are dropped; two pings of the same service in
+    the same millisecond keep the last one."""
+    legacy = columns_of(conn, "service_stats")
+    ServiceStats.__table__.create(conn, checkfirst=True)
+    bytes_read = "l.bytes_read" if "bytes_read" in legacy else "NULL"
+    conn.execute(text(f"""
+        INSERT OR REPLACE INTO {ServiceStats.__table__.fullname} (service_key, ts, status, latency_ms, bytes_read)
+        SELECT s.stats_key, {EPOCH_MS_SQL.format(column="l.ping_date")}, l.status,
+               CAST(round(l.response_time) AS INTEGER), {bytes_read}
+        FROM main.service_stats l JOIN main.services s ON s.id = l.service_id
+        WHERE l.ping_date IS NOT NULL
+    """))
+    conn.execute(text("DROP TABLE main.service_stats"))
+    logger.info("Migrated service_stats to the compact layout")
+
+def migrate_legacy_rollups(conn) -> None:
+    """Same conversion for the UUID-keyed stats_rollups rows."""
+    StatsRollup.__table__.create(conn, checkfirst=True)
+    conn.execute(text(f"""
+        INSERT OR REPLACE INTO {StatsRollup.__table__.fullname} (
+            service_key, resolution, bucket_start, up_count, down_count,
+            response_time_sum, response_time_count, response_time_min, response_time_max
+        )
+        SELECT s.stats_key, l.resolution, {EPOCH_MS_SQL.format(column="l.bucket_start")}, l.up_count, l.down_count,
+               l.response_time_sum, l.response_time_count, l.response_time_min, l.response_time_max
+        FROM main.stats_rollups l JOIN main.services s ON s.id = l.service_id
+    """))
+    conn.execute(text("DROP TABLE main.stats_rollups"))
+    logger.info("Migrated stats_rollups to the compact layout")
+
+def move_to_timeseries(conn, table) -> None:
+    """Copy a table of the main database to the time-series database, then drop it."""
+    table.create(conn, checkfirst=True)
+    columns = ", ".join(sorted(columns_of(conn, table.name) & {column.name for column in table.columns}))
+    # OR IGNORE : une copie interrompue après l'écriture dans la base des séries peut être rejouée
+    conn.execute(text(f"INSERT OR IGNORE INTO {table.fullname} ({columns}) SELECT {columns} FROM main.{table.name}"))
+    conn.execute(text(f"DROP TABLE main.{table.name}"))
+    logger.info(f"Moved {table.name} to the time-series database")
+
+def backfill_rollups(conn) -> None:
+    """Build the rollups of the stats recorded before they were maintained
+    at ingest."""
+    for bucket_ms in ROLLUP_BUCKETS_MS:
+        conn.execute(text(f"""
+            INSERT INTO {StatsRollup.__table__.fullname} (
+                service_key, resolution, bucket_start, up_count, down_count,
+                response_time_sum, response_time_count, response_time_min, response_time_max
+            )
+            SELECT service_key, {bucket_ms // 1000}, ts / {bucket_ms} * {bucket_ms},
+                   sum(status), count(*) - sum(status),
+                   total(latency_ms), count(latency_ms), min(latency_ms), max(latency_ms)
+            FROM {ServiceStats.__table__.fullname}
+            GROUP BY service_key, ts / {bucket_ms}
+        """))
+
+def backfill_latency_histograms(conn) -> None:
+    """Build the latency histograms of the stats recorded before they were
+    maintained at ingest."""
+    band = "CASE " + " ".join(
+        f"WHEN latency_ms < {bound} THEN {index}" for index, bound in enumerate(LATENCY_BANDS_MS)
+    ) + f" ELSE {len(LATENCY_BANDS_MS)} END"
+    for bucket_ms in ROLLUP_BUCKETS_MS:
+        conn.execute(text(f"""
+            INSERT INTO {LatencyHistogram.__table__.fullname} (service_key, resolution, bucket_start, band, count)
+            SELECT service_key, {bucket_ms // 1000}, ts / {bucket_ms} * {bucket_ms}, {band}, count(*)
+            FROM {ServiceStats.__table__.fullname}
+            WHERE latency_ms IS NOT NULL
+            GROUP BY service_key, ts / {bucket_ms}, {band}
+        """))
+
+def backfill_incidents(conn) -> None:
+    """Build the incidents of the stats recorded before they were maintained
+    at ingest: each run of consecutive down stats of a service is one
+    incident, ended by the first up stat after it."""
+    conn.execute(text(f"""
+        WITH marked AS (
+            SELECT service_key, ts, status,
+                   CASE WHEN status = coalesce(lag(status) OVER (PARTITION BY service_key ORDER BY ts), 1) THEN 0 ELSE 1 END AS changed
+            FROM {ServiceStats.__table__.fullname}
+        ), runs AS (
+            SELECT service_key, ts, status, sum(changed) OVER (PARTITION BY service_key ORDER BY ts) AS run
+            FROM marked
+        ), grouped AS (
+            SELECT service_key, run, min(status) AS status, min(ts) AS started_at, count(*) AS checks,
+                   lead(min(ts)) OVER (PARTITION BY service_key ORDER BY run) AS ended_at
+            FROM runs
+            GROUP BY service_key, run
+        )
+        INSERT INTO {Incident.__table__.fullname} (service_id, started_at, ended_at, down_checks)
+        SELECT s.id, g.started_at, g.ended_at, g.checks
+        FROM grouped g JOIN main.services s ON s.stats_key = g.service_key
+        WHERE g.status = 0
+    """))
+
+def migrate_stats_storage(conn) -> None:
+    """Bring the stats tables of an existing database to the current layout,
+    in the time-series database.
+
+    Run in a single transaction before create_all: an interrupted migration
+    is replayed at the next start."""
+    if not has_table(conn, "services"):
+        return  # Base neuve, create_all crée directement les tables
+    assign_stats_keys(conn)
+    if has_table(conn, "service_stats"):
+        if "id" in columns_of(conn, "service_stats"):
+            migrate_legacy_stats(conn)
+        else:
+            move_to_timeseries(conn, ServiceStats.__table__)
+    if has_table(conn, "stats_rollups"):
+        if "service_id" in columns_of(conn, "stats_rollups"):
+            migrate_legacy_rollups(conn)
+        else:
+            move_to_timeseries(conn, StatsRollup.__table__)
+    elif not has_table(conn, "stats_rollups", TIMESERIES_SCHEMA):
+        StatsRollup.__table__.create(conn)
+        if has_table(conn, "service_stats", TIMESERIES_SCHEMA):
+            backfill_rollups(conn)
+        logger.info("Stats rollups created")
+    if has_table(conn, "region_results"):
+        move_to_timeseries(conn, RegionResult.__table__)
+    if not has_table(conn, "latency_histograms", TIMESERIES_SCHEMA):
+        LatencyHistogram.__table__.create(conn)
+        if has_table(conn, "service_stats", TIMESERIES_SCHEMA):
+            backfill_latency_histograms(conn)
+        logger.info("Latency histograms created")
+    if not has_table(conn, "incidents", TIMESERIES_SCHEMA):
+        Incident.__table__.create(conn)
+        if has_table(conn, "service_stats", TIMESERIES_SCHEMA):
+            backfill_incidents(conn)
+        logger.info("Incidents created")
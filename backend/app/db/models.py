@@ -1,15 +1,69 @@
-from sqlalchemy import Column, Integer, String, DateTime, UUID, ForeignKey, Float, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, UUID, ForeignKey, Float, Boolean, Index, JSON, TypeDecorator
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from uuid import uuid4
-from .session import Base
+from .session import Base, TIMESERIES_SCHEMA
 from enum import Enum
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+EPOCH = datetime(1970, 1, 1)
+
+class EpochMilliseconds(TypeDecorator):
+    """Naive UTC datetime stored as an integer number of milliseconds since the epoch"""
+    impl = Integer
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return (value - EPOCH) // timedelta(milliseconds=1)
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else EPOCH + timedelta(milliseconds=value)
+
+class Milliseconds(TypeDecorator):
+    """Response time in milliseconds, stored rounded to an integer"""
+    impl = Integer
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return None if value is None else round(value)
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else float(value)
+
+class StatsKeySequence(Base):
+    """Allocates Service.stats_key: one row per key ever handed out, never reused"""
+    __tablename__ = "stats_key_sequence"
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    id = Column(Integer, primary_key=True)
+
+def next_stats_key(connection) -> int:
+    # Une valeur par ligne, y compris quand l'ORM insère plusieurs services en une requête
+    return connection.execute(StatsKeySequence.__table__.insert()).inserted_primary_key[0]
 
 class RefreshFrequency(str, Enum):
+    TEN_SECONDS = "10 seconds"
+    THIRTY_SECONDS = "30 seconds"
     ONE_MINUTE = "1 minute"
+    FIVE_MINUTES = "5 minutes"
     TEN_MINUTES = "10 minutes" 
+    FIFTEEN_MINUTES = "15 minutes"
     ONE_HOUR = "1 hour"
+    CUSTOM = "custom"  # Intervalle libre défini par interval_seconds
+
+class ProbeMethod(str, Enum):
+    HEAD = "head"  # Aucun corps téléchargé
+    GET_HEADERS = "get_headers"  # GET, connexion fermée dès réception des en-têtes
+    GET = "get"  # GET, corps lu puis abandonné après probe_body_limit octets
+
+class CheckType(str, Enum):
+    HTTP = "http"  # Le serveur sonde l'URL
+    HEARTBEAT = "heartbeat"  # Le job s'annonce sur POST /heartbeat/{token}
 
 class Service(Base):
     __tablename__ = "services"
@@ -20,28 +74,199 @@ class Service(Base):
     user_id = Column(UUID, ForeignKey('users.id'), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     refresh_frequency = Column(String, nullable=False)
+    # Clé entière des stats du service : bien plus compacte que l'UUID dans les tables de séries temporelles
+    stats_key = Column(Integer, unique=True, index=True, default=lambda context: next_stats_key(context.connection))
+    interval_seconds = Column(Integer, nullable=True)  # None = déduit de refresh_frequency
+    probe_method = Column(String, nullable=False, default=ProbeMethod.GET, server_default=ProbeMethod.GET.value)
+    probe_body_limit = Column(Integer, nullable=True)  # None = DEFAULT_BODY_LIMIT
+    timeout_override = Column(Float, nullable=True)  # Secondes, None = timeout adaptatif
+    shared_probe = Column(Boolean, nullable=False, default=False, server_default="0")  # Une requête pour tous les abonnés d'une même cible
+    adaptive_interval = Column(Boolean, nullable=False, default=False, server_default="0")  # Espace les checks d'un service stable
+    effective_interval = Column(Integer, nullable=True)  # Secondes, fixé par app.core.adaptive ; None = intervalle de base
+    claimed_at = Column(DateTime, nullable=True)  # Dernier check réservé par un worker (mode shardé)
+    claimed_by = Column(String, nullable=True)
+    check_type = Column(String, nullable=False, default=CheckType.HTTP, server_default=CheckType.HTTP.value)
+    heartbeat_token = Column(String, nullable=True, unique=True, index=True)
+    heartbeat_grace_seconds = Column(Integer, nullable=True)  # Retard toléré après l'intervalle, None = défaut
+    last_heartbeat_at = Column(DateTime, nullable=True)
+    heartbeat_missed_at = Column(DateTime, nullable=True)  # Échéance ratée signalée, effacée au heartbeat suivant
+    unconfirmed_down_at = Column(DateTime, nullable=True)  # Panne locale que le quorum n'a jamais confirmée, effacée au check up suivant
     
     # Relation avec les stats
-    stats = relationship("ServiceStats", back_populates="service", order_by="desc(ServiceStats.ping_date)")
+    stats = relationship(
+        "ServiceStats", back_populates="service", order_by="desc(ServiceStats.ping_date)",
+        primaryjoin="Service.stats_key == foreign(ServiceStats.service_key)"
+    )
     user = relationship("User", back_populates="services")
     notification_preferences = relationship("NotificationPreference", back_populates="service", uselist=False)
 
 class ServiceStats(Base):
+    """One check result, clustered by (service_key, ping_date).
+
+    WITHOUT ROWID table of integers only: the primary key is the storage
+    order, so the stats of a service over a range are read from contiguous
+    pages without a secondary index."""
     __tablename__ = "service_stats"
+    __table_args__ = {"sqlite_with_rowid": False, "schema": TIMESERIES_SCHEMA}
 
-    id = Column(UUID, primary_key=True, default=uuid4)
-    service_id = Column(UUID, ForeignKey('services.id'), nullable=False)
-    ping_date = Column(DateTime(timezone=True), server_default=func.now())
+    service_key = Column(Integer, primary_key=True)  # Service.stats_key
+    ping_date = Column("ts", EpochMilliseconds, primary_key=True, default=datetime.utcnow)
     status = Column(Boolean, nullable=False)  # True pour up, False pour down
-    response_time = Column(Float, nullable=True)
-    
+    response_time = Column("latency_ms", Milliseconds, nullable=True)
+    bytes_read = Column(Integer, nullable=True)  # Octets du corps lus pendant le check
+    status_code = Column(Integer, nullable=True)  # Code HTTP, None sans réponse ou pour un heartbeat
+
     # Relation inverse
-    service = relationship("Service", back_populates="stats")
+    service = relationship("Service", back_populates="stats", primaryjoin="foreign(ServiceStats.service_key) == Service.stats_key")
 
     @property
     def is_down(self) -> bool:
         return not self.status
 
+class StatsRollup(Base):
+    """Aggregate of the stats of a service over one bucket (minute or hour),
+    maintained at ingest by app.core.retention."""
+    __tablename__ = "stats_rollups"
+    __table_args__ = {"sqlite_with_rowid": False, "schema": TIMESERIES_SCHEMA}
+
+    service_key = Column(Integer, primary_key=True)  # Service.stats_key
+    resolution = Column(Integer, primary_key=True)  # Durée du bucket en secondes
+    bucket_start = Column(EpochMilliseconds, primary_key=True)
+    up_count = Column(Integer, nullable=False, default=0)
+    down_count = Column(Integer, nullable=False, default=0)
+    response_time_sum = Column(Float, nullable=False, default=0)
+    response_time_count = Column(Integer, nullable=False, default=0)  # Checks avec un temps de réponse
+    response_time_min = Column(Float, nullable=True)
+    response_time_max = Column(Float, nullable=True)
+
+class LatencyHistogram(Base):
+    """Response times of a service over one rollup bucket, counted per fixed
+    log-scale band (app.core.heatmap.LATENCY_BANDS_MS); only the bands with
+    checks have a row. Maintained at ingest next to the rollups."""
+    __tablename__ = "latency_histograms"
+    __table_args__ = {"sqlite_with_rowid": False, "schema": TIMESERIES_SCHEMA}
+
+    service_key = Column(Integer, primary_key=True)  # Service.stats_key
+    resolution = Column(Integer, primary_key=True)  # Durée du bucket en secondes
+    bucket_start = Column(EpochMilliseconds, primary_key=True)
+    band = Column(Integer, primary_key=True)  # Indice de la bande de temps de réponse
+    count = Column(Integer, nullable=False, default=0)
+
+class Incident(Base):
+    """An outage of a service: opened by its first down stat, closed by the
+    next up stat. Maintained at ingest by app.core.incidents."""
+    __tablename__ = "incidents"
+    __table_args__ = (
+        Index("ix_incidents_service_id_started_at", "service_id", "started_at"),
+        {"schema": TIMESERIES_SCHEMA},
+    )
+
+    id = Column(Integer, primary_key=True)
+    service_id = Column(UUID, nullable=False)  # services.id, dans l'autre base : pas de clé étrangère
+    started_at = Column(EpochMilliseconds, nullable=False)  # Premier check down
+    ended_at = Column(EpochMilliseconds, nullable=True)  # Premier check up suivant, None tant que l'incident est ouvert
+    down_checks = Column(Integer, nullable=False, default=1)
+
+    @property
+    def duration(self) -> Optional[timedelta]:
+        return self.ended_at - self.started_at if self.ended_at else None
+
+class ServiceSlo(Base):
+    """Objectives of a service over a rolling window: share of checks up,
+    and optionally share of up checks answering under a latency threshold."""
+    __tablename__ = "service_slos"
+
+    service_id = Column(UUID, ForeignKey('services.id'), primary_key=True)
+    availability_target = Column(Float, nullable=False, default=99.9)  # % de checks up
+    latency_threshold_ms = Column(Float, nullable=True)  # None = pas d'objectif de latence
+    latency_target = Column(Float, nullable=True)  # % de checks up plus rapides que le seuil
+    window_days = Column(Integer, nullable=False, default=30)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class SloBucket(Base):
+    """Checks of a service with an SLO over SLO_BUCKET_SECONDS, maintained at
+    ingest by app.core.slo; buckets leaving the window are subtracted from
+    the budget then deleted."""
+    __tablename__ = "slo_buckets"
+    __table_args__ = {"sqlite_with_rowid": False, "schema": TIMESERIES_SCHEMA}
+
+    service_key = Column(Integer, primary_key=True)  # Service.stats_key
+    bucket_start = Column(EpochMilliseconds, primary_key=True)
+    checks = Column(Integer, nullable=False, default=0)
+    down_checks = Column(Integer, nullable=False, default=0)
+    slow_checks = Column(Integer, nullable=False, default=0)  # Checks up au-dessus du seuil de latence
+
+class SloBudget(Base):
+    """Running totals of the SLO window of a service: reading the error
+    budget is a single row lookup."""
+    __tablename__ = "slo_budgets"
+    __table_args__ = {"schema": TIMESERIES_SCHEMA}
+
+    service_key = Column(Integer, primary_key=True)  # Service.stats_key
+    window_start = Column(EpochMilliseconds, nullable=False)  # Les buckets plus anciens ont été retirés des totaux
+    checks = Column(Integer, nullable=False, default=0)
+    down_checks = Column(Integer, nullable=False, default=0)
+    slow_checks = Column(Integer, nullable=False, default=0)
+    fast_burn_rate = Column(Float, nullable=True)  # Dernière évaluation des alertes
+    slow_burn_rate = Column(Float, nullable=True)
+    alert = Column(String, nullable=True)  # Règle de burn rate en cours d'alerte
+    alerted_at = Column(DateTime, nullable=True)
+
+class LatencyBaseline(Base):
+    """Streaming latency profile of a service (EWMA of the mean and variance
+    of its response times) and its degradation state, updated at ingest by
+    app.core.anomalies."""
+    __tablename__ = "latency_baselines"
+    __table_args__ = {"schema": TIMESERIES_SCHEMA}
+
+    service_key = Column(Integer, primary_key=True)  # Service.stats_key
+    mean = Column(Float, nullable=False)
+    variance = Column(Float, nullable=False, default=0)
+    samples = Column(Integer, nullable=False, default=0)
+    streak = Column(Integer, nullable=False, default=0)  # Pings consécutifs contredisant l'état courant
+    degraded = Column(Boolean, nullable=False, default=False)
+    changed_at = Column(DateTime, nullable=True)  # Dernier changement d'état
+    notified = Column(Boolean, nullable=False, default=True)  # Changement d'état déjà signalé
+    last_response_time = Column(Float, nullable=True)
+    last_score = Column(Float, nullable=True)  # Écart à la moyenne du dernier ping, en écarts-types
+
+class RuleKind(str, Enum):
+    LATENCY = "latency"  # Temps de réponse au-dessus du seuil pour `matches` des `checks` derniers checks
+    STATUS_CODE = "status_code"  # Code HTTP de la classe donnée pour `matches` des `checks` derniers checks
+    UPTIME = "uptime"  # Part de checks up sur window_seconds sous le seuil (%)
+
+class AlertRule(Base):
+    """User-defined threshold rule of a service, evaluated at ingest by
+    app.core.rules."""
+    __tablename__ = "alert_rules"
+
+    id = Column(Integer, primary_key=True)
+    service_id = Column(UUID, ForeignKey('services.id'), nullable=False, index=True)
+    kind = Column(String, nullable=False)
+    threshold = Column(Float, nullable=True)  # Millisecondes (latency) ou pourcentage (uptime)
+    status_class = Column(Integer, nullable=True)  # 4 pour 4xx, 5 pour 5xx
+    matches = Column(Integer, nullable=False, default=1)
+    checks = Column(Integer, nullable=False, default=1)
+    window_seconds = Column(Integer, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    service = relationship("Service")
+
+class AlertRuleState(Base):
+    """Running state of a rule: the last results it needs and whether it
+    fires. Fixed size whatever the history of the service."""
+    __tablename__ = "alert_rule_states"
+    __table_args__ = {"schema": TIMESERIES_SCHEMA}
+
+    rule_id = Column(Integer, primary_key=True)  # alert_rules.id, dans l'autre base : pas de clé étrangère
+    history = Column(Integer, nullable=False, default=0)  # Un bit par check récent, le plus récent en bit 0
+    seen = Column(Integer, nullable=False, default=0)  # Checks dans history, au plus AlertRule.checks
+    buckets = Column(JSON, nullable=True)  # [début en ms, checks up, checks] des sous-fenêtres de la règle uptime
+    value = Column(Float, nullable=True)  # Dernière valeur évaluée : checks en défaut ou uptime
+    firing = Column(Boolean, nullable=False, default=False)
+    changed_at = Column(DateTime, nullable=True)
+    notified = Column(Boolean, nullable=False, default=True)
+
 class User(Base):
     __tablename__ = "users"
 
@@ -49,6 +274,10 @@ class User(Base):
     username = Column(String, unique=True, nullable=False)
     hashed_password = Column(String, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Quotas de probes (None = valeurs par défaut de app.core.fair_queue)
+    probe_weight = Column(Float, nullable=True)
+    max_checks_per_minute = Column(Integer, nullable=True)
+    max_concurrent_probes = Column(Integer, nullable=True)
     
     # Relation avec les services
     services = relationship("Service", back_populates="user")
@@ -60,6 +289,12 @@ class AlertFrequency(str, Enum):
     ALWAYS = "always"
     DAILY = "daily"
 
+class LatencySensitivity(str, Enum):
+    OFF = "off"
+    LOW = "low"
+    MEDIUM = "medium"
+    HIGH = "high"
+
 class NotificationPreference(Base):
     __tablename__ = "notification_preferences"
 
@@ -70,6 +305,53 @@ class NotificationPreference(Base):
     webhook_url = Column(String, nullable=False)
     last_alert_time = Column(DateTime(timezone=True), nullable=True)
     notify_on_recovery = Column(Boolean, default=True)
+    latency_sensitivity = Column(String, nullable=False, default=LatencySensitivity.MEDIUM, server_default=LatencySensitivity.MEDIUM.value)
     
     # Relations
-    service = relationship("Service", back_populates="notification_preferences")
\ No newline at end of file
+    service = relationship("Service", back_populates="notification_preferences")
+class SchedulerLease(Base):
+    __tablename__ = "scheduler_leases"
+
+    name = Column(String, primary_key=True)  # Rôle détenu, ex. "scheduler"
+    holder = Column(String, nullable=False)  # Identifiant du process leader
+    expires_at = Column(DateTime, nullable=False)
+    renewed_at = Column(DateTime, nullable=False)
+
+class ProbeRateLimit(Base):
+    """Probe rate set through the API, applied by the processes that probe."""
+    __tablename__ = "probe_rate_limits"
+
+    name = Column(String, primary_key=True)  # "global"
+    checks_per_second = Column(Float, nullable=False)
+    burst = Column(Integer, nullable=False)
+    updated_at = Column(DateTime, nullable=False)
+
+class WorkerHeartbeat(Base):
+    __tablename__ = "worker_heartbeats"
+
+    worker_id = Column(String, primary_key=True)  # Même identifiant que le bail du leader
+    role = Column(String, nullable=False)  # "worker" (python -m app.worker) ou "api" (scheduler intégré)
+    hostname = Column(String, nullable=False)
+    pid = Column(Integer, nullable=False)
+    started_at = Column(DateTime, nullable=False)
+    last_seen = Column(DateTime, nullable=False)
+    is_leader = Column(Boolean, nullable=False, default=False)
+    in_flight_checks = Column(Integer, nullable=False, default=0)
+    dispatched_checks = Column(Integer, nullable=False, default=0)
+    metrics = Column(JSON, nullable=True)  # Métriques internes du process, publiées avec le heartbeat
+
+class RegionResult(Base):
+    __tablename__ = "region_results"
+    __table_args__ = (
+        Index("ix_region_results_service_id_region_ping_date", "service_id", "region", "ping_date"),
+        {"schema": TIMESERIES_SCHEMA},
+    )
+
+    id = Column(UUID, primary_key=True, default=uuid4)
+    service_id = Column(UUID, nullable=False)  # services.id, dans l'autre base : pas de clé étrangère
+    region = Column(String, nullable=False)  # Région de l'agent qui a fait le check
+    ping_date = Column(DateTime, nullable=False)
+    status = Column(Boolean, nullable=False)
+    response_time = Column(Float, nullable=True)
+    bytes_read = Column(Integer, nullable=True)
+    received_at = Column(DateTime, nullable=False, default=datetime.utcnow)
@@ -1,6 +1,6 @@
 import logging
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect, text
 from sqlalchemy.orm import sessionmaker, declarative_base
 
 logging.basicConfig(level=logging.INFO)
@@ -21,8 +21,30 @@ except Exception as e:
 SQLITE_URL = f"sqlite:///{DATA_DIR}/sql_app.db"
 logger.info(f"Using database URL: {SQLITE_URL}")
 
+# Les séries temporelles (écritures continues) vivent dans leur propre fichier, attaché à chaque connexion
+TIMESERIES_SCHEMA = "timeseries"
+TIMESERIES_DB_PATH = f"{DATA_DIR}/timeseries.db"
+
+def attach_timeseries(engine, path: str) -> None:
+    """Attach the time-series database to every connection of engine.
+
+    Both files use WAL, so the monitor writing stats never blocks the
+    readers of the configuration; the time-series file is created with
+    incremental auto-vacuum so retention can give pages back in small steps."""
+    @event.listens_for(engine, "connect")
+    def _attach(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"ATTACH DATABASE ? AS {TIMESERIES_SCHEMA}", (path,))
+        # Sans effet une fois des tables créées : ne change que les fichiers neufs
+        cursor.execute(f"PRAGMA {TIMESERIES_SCHEMA}.auto_vacuum = INCREMENTAL")
+        cursor.execute("PRAGMA main.journal_mode = WAL")
+        cursor.execute(f"PRAGMA {TIMESERIES_SCHEMA}.journal_mode = WAL")
+        cursor.execute("PRAGMA busy_timeout = 5000")
+        cursor.close()
+
 try:
     engine = create_engine(SQLITE_URL)
+    attach_timeseries(engine, TIMESERIES_DB_PATH)
     logger.info("Database engine created successfully")
 except Exception as e:
     logger.error(f"Error creating database engine: {str(e)}")
@@ -54,10 +76,34 @@ def get_db():
         logger.info("Closing database connection")
         db.close()
 
+def add_missing_columns(bind):
+    """create_all ne modifie pas les tables existantes : ajoute les colonnes
+    déclarées dans les modèles mais absentes de la base (SQLite ALTER TABLE)."""
+    inspector = inspect(bind)
+    with bind.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name, schema=table.schema):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name, schema=table.schema)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                ddl = f"ALTER TABLE {table.fullname} ADD COLUMN {column.name} {column.type.compile(bind.dialect)}"
+                if column.server_default is not None:
+                    ddl += f" DEFAULT '{column.server_default.arg}'"
+                conn.execute(text(ddl))
+                logger.info(f"Added column {table.fullname}.{column.name}")
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+
 def init_db():
     logger.info("Initializing database")
     try:
+        from app.db.migrations import migrate_stats_storage
+        with engine.begin() as conn:
+            migrate_stats_storage(conn)
         Base.metadata.create_all(bind=engine)
+        add_missing_columns(engine)
         logger.info("Database tables created successfully")
     except Exception as e:
         logger.error(f"Error initializing database: {str(e)}")
\ No newline at end of file
@@ -1,11 +1,14 @@
+import asyncio
 import logging
 import os
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from app.api.endpoints import services, auth, notifications
+from app.api.endpoints import services, auth, notifications, monitoring, agents, heartbeats, slo, analytics, rules
 from app.db.session import init_db, SQLITE_URL, DATA_DIR
-from app.core.scheduler import init_scheduler, scheduler
+from app.core.scheduler import init_scheduler, shutdown_scheduler
 from app.core.daily_report import generate_daily_report
+from app.core.config import settings
+from app.core.heartbeats import run_heartbeat_flusher
 
 
 logging.basicConfig(level=logging.INFO)
@@ -41,7 +44,7 @@ app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
     allow_credentials=True,
-    allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+    allow_methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
     allow_headers=["*"],
     expose_headers=["*"],
 )
@@ -50,17 +53,39 @@ app.add_middleware(
 app.include_router(services.router, prefix="/api")
 app.include_router(auth.router, prefix="/api/auth")
 app.include_router(notifications.router, prefix="/api")
+app.include_router(monitoring.router, prefix="/api")
+app.include_router(agents.router, prefix="/api")
+app.include_router(slo.router, prefix="/api")
+app.include_router(analytics.router, prefix="/api")
+app.include_router(rules.router, prefix="/api")
+app.include_router(heartbeats.router)
 
 @app.on_event("startup")
 async def start_scheduler():
-    """Start the scheduler on application startup"""
-    init_scheduler()
+    """Start the scheduler on application startup, unless a dedicated worker runs it"""
+    if settings.RUN_SCHEDULER:
+        init_scheduler()
+    else:
+        logger.info("RUN_SCHEDULER disabled: monitoring is left to python -m app.worker")
 
 @app.on_event("shutdown")
-async def shutdown_scheduler():
+async def stop_scheduler():
     """Shut down the scheduler on application shutdown"""
-    from app.core.scheduler import scheduler
-    scheduler.shutdown()
+    if settings.RUN_SCHEDULER:
+        shutdown_scheduler()
+
+heartbeat_flusher_stop = asyncio.Event()
+
+@app.on_event("startup")
+async def start_heartbeat_flusher():
+    """Heartbeats are received by the API process, whether it runs the scheduler or not"""
+    app.state.heartbeat_flusher = asyncio.create_task(run_heartbeat_flusher(heartbeat_flusher_stop))
+
+@app.on_event("shutdown")
+async def stop_heartbeat_flusher():
+    """Write the last check-ins before exiting"""
+    heartbeat_flusher_stop.set()
+    await app.state.heartbeat_flusher
 
 @app.on_event("startup")
 def startup_event():
@@ -0,0 +1,24 @@
+"""Write a consistent copy of the configuration database (users, services,
+notification preferences), without the time-series data.
+
+    python -m app.scripts.backup_config data/config_backup.db
+"""
+import argparse
+
+from app.core.maintenance import database_maintenance
+from app.db.session import SessionLocal
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        size = database_maintenance.backup_config(db, args.path)
+    finally:
+        db.close()
+    print(f"Configuration database copied to {args.path} ({size} bytes)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Compare the former batch scheduling with the continuous probe pipeline.
+
+Probes are simulated (no network): most services answer in 50-200ms and a
+few slow ones take several seconds, which is what stalls whole batches.
+
+    python -m app.scripts.bench_pipeline --services 500 --slow-ratio 0.02
+"""
+import argparse
+import asyncio
+import random
+import time
+from unittest.mock import patch
+from uuid import uuid4
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core import monitor
+from app.core.pipeline import check_rate_limiter, PipelineMetrics
+from app.db.models import Service, RefreshFrequency
+from app.db.session import Base
+
+LEGACY_BATCH_SIZE = 50
+
+def make_db(count: int):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    services = [
+        Service(id=uuid4(), name=f"bench {i}", url=f"https://bench{i}.example.com",
+                user_id=uuid4(), refresh_frequency=RefreshFrequency.ONE_MINUTE)
+        for i in range(count)
+    ]
+    db.add_all(services)
+    db.commit()
+    return db, services
+
+def fake_ping(latencies: dict):
+    async def ping(service):
+        delay = latencies[service.id]
+        await asyncio.sleep(delay)
+        return monitor.ProbeResult(True, delay * 1000, 0, 200)
+    return ping
+
+async def legacy_batches(services, db):
+    """Ancien fonctionnement : lots de 50 attendus en entier puis 1s de pause"""
+    semaphore = asyncio.Semaphore(monitor.MAX_CONCURRENT_REQUESTS)
+    for i in range(0, len(services), LEGACY_BATCH_SIZE):
+        await monitor.process_service_batch(services[i:i + LEGACY_BATCH_SIZE], semaphore, db)
+        if i + LEGACY_BATCH_SIZE < len(services):
+            await asyncio.sleep(1)
+
+async def pipeline(services, db):
+    await monitor.run_check_pipeline([(service, None) for service in services], db)
+
+async def run(mode, services, db, latencies):
+    metrics = PipelineMetrics()
+    started = time.monotonic()
+    starts = []
+
+    def record_start(lag):
+        starts.append(time.monotonic() - started)
+
+    with patch.object(monitor, "ping_service", fake_ping(latencies)), \
+         patch.object(monitor, "pipeline_metrics", metrics), \
+         patch.object(metrics, "record_start", record_start):
+        await mode(services, db)
+    elapsed = time.monotonic() - started
+    starts.sort()
+    return {
+        "elapsed_seconds": round(elapsed, 2),
+        "checks_per_second": round(len(services) / elapsed, 1),
+        "start_lag_p50_seconds": round(starts[len(starts) // 2], 2),
+        "start_lag_p95_seconds": round(starts[int(len(starts) * 0.95)], 2),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--services", type=int, default=500)
+    parser.add_argument("--slow-ratio", type=float, default=0.02)
+    parser.add_argument("--slow-seconds", type=float, default=5.0)
+    parser.add_argument("--rate", type=float, default=None, help="checks per second of the token bucket")
+    args = parser.parse_args()
+
+    if args.rate:
+        check_rate_limiter.set_rate(args.rate, burst=int(args.rate))
+    db, services = make_db(args.services)
+    rng = random.Random(42)
+    latencies = {
+        service.id: args.slow_seconds if rng.random() < args.slow_ratio else rng.uniform(0.05, 0.2)
+        for service in services
+    }
+
+    for name, mode in (("batches", legacy_batches), ("pipeline", pipeline)):
+        print(name, asyncio.run(run(mode, services, db, latencies)))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Compare the former UUID-keyed service_stats table with the compact layout.
+
+Both tables are filled with the same simulated checks (one per minute per
+service), then compared on file size, insert time and the two reads the
+API does most: the recent window of one service and an aggregate over all
+of them.
+
+    python -m app.scripts.bench_stats_storage --services 200 --days 7
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+from sqlalchemy import MetaData, create_engine, text
+
+from app.db.models import ServiceStats
+
+LEGACY_DDL = (
+    "CREATE TABLE service_stats (id CHAR(32) NOT NULL PRIMARY KEY, service_id CHAR(32) NOT NULL, "
+    "ping_date DATETIME, status BOOLEAN NOT NULL, response_time FLOAT, bytes_read INTEGER)",
+    "CREATE INDEX ix_service_stats_service_id_ping_date ON service_stats (service_id, ping_date)",
+)
+
+def make_checks(services: int, days: int):
+    rng = random.Random(42)
+    start = datetime(2025, 3, 1)
+    for minute in range(days * 24 * 60):
+        ping_date = start + timedelta(minutes=minute)
+        for key in range(1, services + 1):
+            up = rng.random() > 0.01
+            yield key, ping_date, up, rng.uniform(50, 400) if up else None
+
+def fill_legacy(engine, checks, uuids):
+    with engine.begin() as conn:
+        for ddl in LEGACY_DDL:
+            conn.execute(text(ddl))
+        conn.execute(
+            text("INSERT INTO service_stats VALUES (:id, :service_id, :ping_date, :status, :response_time, NULL)"),
+            [
+                {"id": uuid4().hex, "service_id": uuids[key], "ping_date": ping_date.isoformat(" "),
+                 "status": status, "response_time": response_time}
+                for key, ping_date, status, response_time in checks
+            ]
+        )
+
+def fill_compact(engine, checks, uuids):
+    # Même table, dans la base principale du fichier mesuré plutôt que dans la base attachée
+    table = ServiceStats.__table__.to_metadata(MetaData(), schema=None)
+    table.create(engine)
+    with engine.begin() as conn:
+        conn.execute(
+            table.insert(),
+            [
+                {"service_key": key, "ts": ping_date, "status": status, "latency_ms": response_time}
+                for key, ping_date, status, response_time in checks
+            ]
+        )
+
+def timed(engine, query: str, params: dict, repeat: int) -> float:
+    with engine.connect() as conn:
+        started = time.perf_counter()
+        for _ in range(repeat):
+            conn.execute(text(query), params).all()
+        return (time.perf_counter() - started) / repeat * 1000
+
+def run(fill, path, checks, uuids, recent_query, recent_params, aggregate_query):
+    engine = create_engine(f"sqlite:///{path}")
+    started = time.perf_counter()
+    fill(engine, checks, uuids)
+    insert_seconds = time.perf_counter() - started
+    with engine.connect() as conn:
+        conn.execute(text("VACUUM"))
+    return {
+        "file_mb": round(os.path.getsize(path) / 1024 / 1024, 1),
+        "insert_seconds": round(insert_seconds, 2),
+        "recent_window_ms": round(timed(engine, recent_query, recent_params, 200), 3),
+        "full_aggregate_ms": round(timed(engine, aggregate_query, {}, 3), 1),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--services", type=int, default=200)
+    parser.add_argument("--days", type=int, default=7)
+    args = parser.parse_args()
+
+    checks = list(make_checks(args.services, args.days))
+    uuids = {key: uuid4().hex for key in range(1, args.services + 1)}
+    since = datetime(2025, 3, 1) + timedelta(days=args.days) - timedelta(hours=24)
+    print(f"{len(checks)} checks")
+
+    with tempfile.TemporaryDirectory() as directory:
+        print("legacy", run(
+            fill_legacy, os.path.join(directory, "legacy.db"), checks, uuids,
+            "SELECT ping_date, status, response_time FROM service_stats WHERE service_id = :service_id AND ping_date >= :since",
+            {"service_id": uuids[1], "since": since.isoformat(" ")},
+            "SELECT service_id, avg(response_time), sum(status) FROM service_stats GROUP BY service_id",
+        ))
+        print("compact", run(
+            fill_compact, os.path.join(directory, "compact.db"), checks, uuids,
+            "SELECT ts, status, latency_ms FROM service_stats WHERE service_key = :service_key AND ts >= :since",
+            {"service_key": 1, "since": int((since - datetime(1970, 1, 1)).total_seconds() * 1000)},
+            "SELECT service_key, avg(latency_ms), sum(status) FROM service_stats GROUP BY service_key",
+        ))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import gzip
+import json
+from datetime import datetime, timedelta
+from fastapi.testclient import TestClient
+from unittest.mock import patch
+
+from app.db.models import Service, ServiceStats, RegionResult, RefreshFrequency
+
+AGENT_TOKENS = "eu-west=eu-token,us-east=us-token"
+
+def create_service(test_db, test_user):
+    service = Service(name="Regional", url="https://regional.example.com", refresh_frequency=RefreshFrequency.ONE_MINUTE, user_id=test_user.id)
+    test_db.add(service)
+    test_db.commit()
+    return service
+
+def push(client, token, results, compress=True):
+    body = json.dumps(results, default=str).encode()
+    headers = {"X-Agent-Token": token, "Content-Type": "application/json"}
+    if compress:
+        body = gzip.compress(body)
+        headers["Content-Encoding"] = "gzip"
+    return client.post("/api/agents/results", content=body, headers=headers)
+
+def result(service, status, seconds_ago=5):
+    return {
+        "service_id": str(service.id),
+        "ping_date": (datetime.utcnow() - timedelta(seconds=seconds_ago)).isoformat(),
+        "status": status,
+        "response_time": 120.0,
+    }
+
+def test_agent_requires_token(client: TestClient):
+    with patch('app.core.auth.settings.AGENT_TOKENS', AGENT_TOKENS):
+        assert client.get("/api/agents/checks").status_code == 403
+        assert client.get("/api/agents/checks", headers={"X-Agent-Token": "wrong"}).status_code == 403
+
+def test_agent_checks(client: TestClient, test_db, test_user):
+    service = create_service(test_db, test_user)
+
+    with patch('app.core.auth.settings.AGENT_TOKENS', AGENT_TOKENS):
+        response = client.get("/api/agents/checks", headers={"X-Agent-Token": "eu-token"})
+
+    assert response.status_code == 200
+    assert response.json()["region"] == "eu-west"
+    assert response.json()["checks"][0]["service_id"] == str(service.id)
+    assert response.json()["checks"][0]["interval_seconds"] == 60
+
+def test_ingest_gzip_batch(client: TestClient, test_db, test_user):
+    service = create_service(test_db, test_user)
+    unknown = {**result(service, True), "service_id": "3fa85f64-5717-4562-b3fc-2c963f66afa6"}
+
+    with patch('app.core.auth.settings.AGENT_TOKENS', AGENT_TOKENS):
+        response = push(client, "eu-token", [result(service, True), result(service, False, 10), unknown])
+
+    assert response.status_code == 200
+    assert response.json() == {"received": 3, "accepted": 2}
+    assert test_db.query(RegionResult).filter(RegionResult.region == "eu-west").count() == 2
+
+def test_ingest_rejects_invalid_batches(client: TestClient, test_db, test_user):
+    service = create_service(test_db, test_user)
+
+    with patch('app.core.auth.settings.AGENT_TOKENS', AGENT_TOKENS):
+        assert push(client, "eu-token", [{"service_id": str(service.id)}]).status_code == 422
+        assert push(client, "eu-token", {"not": "a list"}, compress=False).status_code == 400
+        with patch('app.core.regions.MAX_INGEST_RESULTS', 1):
+            assert push(client, "eu-token", [result(service, True)] * 2).status_code == 413
+
+def test_service_regions_quorum(client: TestClient, auth_headers: dict, test_db, test_user):
+    service = create_service(test_db, test_user)
+    test_db.add(ServiceStats(service_key=service.stats_key, status=False, response_time=None, ping_date=datetime.utcnow()))
+    test_db.commit()
+
+    with patch('app.core.auth.settings.AGENT_TOKENS', AGENT_TOKENS):
+        push(client, "eu-token", [result(service, True)])
+        push(client, "us-token", [result(service, False)])
+
+    response = client.get(f"/api/services/{service.id}/regions", headers=auth_headers)
+
+    assert response.status_code == 200
+    data = response.json()
+    assert set(data["regions"]) == {"eu-west", "us-east", "local"}
+    assert data["regions_down"] == 2
+    assert data["quorum_down"] is True
@@ -0,0 +1,88 @@
+import json
+from fastapi.testclient import TestClient
+from unittest.mock import patch
+
+from app.core.pipeline import check_rate_limiter, load_rate_limit, TokenBucket
+from app.core.workers import record_heartbeat
+from app.core.metrics import process_metrics
+
+def test_monitoring_metrics_served_from_worker_heartbeats(client: TestClient, test_db):
+    record_heartbeat(test_db, "worker-1", "worker", is_leader=True, metrics={"dns": {"hits": 3}, "pipeline": {}})
+
+    with patch('app.core.auth.settings.MONITORING_ADMIN_TOKEN', "secret"):
+        assert client.get("/api/monitoring/metrics").status_code == 403
+        response = client.get("/api/monitoring/metrics", headers={"X-Admin-Token": "secret"})
+
+    assert response.status_code == 200
+    data = response.json()
+    worker = data["workers"][0]
+    assert (worker["worker_id"], worker["alive"]) == ("worker-1", True)
+    assert worker["metrics"]["dns"]["hits"] == 3
+    assert "analytics" in data["api"]
+    assert data["load"]["expected_per_second_over_minute"]["seconds"] == 60
+
+def test_process_metrics_are_json():
+    metrics = process_metrics()
+
+    assert json.loads(json.dumps(metrics)) == metrics
+    assert "dns" in metrics and "pipeline" in metrics
+
+def test_update_rate_requires_admin_token(client: TestClient):
+    with patch('app.core.auth.settings.MONITORING_ADMIN_TOKEN', "secret"):
+        response = client.put("/api/monitoring/rate", json={"checks_per_second": 10})
+        assert response.status_code == 403
+
+        response = client.put("/api/monitoring/rate", headers={"X-Admin-Token": "wrong"}, json={"checks_per_second": 10})
+        assert response.status_code == 403
+
+def test_update_rate(client: TestClient, test_db):
+    previous = check_rate_limiter.stats()
+    try:
+        with patch('app.core.auth.settings.MONITORING_ADMIN_TOKEN', "secret"):
+            response = client.put(
+                "/api/monitoring/rate",
+                headers={"X-Admin-Token": "secret"},
+                json={"checks_per_second": 250, "burst": 50}
+            )
+        assert response.status_code == 200
+        assert response.json()["rate"] == 250
+        assert check_rate_limiter.burst == 50
+
+        # Le worker qui fait les probes applique le débit enregistré
+        worker_limiter = TokenBucket()
+        load_rate_limit(test_db, worker_limiter)
+        assert (worker_limiter.rate, worker_limiter.burst) == (250, 50)
+    finally:
+        check_rate_limiter.set_rate(previous["rate"], previous["burst"])
+
+def test_update_user_quota(client: TestClient, test_user):
+    with patch('app.core.auth.settings.MONITORING_ADMIN_TOKEN', "secret"):
+        response = client.put(
+            f"/api/monitoring/users/{test_user.id}/quota",
+            headers={"X-Admin-Token": "secret"},
+            json={"probe_weight": 4, "max_checks_per_minute": 1200}
+        )
+
+    assert response.status_code == 200
+    assert response.json()["probe_weight"] == 4
+    assert response.json()["max_concurrent_probes"] is None
+    assert test_user.max_checks_per_minute == 1200
+
+def test_update_quota_unknown_user(client: TestClient):
+    with patch('app.core.auth.settings.MONITORING_ADMIN_TOKEN', "secret"):
+        response = client.put(
+            "/api/monitoring/users/00000000-0000-0000-0000-000000000000/quota",
+            headers={"X-Admin-Token": "secret"},
+            json={"probe_weight": 2}
+        )
+
+    assert response.status_code == 404
+
+def test_workers_health(client: TestClient, test_db):
+    record_heartbeat(test_db, "worker-1", "worker", is_leader=True)
+
+    response = client.get("/api/monitoring/workers")
+
+    assert response.status_code == 200
+    assert response.json()["monitoring_running"] is True
+    assert response.json()["workers"][0]["alive"] is True
@@ -8,6 +8,8 @@ from uuid import uuid4
 from datetime import datetime, timedelta
 
 from app.core.auth import get_user_id_from_headers
+from app.core.archive import ArchivedStat, append_to_archive
+from app.core.analytics import analytics_cache
 
 def test_create_service(client: TestClient, auth_headers: dict):
     response = client.post(
@@ -539,4 +541,327 @@ def test_service_isolation_with_third_user(client: TestClient, auth_headers3: di
             "ping_date": datetime.utcnow().isoformat()
         }
     )
-    assert response.status_code == 403  # Expecting forbidden access
\ No newline at end of file
+    assert response.status_code == 403  # Expecting forbidden access
+def test_update_service_timeout_override(client: TestClient, auth_headers: dict, auth_headers2: dict):
+    service_id = client.post(
+        "/api/services/",
+        headers=auth_headers,
+        json={
+            "name": "Slow Service",
+            "url": "https://example.com",
+            "refresh_frequency": RefreshFrequency.ONE_HOUR
+        }
+    ).json()["id"]
+
+    response = client.patch(f"/api/services/{service_id}", headers=auth_headers, json={"timeout_override": 25})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["timeout_override"] == 25
+    assert data["effective_timeout"] == 25
+    assert data["name"] == "Slow Service"
+
+    response = client.patch(f"/api/services/{service_id}", headers=auth_headers, json={"name": None})
+    assert response.status_code == 422
+
+    response = client.patch(f"/api/services/{service_id}", headers=auth_headers2, json={"timeout_override": 5})
+    assert response.status_code == 404
+
+def test_create_service_custom_interval(client: TestClient, auth_headers: dict):
+    response = client.post(
+        "/api/services/",
+        headers=auth_headers,
+        json={"name": "Fast Service", "url": "https://example.com", "interval_seconds": 45}
+    )
+    assert response.status_code == 201
+    assert response.json()["refresh_frequency"] == "custom"
+    assert response.json()["interval_seconds"] == 45
+
+    response = client.post(
+        "/api/services/",
+        headers=auth_headers,
+        json={"name": "Too Fast", "url": "https://example.com", "interval_seconds": 1}
+    )
+    assert response.status_code == 422
+
+def test_custom_frequency_requires_interval(client: TestClient, auth_headers: dict):
+    response = client.post(
+        "/api/services/",
+        headers=auth_headers,
+        json={"name": "Custom", "url": "https://example.com", "refresh_frequency": "custom"}
+    )
+    assert response.status_code == 422
+
+    service_id = client.post(
+        "/api/services/",
+        headers=auth_headers,
+        json={"name": "Custom", "url": "https://example.com", "interval_seconds": 45}
+    ).json()["id"]
+    response = client.patch(f"/api/services/{service_id}", headers=auth_headers, json={"refresh_frequency": "custom"})
+    assert response.status_code == 422
+    response = client.patch(f"/api/services/{service_id}", headers=auth_headers, json={"interval_seconds": None})
+    assert response.status_code == 422
+
+def test_update_service_frequency_updates_interval(client: TestClient, auth_headers: dict):
+    service_id = client.post(
+        "/api/services/",
+        headers=auth_headers,
+        json={"name": "Service", "url": "https://example.com", "refresh_frequency": RefreshFrequency.ONE_HOUR}
+    ).json()["id"]
+
+    response = client.patch(f"/api/services/{service_id}", headers=auth_headers, json={"refresh_frequency": "10 seconds"})
+
+    assert response.status_code == 200
+    assert response.json()["interval_seconds"] == 10
+
+def test_service_shared_probe_mode(client: TestClient, auth_headers: dict):
+    response = client.post(
+        "/api/services/",
+        headers=auth_headers,
+        json={"name": "Status Page", "url": "https://status.example.com", "shared_probe": True}
+    )
+    assert response.status_code == 201
+    assert response.json()["shared_probe"] is True
+
+    response = client.patch(f"/api/services/{response.json()['id']}", headers=auth_headers, json={"shared_probe": False})
+
+    assert response.status_code == 200
+    assert response.json()["shared_probe"] is False
+
+def test_service_adaptive_interval(client: TestClient, auth_headers: dict, test_db):
+    response = client.post(
+        "/api/services/",
+        headers=auth_headers,
+        json={"name": "Adaptive", "url": "https://example.com", "refresh_frequency": "1 minute", "adaptive_interval": True}
+    )
+    assert response.status_code == 201
+    assert response.json()["adaptive_interval"] is True
+    assert response.json()["effective_interval"] == 60
+
+    service = test_db.query(Service).filter(Service.id == UUID(response.json()["id"])).one()
+    service.effective_interval = 240
+    test_db.commit()
+
+    response = client.patch(f"/api/services/{service.id}", headers=auth_headers, json={"adaptive_interval": False})
+
+    assert response.status_code == 200
+    assert response.json()["interval_seconds"] == 60
+    assert response.json()["effective_interval"] == 60
+
+def test_heartbeat_service(client: TestClient, auth_headers: dict):
+    response = client.post(
+        "/api/services/",
+        headers=auth_headers,
+        json={"name": "Backup job", "check_type": "heartbeat", "interval_seconds": 3600}
+    )
+    assert response.status_code == 201
+    token = response.json()["heartbeat_token"]
+    assert response.json()["url"] == f"/heartbeat/{token}"
+
+    assert client.post(f"/heartbeat/{token}").status_code == 202
+    assert client.post("/heartbeat/unknown").status_code == 404
+
+    service_id = response.json()["id"]
+    assert client.delete(f"/api/services/{service_id}", headers=auth_headers).status_code == 204
+    assert client.post(f"/heartbeat/{token}").status_code == 404
+
+def test_http_service_requires_url(client: TestClient, auth_headers: dict):
+    response = client.post("/api/services/", headers=auth_headers, json={"name": "No URL"})
+
+    assert response.status_code == 422
+
+def test_stats_series_and_export_read_archives(client: TestClient, auth_headers: dict):
+    service_id = client.post(
+        "/api/services/", headers=auth_headers, json={"name": "Archived", "url": "https://example.com"}
+    ).json()["id"]
+    now = datetime.utcnow().replace(microsecond=0)
+    append_to_archive(service_id, [ArchivedStat(now - timedelta(days=20), False, None, None)])
+    client.post(
+        f"/api/services/{service_id}/stats/",
+        headers=auth_headers,
+        json={"service_id": service_id, "status": True, "response_time": 120, "ping_date": (now - timedelta(hours=1)).isoformat()}
+    )
+
+    response = client.get(
+        f"/api/services/{service_id}/stats/series",
+        headers=auth_headers,
+        params={"start": (now - timedelta(days=21)).isoformat(), "end": now.isoformat()}
+    )
+    assert response.status_code == 200
+    assert [point["status"] for point in response.json()["points"]] == [False, True]
+
+    response = client.get(
+        f"/api/services/{service_id}/stats/export",
+        headers=auth_headers,
+        params={"start": (now - timedelta(days=60)).isoformat()}
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    lines = response.text.strip().split("\n")
+    assert lines[0] == "ping_date,status,response_time,bytes_read"
+    assert lines[1].endswith(",down,,") and lines[2].endswith(",up,120.0,")
+
+def test_stats_series_range_is_bounded(client: TestClient, auth_headers: dict):
+    service_id = client.post(
+        "/api/services/", headers=auth_headers, json={"name": "Bounded", "url": "https://example.com"}
+    ).json()["id"]
+    now = datetime.utcnow()
+
+    response = client.get(
+        f"/api/services/{service_id}/stats/series",
+        headers=auth_headers,
+        params={"start": (now - timedelta(days=90)).isoformat(), "end": now.isoformat()}
+    )
+    assert response.status_code == 400
+    response = client.get(
+        f"/api/services/{service_id}/stats/series",
+        headers=auth_headers,
+        params={"start": now.isoformat(), "end": (now - timedelta(hours=1)).isoformat()}
+    )
+    assert response.status_code == 400
+
+def test_service_incidents_and_uptime(client: TestClient, auth_headers: dict):
+    service_id = client.post(
+        "/api/services/", headers=auth_headers, json={"name": "Incidents", "url": "https://example.com"}
+    ).json()["id"]
+    now = datetime.utcnow().replace(microsecond=0)
+    for minutes_ago, status in ((60, True), (50, False), (45, False), (40, True), (10, False)):
+        client.post(
+            f"/api/services/{service_id}/stats/",
+            headers=auth_headers,
+            json={"service_id": service_id, "status": status, "response_time": 100, "ping_date": (now - timedelta(minutes=minutes_ago)).isoformat()}
+        )
+
+    response = client.get(
+        f"/api/services/{service_id}/incidents",
+        headers=auth_headers,
+        params={"start": (now - timedelta(hours=2)).isoformat(), "end": now.isoformat()}
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert [incident["ended_at"] is None for incident in data["incidents"]] == [True, False]
+    assert data["incidents"][1]["duration_seconds"] == 600
+    assert data["incidents"][1]["down_checks"] == 2
+    # 10 minutes d'incident clos et 10 minutes d'incident en cours sur 2 heures
+    assert data["downtime_seconds"] == pytest.approx(1200, abs=5)
+    assert data["uptime_percentage"] == pytest.approx(100 - 1200 / 7200 * 100, abs=0.1)
+
+def test_service_slo_lifecycle(client: TestClient, auth_headers: dict, auth_headers2: dict):
+    service_id = client.post(
+        "/api/services/", headers=auth_headers, json={"name": "Slo", "url": "https://example.com"}
+    ).json()["id"]
+    now = datetime.utcnow().replace(microsecond=0)
+    for minutes_ago, status in ((40, True), (30, True), (20, True), (10, False)):
+        client.post(
+            f"/api/services/{service_id}/stats/",
+            headers=auth_headers,
+            json={"service_id": service_id, "status": status, "response_time": 100, "ping_date": (now - timedelta(minutes=minutes_ago)).isoformat()}
+        )
+
+    assert client.get(f"/api/services/{service_id}/slo", headers=auth_headers).status_code == 404
+    # Objectif de latence incomplet
+    response = client.put(f"/api/services/{service_id}/slo", headers=auth_headers, json={"latency_threshold_ms": 200})
+    assert response.status_code == 422
+
+    # Le budget est calculé sur les stats déjà enregistrées
+    response = client.put(f"/api/services/{service_id}/slo", headers=auth_headers, json={"availability_target": 90, "window_days": 7})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["checks"] == 4
+    assert data["objectives"]["availability"]["compliance"] == 75.0
+    assert data["objectives"]["availability"]["budget_remaining"] == pytest.approx(-1.5)
+
+    # Puis tenu à jour à l'ingestion
+    client.post(
+        f"/api/services/{service_id}/stats/",
+        headers=auth_headers,
+        json={"service_id": service_id, "status": True, "response_time": 100, "ping_date": now.isoformat()}
+    )
+    data = client.get(f"/api/services/{service_id}/slo", headers=auth_headers).json()
+    assert data["checks"] == 5
+    assert data["objectives"]["availability"]["compliance"] == 80.0
+
+    assert client.get(f"/api/services/{service_id}/slo", headers=auth_headers2).status_code == 404
+    assert client.delete(f"/api/services/{service_id}/slo", headers=auth_headers).status_code == 204
+    assert client.get(f"/api/services/{service_id}/slo", headers=auth_headers).status_code == 404
+
+def test_fleet_and_service_analytics(client: TestClient, auth_headers: dict, auth_headers2: dict):
+    analytics_cache._entries.clear()
+    service_id = client.post(
+        "/api/services/", headers=auth_headers, json={"name": "Analytics", "url": "https://example.com"}
+    ).json()["id"]
+    now = datetime.utcnow().replace(microsecond=0)
+    for minutes_ago, status in ((50, True), (40, False), (30, True)):
+        client.post(
+            f"/api/services/{service_id}/stats/",
+            headers=auth_headers,
+            json={"service_id": service_id, "status": status, "response_time": 100, "ping_date": (now - timedelta(minutes=minutes_ago)).isoformat()}
+        )
+
+    response = client.get("/api/analytics", headers=auth_headers, params={"days": 1})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["services_count"] == 1
+    assert data["fleet"]["incidents"] == 1
+    assert data["fleet"]["mttr_seconds"] == 600
+    assert data["services"][0]["service_id"] == service_id
+
+    response = client.get(f"/api/services/{service_id}/analytics", headers=auth_headers, params={"days": 1})
+    assert response.status_code == 200
+    assert response.json()["longest_outage_seconds"] == 600
+    assert client.get(f"/api/services/{service_id}/analytics", headers=auth_headers2).status_code == 404
+    assert client.get("/api/analytics", headers=auth_headers, params={"days": 0}).status_code == 422
+
+def test_service_alert_rules(client: TestClient, auth_headers: dict, auth_headers2: dict):
+    service_id = client.post(
+        "/api/services/", headers=auth_headers, json={"name": "Rules", "url": "https://example.com"}
+    ).json()["id"]
+    rules_url = f"/api/services/{service_id}/rules"
+
+    assert client.post(rules_url, headers=auth_headers, json={"kind": "latency"}).status_code == 422
+    assert client.post(rules_url, headers=auth_headers, json={"kind": "uptime", "threshold": 150, "window_seconds": 3600}).status_code == 422
+    response = client.post(rules_url, headers=auth_headers, json={"kind": "status_code", "status_class": 5})
+    assert response.status_code == 201
+    rule = response.json()
+    assert rule["description"] == "status code 5xx for 1 of 1 checks"
+    assert not rule["firing"]
+
+    client.post(
+        f"/api/services/{service_id}/stats/",
+        headers=auth_headers,
+        json={"service_id": service_id, "status": False, "status_code": 502, "ping_date": datetime.utcnow().isoformat()}
+    )
+    rules = client.get(rules_url, headers=auth_headers).json()
+    assert [(rule["firing"], rule["value"]) for rule in rules] == [(True, 1)]
+
+    assert client.get(rules_url, headers=auth_headers2).status_code == 404
+    assert client.delete(f"{rules_url}/{rule['id']}", headers=auth_headers).status_code == 204
+    assert client.delete(f"{rules_url}/{rule['id']}", headers=auth_headers).status_code == 404
+    assert client.get(rules_url, headers=auth_headers).json() == []
+
+def test_service_latency_heatmap(client: TestClient, auth_headers: dict, auth_headers2: dict):
+    service_id = client.post(
+        "/api/services/", headers=auth_headers, json={"name": "Heatmap", "url": "https://example.com"}
+    ).json()["id"]
+    now = datetime.utcnow().replace(microsecond=0)
+    for minutes_ago, response_time in ((30, 40), (20, 45), (10, 3000)):
+        client.post(
+            f"/api/services/{service_id}/stats/",
+            headers=auth_headers,
+            json={"service_id": service_id, "status": True, "response_time": response_time, "ping_date": (now - timedelta(minutes=minutes_ago)).isoformat()}
+        )
+
+    response = client.get(f"/api/services/{service_id}/stats/heatmap", headers=auth_headers)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["resolution_seconds"] == 60
+    assert len(data["columns"]) == 3
+    assert [column["counts"].index(1) for column in data["columns"]] == [2, 2, 8]
+
+    response = client.get(
+        f"/api/services/{service_id}/stats/heatmap",
+        headers=auth_headers,
+        params={"start": (now - timedelta(days=30)).isoformat(), "end": now.isoformat()}
+    )
+    assert response.json()["resolution_seconds"] == 3600
+    assert sum(response.json()["columns"][-1]["counts"]) >= 1
+    assert client.get(f"/api/services/{service_id}/stats/heatmap", headers=auth_headers2).status_code == 404
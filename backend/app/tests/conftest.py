@@ -3,7 +3,7 @@ import pytest
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from fastapi.testclient import TestClient
-from app.db.session import Base, get_db
+from app.db.session import Base, get_db, attach_timeseries
 from app.main import app
 from app.db.models import RefreshFrequency, User, Service
 from app.core.auth import get_password_hash, create_access_token
@@ -11,11 +11,13 @@ from datetime import timedelta
 from uuid import uuid4
 
 SQLITE_TEST_URL = "sqlite:///./test.db"
+TIMESERIES_TEST_PATH = "./test_timeseries.db"
 
 @pytest.fixture
 def test_db():
     """Fixture that provides a test database session"""
     engine = create_engine(SQLITE_TEST_URL, connect_args={"check_same_thread": False})
+    attach_timeseries(engine, TIMESERIES_TEST_PATH)
     Base.metadata.create_all(bind=engine)
     TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, expire_on_commit=False)
     
@@ -116,4 +118,9 @@ def mock_services(test_user):
             user_id=test_user.id
         )
         for i in range(3)
-    ]
\ No newline at end of file
+    ]
+@pytest.fixture(autouse=True)
+def archive_dir(tmp_path, monkeypatch):
+    """Keep the stats archives written by the tests out of the data directory"""
+    monkeypatch.setattr("app.core.archive.ARCHIVE_DIR", str(tmp_path / "archive"))
+    return tmp_path / "archive"
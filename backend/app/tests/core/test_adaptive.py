@@ -0,0 +1,110 @@
+import time
+import uuid
+import pytest
+from unittest.mock import patch
+
+from app.core.adaptive import AdaptiveFrequency, INCIDENT_INTERVAL_SECONDS, STABLE_CHECKS_BEFORE_BACKOFF
+from app.core.monitor import run_check_pipeline, sync_schedule, ProbeResult
+from app.core.scheduling import service_interval, CheckSchedule
+from app.db.models import Service, RefreshFrequency
+
+def make_service(refresh_frequency=RefreshFrequency.ONE_HOUR, adaptive_interval=False, user_id=None):
+    return Service(
+        id=uuid.uuid4(),
+        name="Adaptive Service",
+        url="https://adaptive.example.com",
+        refresh_frequency=refresh_frequency,
+        user_id=user_id or uuid.uuid4(),
+        adaptive_interval=adaptive_interval
+    )
+
+def apply(adaptive, service, status):
+    service.effective_interval = adaptive.next_interval(service, status)
+    return service_interval(service)
+
+def test_failing_service_is_probed_fast_until_it_recovers():
+    adaptive = AdaptiveFrequency()
+    service = make_service()
+
+    assert apply(adaptive, service, False) == INCIDENT_INTERVAL_SECONDS
+    assert apply(adaptive, service, False) == INCIDENT_INTERVAL_SECONDS
+    assert apply(adaptive, service, True) == 3600
+    assert adaptive.stats()["incident_services"] == 0
+
+def test_fast_services_stay_within_budget():
+    adaptive = AdaptiveFrequency(incident_checks_per_second=0.1)  # 3 services à 30 s
+    services = [make_service() for _ in range(5)]
+
+    intervals = [apply(adaptive, service, False) for service in services]
+
+    assert intervals == [INCIDENT_INTERVAL_SECONDS] * 3 + [3600] * 2
+    assert adaptive.stats()["budget_denied"] == 2
+
+def test_budget_is_shared_between_workers():
+    adaptive = AdaptiveFrequency(incident_checks_per_second=0.2)  # 6 services à 30 s
+    adaptive.set_workers(3)
+    services = [make_service() for _ in range(3)]
+
+    assert [apply(adaptive, service, False) for service in services] == [INCIDENT_INTERVAL_SECONDS] * 2 + [3600]
+
+    # Un service supprimé libère sa place
+    adaptive.retain([services[1].id, services[2].id])
+    assert apply(adaptive, services[2], False) == INCIDENT_INTERVAL_SECONDS
+
+def test_fast_services_faster_than_incident_cadence_keep_their_interval():
+    adaptive = AdaptiveFrequency()
+    service = make_service(refresh_frequency=RefreshFrequency.TEN_SECONDS)
+
+    assert apply(adaptive, service, False) == 10
+
+def test_stable_service_backs_off_only_when_opted_in():
+    adaptive = AdaptiveFrequency()
+    opted_in = make_service(RefreshFrequency.ONE_MINUTE, adaptive_interval=True)
+    default = make_service(RefreshFrequency.ONE_MINUTE)
+
+    for _ in range(STABLE_CHECKS_BEFORE_BACKOFF):
+        apply(adaptive, opted_in, True)
+        apply(adaptive, default, True)
+
+    assert service_interval(opted_in) == 120
+    assert service_interval(default) == 60
+
+    for _ in range(10 * STABLE_CHECKS_BEFORE_BACKOFF):
+        apply(adaptive, opted_in, True)
+    assert service_interval(opted_in) == 240  # Plafond : 4x l'intervalle de base
+
+    assert apply(adaptive, opted_in, False) == INCIDENT_INTERVAL_SECONDS
+
+@pytest.mark.asyncio
+async def test_pipeline_stores_effective_interval(test_db, test_user):
+    service = make_service(user_id=test_user.id)
+    test_db.add(service)
+    test_db.commit()
+
+    with patch('app.core.monitor.ping_service', return_value=ProbeResult(False, None)):
+        await run_check_pipeline([(service, None)], test_db)
+
+    test_db.expire_all()
+    assert test_db.get(Service, service.id).effective_interval == INCIDENT_INTERVAL_SECONDS
+
+@pytest.mark.asyncio
+async def test_schedule_sync_frees_the_budget_of_deleted_and_edited_services(test_db, test_user):
+    kept, edited, deleted = (make_service(user_id=test_user.id) for _ in range(3))
+    test_db.add_all([kept, edited, deleted])
+    test_db.commit()
+    schedule = CheckSchedule()
+    adaptive = AdaptiveFrequency()
+
+    with patch('app.core.monitor.adaptive_frequency', adaptive), \
+            patch('app.core.monitor.ping_service', return_value=ProbeResult(False, None)):
+        await run_check_pipeline([(kept, None), (edited, None), (deleted, None)], test_db)
+        sync_schedule(test_db, time.time(), schedule)
+        assert adaptive.stats()["incident_services"] == 3
+
+        # Modifications faites par l'API, dans un autre process
+        edited.refresh_frequency, edited.effective_interval = RefreshFrequency.FIVE_MINUTES, None
+        test_db.query(Service).filter(Service.id == deleted.id).delete(synchronize_session=False)
+        test_db.commit()
+        sync_schedule(test_db, time.time(), schedule)
+
+    assert adaptive.stats()["incident_services"] == 1
@@ -0,0 +1,71 @@
+import uuid
+import pytest
+from datetime import datetime, timedelta
+
+from app.core.analytics import fleet_analytics, AnalyticsCache
+from app.core.ingest import save_stats
+from app.db.models import Service, ServiceStats, RefreshFrequency
+
+START = datetime(2025, 3, 1, 0, 0)
+END = START + timedelta(hours=10)
+
+def add_service(test_db, user, name):
+    service = Service(
+        id=uuid.uuid4(), name=name, url="https://example.com",
+        refresh_frequency=RefreshFrequency.ONE_MINUTE, user_id=user.id
+    )
+    test_db.add(service)
+    test_db.commit()
+    return service
+
+def record(test_db, service, statuses, start=START, step=timedelta(minutes=30)):
+    save_stats(test_db, [
+        ServiceStats(service_key=service.stats_key, status=status, response_time=100.0 if status else None, ping_date=start + i * step)
+        for i, status in enumerate(statuses)
+    ])
+    test_db.commit()
+
+def test_service_and_fleet_reliability(test_db, test_user, test_user2):
+    api = add_service(test_db, test_user, "api")
+    web = add_service(test_db, test_user, "web")
+    other = add_service(test_db, test_user2, "other")
+    # api : panne de 30 min puis panne d'1 h ; web : une panne encore en cours depuis 1 h
+    record(test_db, api, [True, True, False, True, True, False, False, True] + [True] * 12)
+    record(test_db, web, [True] * 18 + [False, False])
+    record(test_db, other, [False] * 20)
+
+    summary = fleet_analytics(test_db, test_user.id, START, END)
+    assert summary["services_count"] == 2
+    api_stats, web_stats = summary["services"]
+    assert (api_stats["name"], api_stats["incidents"], api_stats["longest_outage_seconds"]) == ("api", 2, 3600)
+    assert api_stats["mttr_seconds"] == 2700
+    assert api_stats["mtbf_seconds"] == (36000 - 5400) / 2
+    assert api_stats["availability"] == 85.0
+    assert (api_stats["checks"], api_stats["check_availability"]) == (20, 85.0)
+    # Incident en cours : compté jusqu'à la fin de la plage, sans MTTR
+    assert (web_stats["downtime_seconds"], web_stats["mttr_seconds"]) == (3600, None)
+
+    fleet = summary["fleet"]
+    assert (fleet["incidents"], fleet["downtime_seconds"], fleet["longest_outage_seconds"]) == (3, 9000, 3600)
+    assert fleet["mttr_seconds"] == 2700
+    assert fleet["availability"] == 87.5
+    assert fleet["checks"] == 40
+
+def test_range_clips_incidents(test_db, test_user):
+    api = add_service(test_db, test_user, "api")
+    record(test_db, api, [False, False, False, True])
+
+    summary = fleet_analytics(test_db, test_user.id, START + timedelta(hours=1), END)
+    assert summary["services"][0]["downtime_seconds"] == 1800
+    assert summary["services"][0]["mttr_seconds"] == 5400  # Durée complète de l'incident terminé
+
+def test_cache_reuses_summary_until_invalidated(test_db, test_user):
+    add_service(test_db, test_user, "api")
+    cache = AnalyticsCache()
+    first = cache.get(test_db, test_user.id, START, END)
+    add_service(test_db, test_user, "web")
+    assert cache.get(test_db, test_user.id, START, END) is first
+
+    cache.invalidate(test_user.id)
+    assert cache.get(test_db, test_user.id, START, END)["services_count"] == 2
+    assert cache.stats() == {"hits": 1, "misses": 2, "cached": 1}
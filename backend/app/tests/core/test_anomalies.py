@@ -0,0 +1,81 @@
+import uuid
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, patch
+
+from app.core.anomalies import observe, LatencyAlerter, WARMUP_SAMPLES
+from app.core.ingest import save_stats
+from app.db.models import (
+    Service, ServiceStats, LatencyBaseline, NotificationPreference, NotificationMethod,
+    AlertFrequency, LatencySensitivity, RefreshFrequency,
+)
+
+NOW = datetime(2025, 3, 1, 12, 0)
+
+def new_baseline():
+    return LatencyBaseline(service_key=1, mean=0.0, variance=0.0, samples=0, streak=0, degraded=False, notified=True)
+
+def feed(baseline, response_times, threshold=4.0):
+    for response_time in response_times:
+        observe(baseline, response_time, threshold, NOW)
+
+def usual(count):
+    return [80 + (i % 5) * 4 for i in range(count)]
+
+def test_baseline_tracks_mean_and_deviation():
+    baseline = new_baseline()
+    feed(baseline, usual(200))
+    assert baseline.mean == pytest.approx(88, abs=2)
+    assert 0 < baseline.variance < 50
+
+def test_sustained_jump_degrades_then_recovers():
+    baseline = new_baseline()
+    feed(baseline, usual(WARMUP_SAMPLES + 20))
+    feed(baseline, [4000, 4000])
+    assert not baseline.degraded  # Un pic isolé ne suffit pas
+
+    feed(baseline, [4000])
+    assert baseline.degraded and not baseline.notified
+    # La dégradation ne devient pas la nouvelle normale
+    feed(baseline, [4000] * 10)
+    assert baseline.degraded and baseline.mean < 400
+
+    baseline.notified = True
+    feed(baseline, usual(3))
+    assert not baseline.degraded and not baseline.notified
+
+def test_no_alert_during_warmup_or_when_off():
+    baseline = new_baseline()
+    feed(baseline, usual(5) + [4000] * 5)
+    assert not baseline.degraded
+
+    baseline = new_baseline()
+    feed(baseline, usual(WARMUP_SAMPLES + 20) + [4000] * 5, threshold=None)
+    assert not baseline.degraded
+
+@pytest.mark.asyncio
+async def test_degradation_from_ingest_sent_once(test_db, test_user):
+    service = Service(
+        id=uuid.uuid4(), name="Slow", url="https://example.com",
+        refresh_frequency=RefreshFrequency.ONE_MINUTE, user_id=test_user.id
+    )
+    test_db.add(service)
+    test_db.add(NotificationPreference(
+        service_id=service.id, notification_method=NotificationMethod.SLACK, alert_frequency=AlertFrequency.ALWAYS,
+        webhook_url="https://hooks.slack.com/x", latency_sensitivity=LatencySensitivity.HIGH
+    ))
+    test_db.commit()
+    response_times = usual(WARMUP_SAMPLES + 10) + [4000] * 3
+    save_stats(test_db, [
+        ServiceStats(service_key=service.stats_key, status=True, response_time=response_time, ping_date=NOW + timedelta(minutes=i))
+        for i, response_time in enumerate(response_times)
+    ])
+    test_db.commit()
+    alerter = LatencyAlerter()
+
+    with patch("app.core.notifications.send_slack_notification", new=AsyncMock(return_value=True)) as slack:
+        assert await alerter.run(test_db) == 1
+        assert await alerter.run(test_db) == 0
+    assert slack.await_count == 1
+    baseline = test_db.get(LatencyBaseline, service.stats_key)
+    assert baseline.degraded and baseline.last_response_time == 4000
@@ -0,0 +1,136 @@
+import gzip
+import os
+import uuid
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from app.core.archive import (
+    ArchivedStat, append_to_archive, read_archive, read_stats, load_month, months_between,
+    expire_archives, archive_path, archive_stats, index_path, encode_segment, MonthCache
+)
+from app.core.ingest import save_stats
+from app.core.retention import StatsCompactor
+from app.db.models import Service, ServiceStats, RefreshFrequency
+
+@pytest.fixture
+def service(test_db, test_user):
+    service = Service(
+        id=uuid.uuid4(),
+        name="Archive",
+        url="https://example.com",
+        refresh_frequency=RefreshFrequency.ONE_MINUTE,
+        user_id=test_user.id
+    )
+    test_db.add(service)
+    test_db.commit()
+    return service
+
+def test_months_between():
+    assert months_between(datetime(2024, 11, 15), datetime(2025, 2, 1)) == ["2024-11", "2024-12", "2025-01"]
+    assert months_between(datetime(2025, 1, 31), datetime(2025, 2, 1, 0, 0, 1)) == ["2025-01", "2025-02"]
+
+def test_archive_round_trip_and_dedup():
+    service_id = uuid.uuid4()
+    stats = [
+        ArchivedStat(datetime(2025, 1, 31, 23, 59), True, 120.5, 512),
+        ArchivedStat(datetime(2025, 2, 1, 0, 0, 0, 250), False, None, None),
+    ]
+
+    assert append_to_archive(service_id, stats) == 2
+    # Une archive rejouée après un crash n'ajoute pas de doublons
+    assert append_to_archive(service_id, stats) == 0
+    assert append_to_archive(service_id, [ArchivedStat(datetime(2025, 2, 1, 0, 1), True, 80.0, 10)]) == 1
+
+    assert read_archive(service_id, datetime(2025, 1, 1), datetime(2025, 3, 1)) == stats + [
+        ArchivedStat(datetime(2025, 2, 1, 0, 1), True, 80.0, 10)
+    ]
+    assert read_archive(service_id, datetime(2025, 2, 1), datetime(2025, 2, 1, 0, 1)) == stats[1:]
+
+def test_archive_appends_members_and_drops_interrupted_ones():
+    service_id = uuid.uuid4()
+    first = [ArchivedStat(datetime(2025, 1, 1), True, 1.0, None)]
+    append_to_archive(service_id, first)
+    path = archive_path(service_id, "2025-01")
+    with open(path, "rb") as archive:
+        written = archive.read()
+
+    # Ajout interrompu avant la mise à jour de l'index
+    with open(path, "ab") as archive:
+        archive.write(b"torn member")
+    second = [ArchivedStat(datetime(2025, 1, 2), False, None, 7)]
+    assert append_to_archive(service_id, second) == 1
+
+    with open(path, "rb") as archive:
+        assert archive.read().startswith(written)  # Les membres précédents ne sont pas réécrits
+    assert read_archive(service_id, datetime(2025, 1, 1), datetime(2025, 2, 1)) == first + second
+
+def test_archive_written_before_the_index():
+    service_id = uuid.uuid4()
+    stats = [ArchivedStat(datetime(2025, 1, 1), True, 1.0, None)]
+    path = archive_path(service_id, "2025-01")
+    os.makedirs(os.path.dirname(path))
+    with open(path, "wb") as archive:
+        archive.write(gzip.compress(encode_segment(stats)))
+
+    assert append_to_archive(service_id, stats) == 0
+    assert append_to_archive(service_id, [ArchivedStat(datetime(2025, 1, 3), True, 2.0, None)]) == 1
+    assert os.path.exists(index_path(path))
+    assert len(read_archive(service_id, datetime(2025, 1, 1), datetime(2025, 2, 1))) == 2
+
+def test_archive_reads_are_cached():
+    service_id = uuid.uuid4()
+    append_to_archive(service_id, [ArchivedStat(datetime(2025, 1, 1), True, 1.0, None)])
+    misses = archive_stats()["cache_misses"]
+
+    load_month(service_id, "2025-01")
+    load_month(service_id, "2025-01")
+
+    assert archive_stats()["cache_misses"] == misses + 1
+
+def test_month_cache_is_bounded_by_bytes():
+    service_id = uuid.uuid4()
+    for month in (1, 2, 3):
+        append_to_archive(service_id, [ArchivedStat(datetime(2025, month, 1, 0, i), True, 1.0, None) for i in range(40)])
+    cache = MonthCache(max_bytes=2 * 40 * 25)
+
+    for month in ("2025-01", "2025-02", "2025-03"):
+        path = archive_path(service_id, month)
+        assert len(cache.get(path, os.path.getsize(path)).timestamps) == 40
+
+    assert cache.stats()["cached_months"] == 2 and cache.bytes == 2 * 40 * 25
+    # Un mois complété remplace son ancienne version
+    append_to_archive(service_id, [ArchivedStat(datetime(2025, 3, 2), True, 1.0, None)])
+    path = archive_path(service_id, "2025-03")
+    cache.get(path, os.path.getsize(path))
+    assert cache.stats()["cached_months"] == 1 and cache.bytes == 41 * 25
+
+def test_expire_archives():
+    service_id = uuid.uuid4()
+    append_to_archive(service_id, [ArchivedStat(datetime(2023, 12, 1), True, 1.0, None), ArchivedStat(datetime(2024, 6, 1), True, 1.0, None)])
+
+    files, removed = expire_archives(12, datetime(2025, 3, 1))
+
+    assert files == 1 and removed > 0
+    assert not os.path.exists(archive_path(service_id, "2023-12"))
+    assert os.path.exists(archive_path(service_id, "2024-06"))
+
+@pytest.mark.asyncio
+async def test_compactor_moves_expired_stats_to_archive(test_db, service):
+    now = datetime(2025, 3, 20, 12, 0)
+    old = [ServiceStats(service_key=service.stats_key, status=i % 2 == 0, response_time=100.0 + i, ping_date=now - timedelta(days=30, minutes=i)) for i in range(5)]
+    recent = [ServiceStats(service_key=service.stats_key, status=True, response_time=50.0, ping_date=now - timedelta(hours=1))]
+    save_stats(test_db, old + recent)
+    test_db.commit()
+
+    with patch('app.core.retention.COMPACTION_CHUNK_ROWS', 2), patch('app.core.retention.COMPACTION_PAUSE_SECONDS', 0):
+        report = await StatsCompactor().run(test_db, now=now)
+
+    assert report["rows_archived"] == 5
+    assert test_db.query(ServiceStats).count() == 1
+
+    # Lecture transparente : archive pour le début de la plage, table chaude pour la suite
+    stats = read_stats(test_db, service, now - timedelta(days=31), now)
+    assert len(stats) == 6
+    assert [stat.ping_date for stat in stats] == sorted(stat.ping_date for stat in stats)
+    assert stats[0].response_time == 104.0
@@ -0,0 +1,127 @@
+import asyncio
+import socket
+import pytest
+import httpx
+from unittest.mock import patch
+
+from app.core.dns_cache import DNSCache, CachingDNSTransport
+
+class FakeResolver:
+    def __init__(self, answers):
+        self.answers = answers
+        self.calls = 0
+
+    async def __call__(self, host):
+        self.calls += 1
+        await asyncio.sleep(0)
+        answer = self.answers[host]
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+@pytest.mark.asyncio
+async def test_resolve_uses_cache():
+    resolver = FakeResolver({"example.com": (["93.184.216.34"], 300)})
+    cache = DNSCache(resolver=resolver)
+
+    assert await cache.resolve("example.com") == (["93.184.216.34"], False)
+    assert await cache.resolve("example.com") == (["93.184.216.34"], True)
+    assert resolver.calls == 1
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+@pytest.mark.asyncio
+async def test_resolve_respects_ttl():
+    resolver = FakeResolver({"example.com": (["93.184.216.34"], 60)})
+    cache = DNSCache(resolver=resolver)
+
+    with patch('app.core.dns_cache.time.monotonic', return_value=1000.0):
+        await cache.resolve("example.com")
+    with patch('app.core.dns_cache.time.monotonic', return_value=1059.0):
+        await cache.resolve("example.com")
+    assert resolver.calls == 1
+
+    with patch('app.core.dns_cache.time.monotonic', return_value=1061.0):
+        await cache.resolve("example.com")
+    assert resolver.calls == 2
+
+@pytest.mark.asyncio
+async def test_negative_caching():
+    resolver = FakeResolver({"nope.invalid": socket.gaierror("Name or service not known")})
+    cache = DNSCache(resolver=resolver)
+
+    for _ in range(3):
+        with pytest.raises(httpx.ConnectError):
+            await cache.resolve("nope.invalid")
+
+    assert resolver.calls == 1
+    assert cache.stats()["negative_hits"] == 2
+    assert cache.stats()["failures"] == 1
+
+@pytest.mark.asyncio
+async def test_concurrent_lookups_are_coalesced():
+    resolver = FakeResolver({"example.com": (["93.184.216.34"], 300)})
+    cache = DNSCache(resolver=resolver)
+
+    results = await asyncio.gather(*[cache.resolve("example.com") for _ in range(10)])
+
+    assert resolver.calls == 1
+    assert all(addresses == ["93.184.216.34"] for addresses, _ in results)
+
+@pytest.mark.asyncio
+async def test_transport_connects_to_resolved_address():
+    seen = []
+
+    def handler(request):
+        seen.append((request.url.host, request.headers["host"], request.extensions.get("sni_hostname")))
+        return httpx.Response(200)
+
+    cache = DNSCache(resolver=FakeResolver({"example.com": (["93.184.216.34"], 300)}))
+    transport = CachingDNSTransport(cache, transport=httpx.MockTransport(handler))
+    async with httpx.AsyncClient(transport=transport) as client:
+        response = await client.get("https://example.com/health")
+
+    assert response.status_code == 200
+    assert seen == [("93.184.216.34", "example.com", "example.com")]
+
+@pytest.mark.asyncio
+async def test_transport_reresolves_stale_entry_on_connect_error():
+    resolver = FakeResolver({"example.com": (["10.0.0.1"], 300)})
+    cache = DNSCache(resolver=resolver)
+    await cache.resolve("example.com")
+    resolver.answers["example.com"] = (["10.0.0.2"], 300)
+
+    def handler(request):
+        if request.url.host == "10.0.0.1":
+            raise httpx.ConnectError("Connection refused")
+        return httpx.Response(200)
+
+    transport = CachingDNSTransport(cache, transport=httpx.MockTransport(handler))
+    async with httpx.AsyncClient(transport=transport) as client:
+        response = await client.get("https://example.com/")
+
+    assert response.status_code == 200
+    assert cache.stats()["reresolves"] == 1
+    assert await cache.resolve("example.com") == (["10.0.0.2"], True)
+
+@pytest.mark.asyncio
+async def test_transport_retries_other_address_on_connect_timeout():
+    # L'IP en cache ne répond plus, le DNS renvoie encore les deux adresses
+    resolver = FakeResolver({"example.com": (["10.0.0.1", "10.0.0.2"], 300)})
+    cache = DNSCache(resolver=resolver)
+    await cache.resolve("example.com")
+    seen = []
+
+    def handler(request):
+        seen.append(request.url.host)
+        if request.url.host == "10.0.0.1":
+            raise httpx.ConnectTimeout("Timed out")
+        return httpx.Response(200)
+
+    transport = CachingDNSTransport(cache, transport=httpx.MockTransport(handler))
+    async with httpx.AsyncClient(transport=transport) as client:
+        response = await client.get("https://example.com/")
+
+    assert response.status_code == 200
+    assert seen == ["10.0.0.1", "10.0.0.2"]
+    assert cache.stats()["reresolves"] == 1
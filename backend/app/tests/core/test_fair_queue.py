@@ -0,0 +1,95 @@
+import asyncio
+import time
+import pytest
+
+from app.core.fair_queue import FairScheduler
+
+async def run_checks(scheduler, checks, duration=0.01):
+    """Run (user, kwargs) checks through the scheduler, return the start order and peaks"""
+    order = []
+    active = {}
+    peaks = {}
+
+    async def check(user, kwargs):
+        async with scheduler.slot(user, **kwargs):
+            order.append(user)
+            active[user] = active.get(user, 0) + 1
+            peaks[user] = max(peaks.get(user, 0), active[user])
+            await asyncio.sleep(duration)
+            active[user] -= 1
+
+    await asyncio.gather(*[check(user, kwargs) for user, kwargs in checks])
+    return order, peaks
+
+@pytest.mark.asyncio
+async def test_heavy_user_does_not_starve_light_user():
+    scheduler = FairScheduler(capacity=2)
+    checks = [("heavy", {})] * 100 + [("light", {})] * 5
+
+    order, _ = await run_checks(scheduler, checks)
+
+    # Les 5 checks du petit utilisateur passent parmi les premiers, en alternance
+    last_light = max(i for i, user in enumerate(order) if user == "light")
+    assert last_light < 12
+
+@pytest.mark.asyncio
+async def test_weight_sets_the_share():
+    scheduler = FairScheduler(capacity=1)
+    checks = [("gold", {"weight": 3})] * 40 + [("free", {"weight": 1})] * 40
+
+    order, _ = await run_checks(scheduler, checks, duration=0)
+
+    first = order[:40]
+    assert 28 <= first.count("gold") <= 32
+
+@pytest.mark.asyncio
+async def test_concurrency_cap():
+    scheduler = FairScheduler(capacity=10)
+    checks = [("capped", {"max_concurrent": 2})] * 10 + [("other", {})] * 10
+
+    _, peaks = await run_checks(scheduler, checks)
+
+    assert peaks["capped"] == 2
+    assert peaks["other"] > 2
+
+@pytest.mark.asyncio
+async def test_checks_per_minute_quota():
+    scheduler = FairScheduler(capacity=10)
+    # 600 checks/minute = 10/s, rafale de 10 s : 100 checks immédiats puis 10 par seconde
+    checks = [("quota", {"checks_per_minute": 600})] * 102
+
+    started = time.monotonic()
+    await run_checks(scheduler, checks, duration=0)
+
+    assert time.monotonic() - started >= 0.15
+
+@pytest.mark.asyncio
+async def test_stats_report_lag_per_user():
+    scheduler = FairScheduler(capacity=2)
+    await run_checks(scheduler, [("late", {}), ("on_time", {})], duration=0)
+    scheduler.record_lag("late", 30)
+    scheduler.record_lag("on_time", 1)
+
+    stats = scheduler.stats()
+
+    assert stats["in_use"] == 0
+    assert stats["users"][0]["user_id"] == "late"
+    assert stats["users"][0]["lag_p95_seconds"] == 30
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_releases_nothing():
+    scheduler = FairScheduler(capacity=1)
+
+    async def hold():
+        async with scheduler.slot("a"):
+            await asyncio.sleep(0.05)
+
+    holder = asyncio.create_task(hold())
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(hold())
+    await asyncio.sleep(0)
+    waiter.cancel()
+    await holder
+
+    assert scheduler.in_use == 0
+    assert scheduler.stats()["queued"] == 0
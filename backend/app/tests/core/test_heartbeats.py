@@ -0,0 +1,83 @@
+import time
+import uuid
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import patch, AsyncMock
+
+from app.core.heartbeats import HeartbeatTracker, scan_missed_heartbeats, heartbeat_deadline, DEFAULT_HEARTBEAT_GRACE_SECONDS
+from app.db.models import Service, ServiceStats, RefreshFrequency, CheckType
+
+def make_heartbeat_service(test_db, test_user, token="job-token", interval=300):
+    service = Service(
+        id=uuid.uuid4(),
+        name="Nightly job",
+        url=f"/heartbeat/{token}",
+        refresh_frequency=RefreshFrequency.CUSTOM,
+        interval_seconds=interval,
+        user_id=test_user.id,
+        check_type=CheckType.HEARTBEAT,
+        heartbeat_token=token,
+        created_at=datetime.utcnow() - timedelta(hours=1)
+    )
+    test_db.add(service)
+    test_db.commit()
+    return service
+
+def test_check_in_is_memory_only():
+    tracker = HeartbeatTracker()
+    service_id = uuid.uuid4()
+    tracker.register("token", service_id)
+
+    start = time.perf_counter()
+    for _ in range(10000):
+        assert tracker.check_in("token")
+    elapsed = time.perf_counter() - start
+
+    assert not tracker.check_in("unknown")
+    assert tracker.stats()["pending"] == 1
+    assert elapsed < 0.5
+
+@pytest.mark.asyncio
+async def test_flush_writes_one_stat_per_service(test_db, test_user):
+    service = make_heartbeat_service(test_db, test_user)
+    tracker = HeartbeatTracker()
+    tracker.load_tokens(test_db)
+    for _ in range(100):
+        tracker.check_in("job-token")
+
+    assert await tracker.flush(test_db) == 1
+    assert await tracker.flush(test_db) == 0
+
+    test_db.refresh(service)
+    assert service.last_heartbeat_at is not None
+    assert test_db.query(ServiceStats).filter(ServiceStats.service_key == service.stats_key, ServiceStats.status.is_(True)).count() == 1
+
+@pytest.mark.asyncio
+async def test_missed_deadline_is_flagged_once_then_recovers(test_db, test_user):
+    service = make_heartbeat_service(test_db, test_user)
+    service.last_heartbeat_at = datetime.utcnow() - timedelta(seconds=300 + DEFAULT_HEARTBEAT_GRACE_SECONDS + 5)
+    test_db.commit()
+    tracker = HeartbeatTracker()
+    tracker.load_tokens(test_db)
+
+    with patch('app.core.heartbeats.send_service_notification', new_callable=AsyncMock) as notify:
+        assert await scan_missed_heartbeats(test_db) == 1
+        assert await scan_missed_heartbeats(test_db) == 0
+        assert notify.call_args.args[2] is True  # is_down
+
+        tracker.check_in("job-token")
+        await tracker.flush(test_db)
+        assert notify.call_count == 2
+        assert notify.call_args.args[2] is False
+
+    test_db.refresh(service)
+    assert service.heartbeat_missed_at is None
+    statuses = [stat.status for stat in test_db.query(ServiceStats).filter(ServiceStats.service_key == service.stats_key).order_by(ServiceStats.ping_date)]
+    assert statuses == [False, True]
+
+def test_deadline_uses_interval_and_grace(test_db, test_user):
+    service = make_heartbeat_service(test_db, test_user, interval=60)
+    service.heartbeat_grace_seconds = 30
+    service.last_heartbeat_at = datetime(2025, 1, 1, 12, 0, 0)
+
+    assert heartbeat_deadline(service) == datetime(2025, 1, 1, 12, 1, 30)
@@ -0,0 +1,64 @@
+import uuid
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from app.core.heatmap import latency_band, latency_heatmap, heatmap_resolution, LATENCY_BANDS_MS
+from app.core.ingest import save_stats
+from app.db.migrations import backfill_latency_histograms
+from app.db.models import Service, ServiceStats, LatencyHistogram, RefreshFrequency
+
+NOW = datetime(2025, 3, 1, 12, 30, 0)
+
+@pytest.fixture
+def service(test_db, test_user):
+    service = Service(
+        id=uuid.uuid4(),
+        name="Heatmap",
+        url="https://example.com",
+        refresh_frequency=RefreshFrequency.ONE_MINUTE,
+        user_id=test_user.id
+    )
+    test_db.add(service)
+    test_db.commit()
+    return service
+
+def stats(service, response_times, start=NOW, step=timedelta(seconds=20)):
+    return [
+        ServiceStats(service_key=service.stats_key, status=response_time is not None, response_time=response_time, ping_date=start + i * step)
+        for i, response_time in enumerate(response_times)
+    ]
+
+def test_log_scale_bands():
+    assert [latency_band(time) for time in (0, 9.9, 10, 99, 100, 1999, 2000, 10000, 60000)] == [0, 0, 1, 3, 4, 7, 8, 10, 10]
+    assert len(LATENCY_BANDS_MS) + 1 == 11
+
+def test_bimodal_latency_kept_per_bucket(test_db, service):
+    # Moyenne à ~1 s, mais aucun check autour d'1 s
+    save_stats(test_db, stats(service, [80, 1900, 85, None, 90, 1950]))
+    test_db.commit()
+
+    columns = latency_heatmap(test_db, service, NOW, NOW + timedelta(hours=1), 60)
+    assert [bucket for bucket, _ in columns] == [NOW, NOW + timedelta(minutes=1)]
+    assert columns[0][1][3] == 2 and columns[0][1][7] == 1
+    assert sum(columns[1][1]) == 2  # Le check sans temps de réponse n'est pas compté
+    hour = latency_heatmap(test_db, service, NOW, NOW + timedelta(hours=1), 3600)
+    assert hour == [(datetime(2025, 3, 1, 12, 0), [0, 0, 0, 3, 0, 0, 0, 2, 0, 0, 0])]
+
+def test_backfill_matches_ingest(test_db, service):
+    test_db.add_all(stats(service, [80, 1900, 85]))
+    test_db.commit()
+    backfill_latency_histograms(test_db.connection())
+    test_db.commit()
+    save_stats(test_db, stats(service, [95], start=NOW + timedelta(seconds=5)))
+    test_db.commit()
+
+    assert latency_heatmap(test_db, service, NOW, NOW + timedelta(minutes=1), 60)[0][1][3] == 3
+    assert test_db.query(LatencyHistogram).count() == 4
+
+def test_resolution_follows_range_and_retention():
+    with patch('app.core.heatmap.settings.STATS_RETENTION', "raw=7d,minute=30d,hour=forever"):
+        assert heatmap_resolution(NOW - timedelta(hours=24), NOW, now=NOW) == 60
+        assert heatmap_resolution(NOW - timedelta(days=30), NOW, now=NOW) == 3600
+        # Rollups minute déjà supprimés au début de la plage
+        assert heatmap_resolution(NOW - timedelta(days=32), NOW - timedelta(days=31), now=NOW) == 3600
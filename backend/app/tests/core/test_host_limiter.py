@@ -0,0 +1,78 @@
+import asyncio
+import uuid
+import pytest
+
+from app.core.host_limiter import HostLimiter
+from app.core.monitor import interleave_by_host
+from app.db.models import Service, RefreshFrequency
+
+async def run_probes(limiter, targets, duration=0.05):
+    active = {}
+    peaks = {}
+    finished = []
+
+    async def probe(name, host, address=None):
+        async with limiter.slot(host, address):
+            active[host] = active.get(host, 0) + 1
+            peaks[host] = max(peaks.get(host, 0), active[host])
+            await asyncio.sleep(duration)
+            active[host] -= 1
+        finished.append((name, asyncio.get_running_loop().time()))
+
+    await asyncio.gather(*[probe(*target) for target in targets])
+    return peaks, finished
+
+@pytest.mark.asyncio
+async def test_per_host_limit():
+    limiter = HostLimiter(per_host=2, per_ip=10, min_interval=0)
+    targets = [(f"p{i}", "busy.example.com") for i in range(10)]
+
+    peaks, _ = await run_probes(limiter, targets)
+
+    assert peaks["busy.example.com"] == 2
+    assert limiter.stats()["active_hosts"] == 0
+
+@pytest.mark.asyncio
+async def test_per_ip_limit_across_virtual_hosts():
+    limiter = HostLimiter(per_host=10, per_ip=1, min_interval=0)
+    targets = [(f"p{i}", f"site{i}.example.com", "10.0.0.1") for i in range(3)]
+
+    start = asyncio.get_running_loop().time()
+    _, finished = await run_probes(limiter, targets, duration=0.05)
+
+    assert max(t for _, t in finished) - start >= 0.15
+
+@pytest.mark.asyncio
+async def test_throttled_host_does_not_slow_other_hosts():
+    limiter = HostLimiter(per_host=1, per_ip=10, min_interval=0)
+    targets = [(f"busy{i}", "busy.example.com") for i in range(5)] + [("other", "other.example.com")]
+
+    start = asyncio.get_running_loop().time()
+    _, finished = await run_probes(limiter, targets, duration=0.05)
+
+    finish_times = dict(finished)
+    assert finish_times["other"] - start < 0.1
+    assert limiter.stats()["throttled"] >= 4
+
+@pytest.mark.asyncio
+async def test_politeness_interval():
+    limiter = HostLimiter(per_host=5, per_ip=10, min_interval=0.05)
+    starts = []
+
+    async def probe():
+        async with limiter.slot("example.com"):
+            starts.append(asyncio.get_running_loop().time())
+
+    await asyncio.gather(*[probe() for _ in range(3)])
+
+    assert starts[2] - starts[0] >= 0.09
+
+def test_interleave_by_host():
+    def service(url):
+        return Service(id=uuid.uuid4(), name=url, url=url, refresh_frequency=RefreshFrequency.ONE_MINUTE)
+
+    services = [service(f"https://a.com/{i}") for i in range(3)] + [service("https://b.com/"), service("https://c.com/")]
+
+    ordered = [s.url for s in interleave_by_host(services)]
+
+    assert ordered == ["https://a.com/0", "https://b.com/", "https://c.com/", "https://a.com/1", "https://a.com/2"]
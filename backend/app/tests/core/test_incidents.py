@@ -0,0 +1,96 @@
+import uuid
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from app.core.ingest import save_stats
+from app.core.incidents import service_incidents, downtime, uptime_percentage
+from app.db.migrations import backfill_incidents
+from app.db.models import Service, ServiceStats, Incident, RegionResult, RefreshFrequency
+
+NOW = datetime(2025, 3, 1, 12, 0)
+
+@pytest.fixture
+def service(test_db, test_user):
+    service = Service(
+        id=uuid.uuid4(),
+        name="Incidents",
+        url="https://example.com",
+        refresh_frequency=RefreshFrequency.ONE_MINUTE,
+        user_id=test_user.id
+    )
+    test_db.add(service)
+    test_db.commit()
+    return service
+
+def stats(service, statuses, start=NOW):
+    return [
+        ServiceStats(service_key=service.stats_key, status=status, response_time=100.0, ping_date=start + timedelta(minutes=i))
+        for i, status in enumerate(statuses)
+    ]
+
+def test_incident_opened_on_down_and_closed_on_recovery(test_db, service):
+    save_stats(test_db, stats(service, [True, False, False]))
+    test_db.commit()
+    incident = test_db.query(Incident).one()
+    assert (incident.started_at, incident.ended_at, incident.down_checks) == (NOW + timedelta(minutes=1), None, 2)
+
+    # Le lot suivant complète l'incident ouvert puis le ferme
+    save_stats(test_db, stats(service, [False, True, True], start=NOW + timedelta(minutes=3)))
+    test_db.commit()
+    incident = test_db.query(Incident).one()
+    assert incident.ended_at == NOW + timedelta(minutes=4)
+    assert incident.down_checks == 3
+    assert incident.duration == timedelta(minutes=3)
+
+def test_incident_opened_only_on_quorum_down(test_db, service):
+    for region in ("eu-west", "us-east"):
+        test_db.add(RegionResult(service_id=service.id, region=region, status=True, ping_date=NOW))
+    test_db.commit()
+
+    with patch('app.core.incidents.settings.AGENT_TOKENS', "eu-west=eu-token,us-east=us-token"):
+        # Les deux régions voient le service up : la panne locale n'ouvre pas d'incident
+        save_stats(test_db, stats(service, [False], start=NOW + timedelta(seconds=30)))
+        test_db.commit()
+        assert test_db.query(Incident).count() == 0
+
+        test_db.add(RegionResult(service_id=service.id, region="eu-west", status=False, ping_date=NOW + timedelta(minutes=1)))
+        test_db.commit()
+        save_stats(test_db, stats(service, [False], start=NOW + timedelta(minutes=1, seconds=30)))
+        test_db.commit()
+
+    incident = test_db.query(Incident).one()
+    assert incident.started_at == NOW + timedelta(minutes=1, seconds=30)
+
+def test_one_incident_per_outage(test_db, service):
+    save_stats(test_db, stats(service, [False, True, False, False, True, False]))
+    test_db.commit()
+
+    incidents = service_incidents(test_db, service.id, NOW, NOW + timedelta(hours=1))
+    assert [(incident.down_checks, incident.ended_at is None) for incident in incidents] == [(1, True), (2, False), (1, False)]
+
+def test_uptime_from_incident_intervals(test_db, service):
+    save_stats(test_db, stats(service, [True] * 10 + [False] * 6 + [True] * 44))
+    test_db.commit()
+    start, end = NOW, NOW + timedelta(hours=1)
+    incidents = service_incidents(test_db, service.id, start, end)
+
+    assert downtime(incidents, start, end) == timedelta(minutes=6)
+    assert uptime_percentage(incidents, start, end) == 90.0
+    # Seule la partie de l'incident dans la fenêtre compte
+    assert downtime(incidents, NOW + timedelta(minutes=13), end) == timedelta(minutes=3)
+
+def test_backfill_matches_ingest(test_db, service):
+    statuses = [True, False, False, True, False, True, True, False]
+    save_stats(test_db, stats(service, statuses))
+    test_db.commit()
+    ingested = [(i.started_at, i.ended_at, i.down_checks) for i in test_db.query(Incident).order_by(Incident.started_at)]
+
+    test_db.query(Incident).delete()
+    test_db.commit()
+    backfill_incidents(test_db.connection())
+    test_db.commit()
+
+    backfilled = [(i.started_at, i.ended_at, i.down_checks) for i in test_db.query(Incident).order_by(Incident.started_at)]
+    assert backfilled == ingested
+    assert len(backfilled) == 3
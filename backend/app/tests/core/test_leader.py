@@ -0,0 +1,32 @@
+from datetime import datetime, timedelta
+
+from app.core.leader import LeaderElection, LEASE_SECONDS
+
+def test_single_leader(test_db):
+    first, second = LeaderElection(), LeaderElection()
+
+    assert first.renew(test_db)
+    assert not second.renew(test_db)
+    assert first.renew(test_db)  # Renouvellement par le leader
+    assert first.is_leader() and not second.is_leader()
+
+def test_failover_after_lease_expiry(test_db):
+    first, second = LeaderElection(), LeaderElection()
+    now = datetime.utcnow()
+    assert first.renew(test_db, now)
+
+    # Le leader ne renouvelle plus : il cesse d'agir dès l'expiration de son bail
+    later = now + timedelta(seconds=LEASE_SECONDS + 1)
+    assert not first.is_leader(later)
+    assert second.renew(test_db, later)
+    assert not first.renew(test_db, later)
+
+def test_release_hands_over_at_once(test_db):
+    first, second = LeaderElection(), LeaderElection()
+    assert first.renew(test_db)
+
+    first.release(test_db)
+
+    assert not first.is_leader()
+    assert second.renew(test_db)
+    assert second.stats(test_db)["leader"] == second.holder_id
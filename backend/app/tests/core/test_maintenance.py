@@ -0,0 +1,58 @@
+import sqlite3
+import uuid
+from datetime import datetime, timedelta
+from sqlalchemy import text
+
+from app.core.ingest import save_stats
+from app.core.maintenance import DatabaseMaintenance, CONFIG_SCHEMA
+from app.db.models import Service, ServiceStats, RefreshFrequency
+from app.db.session import TIMESERIES_SCHEMA
+
+def add_service(test_db, test_user):
+    service = Service(
+        id=uuid.uuid4(),
+        name="Maintenance",
+        url="https://example.com",
+        refresh_frequency=RefreshFrequency.ONE_MINUTE,
+        user_id=test_user.id
+    )
+    test_db.add(service)
+    test_db.commit()
+    return service
+
+def test_checkpoints_are_per_database(test_db):
+    maintenance = DatabaseMaintenance()
+    assert maintenance.checkpoint(test_db, TIMESERIES_SCHEMA)
+
+    assert maintenance.checkpoints == {CONFIG_SCHEMA: 0, TIMESERIES_SCHEMA: 1}
+    assert maintenance.last_checkpoint[CONFIG_SCHEMA] is None
+
+def test_incremental_vacuum_releases_freed_pages(test_db, test_user):
+    service = add_service(test_db, test_user)
+    start = datetime(2025, 3, 1)
+    save_stats(test_db, [
+        ServiceStats(service_key=service.stats_key, status=True, response_time=100.0, bytes_read=1000, ping_date=start + timedelta(seconds=i))
+        for i in range(20000)
+    ])
+    test_db.commit()
+    test_db.query(ServiceStats).delete()
+    test_db.commit()
+    assert test_db.execute(text(f"PRAGMA {TIMESERIES_SCHEMA}.freelist_count")).scalar() > 10
+
+    released = DatabaseMaintenance().vacuum_timeseries(test_db, pages=10)
+
+    assert released == 10
+
+def test_config_backup_leaves_out_time_series(test_db, test_user, tmp_path):
+    service = add_service(test_db, test_user)
+    save_stats(test_db, [ServiceStats(service_key=service.stats_key, status=True, response_time=100.0, ping_date=datetime.utcnow())])
+    test_db.commit()
+
+    path = str(tmp_path / "config.db")
+    assert DatabaseMaintenance().backup_config(test_db, path) > 0
+
+    backup = sqlite3.connect(path)
+    tables = {name for name, in backup.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert "services" in tables and "service_stats" not in tables
+    assert backup.execute("SELECT count(*) FROM services").fetchone()[0] == 1
+    backup.close()
@@ -1,17 +1,23 @@
+import time
 import uuid
 import pytest
 from datetime import datetime, timedelta
 import asyncio
+import httpx
 from unittest.mock import Mock, patch, AsyncMock
 from httpx import TimeoutException, HTTPError
 from app.core.monitor import (
     ping_service,
     process_service_batch,
     check_services,
+    sync_schedule,
     should_check_service,
+    ProbeResult,
     MAX_CONCURRENT_REQUESTS
 )
-from app.db.models import Service, ServiceStats, RefreshFrequency
+from app.core.scheduling import CheckSchedule
+from app.core.timeouts import TimeoutCache
+from app.db.models import Service, ServiceStats, RefreshFrequency, ProbeMethod
 
 # Fixtures
 @pytest.fixture
@@ -38,40 +44,110 @@ def mock_services(test_user):
     ]
 
 # Tests pour ping_service
+def mock_transport(handler):
+    return patch('app.core.monitor.get_probe_transport', return_value=httpx.MockTransport(handler))
+
 @pytest.mark.asyncio
 async def test_ping_service_success(mock_service):
-    with patch('httpx.AsyncClient.get') as mock_get:
-        mock_get.return_value = Mock(status_code=200)
-        status, response_time = await ping_service(mock_service)
+    with mock_transport(lambda request: httpx.Response(200, content=b"ok")):
+        status, response_time, bytes_read, status_code = await ping_service(mock_service)
         
         assert status is True
         assert isinstance(response_time, float)
         assert response_time > 0
+        assert status_code == 200
 
 @pytest.mark.asyncio
 async def test_ping_service_failure(mock_service):
-    with patch('httpx.AsyncClient.get') as mock_get:
-        mock_get.return_value = Mock(status_code=500)
-        status, response_time = await ping_service(mock_service)
+    with mock_transport(lambda request: httpx.Response(500)):
+        result = await ping_service(mock_service)
         
-        assert status is False
-        assert isinstance(response_time, float)
+        assert result.status is False
+        assert isinstance(result.response_time, float)
 
 @pytest.mark.asyncio
 async def test_ping_service_timeout(mock_service):
-    with patch('httpx.AsyncClient.get', side_effect=TimeoutException("Timeout")):
-        status, response_time = await ping_service(mock_service)
+    def handler(request):
+        raise TimeoutException("Timeout")
+
+    with mock_transport(handler):
+        result = await ping_service(mock_service)
         
-        assert status is False
-        assert response_time is None
+        assert result.status is False
+        assert result.response_time is None
 
 @pytest.mark.asyncio
 async def test_ping_service_connection_error(mock_service):
-    with patch('httpx.AsyncClient.get', side_effect=HTTPError("Connection failed")):
-        status, response_time = await ping_service(mock_service)
+    def handler(request):
+        raise httpx.ConnectError("Connection failed")
+
+    with mock_transport(handler):
+        result = await ping_service(mock_service)
         
-        assert status is False
-        assert response_time is None
+        assert result.status is False
+        assert result.response_time is None
+
+@pytest.mark.asyncio
+async def test_ping_service_body_limit(mock_service):
+    chunks_sent = []
+
+    async def body():
+        for _ in range(100):
+            chunks_sent.append(1)
+            yield b"x" * 1024
+
+    mock_service.probe_method = ProbeMethod.GET
+    mock_service.probe_body_limit = 4 * 1024
+    with mock_transport(lambda request: httpx.Response(200, content=body())):
+        result = await ping_service(mock_service)
+
+    assert result.status is True
+    assert result.bytes_read == 4 * 1024
+    assert len(chunks_sent) < 100  # Le reste du corps n'est jamais lu
+
+@pytest.mark.asyncio
+async def test_ping_service_head(mock_service):
+    methods = []
+
+    def handler(request):
+        methods.append(request.method)
+        return httpx.Response(200)
+
+    mock_service.probe_method = ProbeMethod.HEAD
+    with mock_transport(handler):
+        result = await ping_service(mock_service)
+
+    assert methods == ["HEAD"]
+    assert result.status is True
+    assert result.bytes_read == 0
+
+@pytest.mark.asyncio
+async def test_ping_service_head_fallback_to_get_headers(mock_service):
+    methods = []
+
+    def handler(request):
+        methods.append(request.method)
+        if request.method == "HEAD":
+            return httpx.Response(405)
+        return httpx.Response(200, content=b"x" * 10_000)
+
+    mock_service.probe_method = ProbeMethod.HEAD
+    with mock_transport(handler):
+        result = await ping_service(mock_service)
+
+    assert methods == ["HEAD", "GET"]
+    assert result.status is True
+    assert result.bytes_read == 0
+
+@pytest.mark.asyncio
+async def test_process_service_batch_records_bytes_read(mock_service, test_db):
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+
+    with patch('app.core.monitor.ping_service', new_callable=AsyncMock) as mock_ping:
+        mock_ping.return_value = ProbeResult(True, 100.0, 2048, 200)
+        results = await process_service_batch([mock_service], semaphore, test_db)
+
+    assert results[0].bytes_read == 2048
 
 # Tests pour process_service_batch
 @pytest.mark.asyncio
@@ -79,7 +155,7 @@ async def test_process_service_batch(mock_services, test_db):
     semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
     
     with patch('app.core.monitor.ping_service', new_callable=AsyncMock) as mock_ping:
-        mock_ping.return_value = (True, 100.0)
+        mock_ping.return_value = ProbeResult(True, 100.0)
         results = await process_service_batch(mock_services, semaphore, test_db)
         
         assert len(results) == len(mock_services)
@@ -94,8 +170,8 @@ async def test_process_service_batch_with_mixed_results(mock_services, test_db):
     
     async def mock_ping_with_varying_results(service):
         if "1" in service.url:
-            return False, None
-        return True, 100.0
+            return ProbeResult(False, None)
+        return ProbeResult(True, 100.0)
     
     with patch('app.core.monitor.ping_service', side_effect=mock_ping_with_varying_results):
         results = await process_service_batch(mock_services, semaphore, test_db)
@@ -110,14 +186,14 @@ def test_should_check_service_no_previous_stats(mock_service):
     assert should_check_service(mock_service, None, current_time) is True
 
 def test_should_check_service_due_for_check():
-    service = Mock(refresh_frequency=RefreshFrequency.ONE_MINUTE)
+    service = Mock(refresh_frequency=RefreshFrequency.ONE_MINUTE, interval_seconds=None, effective_interval=None, shared_probe=False)
     last_stat = Mock(ping_date=datetime.utcnow() - timedelta(minutes=2))
     current_time = datetime.utcnow()
     
     assert should_check_service(service, last_stat, current_time) is True
 
 def test_should_check_service_not_due():
-    service = Mock(refresh_frequency=RefreshFrequency.ONE_HOUR)
+    service = Mock(refresh_frequency=RefreshFrequency.ONE_HOUR, interval_seconds=None, effective_interval=None, shared_probe=False)
     last_stat = Mock(ping_date=datetime.utcnow() - timedelta(minutes=30))
     current_time = datetime.utcnow()
     
@@ -138,7 +214,7 @@ async def test_check_services_with_services(test_db, mock_services):
     test_db.commit()
     
     with patch('app.core.monitor.ping_service', new_callable=AsyncMock) as mock_ping:
-        mock_ping.return_value = (True, 100.0)
+        mock_ping.return_value = ProbeResult(True, 100.0)
         await check_services(test_db)
         
         stats = test_db.query(ServiceStats).all()
@@ -167,7 +243,7 @@ async def test_check_services_respects_frequency(test_db, mock_service):
     
     # Ajoute une stat récente
     recent_stat = ServiceStats(
-        service_id=mock_service.id,
+        service=mock_service,
         status=True,
         response_time=100.0,
         ping_date=datetime.utcnow() - timedelta(seconds=30)
@@ -202,10 +278,21 @@ async def test_check_services_batch_processing(test_db, test_user):
     test_db.commit()
     
     with patch('app.core.monitor.ping_service', new_callable=AsyncMock) as mock_ping:
-        mock_ping.return_value = (True, 100.0)
+        mock_ping.return_value = ProbeResult(True, 100.0)
         await check_services(test_db)
         
         stats = test_db.query(ServiceStats).all()
         assert len(stats) == 100
         # Vérifie que les services ont été traités par lots
-        assert mock_ping.call_count == 100 
\ No newline at end of file
+        assert mock_ping.call_count == 100 
+
+def test_sync_schedule_refreshes_stale_timeouts(test_db, mock_service):
+    test_db.add(mock_service)
+    test_db.commit()
+    schedule = CheckSchedule()
+
+    with patch('app.core.monitor.timeout_cache', TimeoutCache()) as cache:
+        sync_schedule(test_db, time.time(), schedule)
+
+        assert cache.refreshed_at is not None
+    assert schedule.known(mock_service.id)
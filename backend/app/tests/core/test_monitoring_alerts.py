@@ -12,7 +12,8 @@ from app.db.models import (
     NotificationMethod,
     AlertFrequency
 )
-from app.core.monitor import check_services
+from app.core.monitor import check_services, ProbeResult
+from app.core.notifications import send_alert, Alerter
 
 @pytest.fixture
 def mock_service_notify_recovery_always(test_db: Session):    
@@ -67,7 +68,7 @@ async def test_first_ping_service_down(test_db: Session, mock_service_notify_rec
     with patch('app.core.monitor.ping_service', new_callable=AsyncMock) as mock_ping, \
          patch('app.core.notifications.send_slack_notification', new_callable=AsyncMock) as mock_slack:
         
-        mock_ping.return_value = (False, None)  # Service down
+        mock_ping.return_value = ProbeResult(False, None)  # Service down
         mock_slack.return_value = True
         
         await check_services(test_db)
@@ -82,7 +83,7 @@ async def test_first_ping_service_up(test_db: Session, mock_service_notify_recov
     with patch('app.core.monitor.ping_service', new_callable=AsyncMock) as mock_ping, \
          patch('app.core.notifications.send_slack_notification', new_callable=AsyncMock) as mock_slack:
         
-        mock_ping.return_value = (True, 100.0)  # Service up
+        mock_ping.return_value = ProbeResult(True, 100.0)  # Service up
         
         await check_services(test_db)
         
@@ -95,7 +96,7 @@ async def test_transition_up_to_down(test_db: Session, mock_service_notify_recov
     
     # Créer un historique "up"
     initial_stat = ServiceStats(
-        service_id=service.id,
+        service_key=service.stats_key,
         status=True,
         response_time=100.0,
         ping_date=datetime.utcnow() - timedelta(minutes=5)
@@ -106,7 +107,7 @@ async def test_transition_up_to_down(test_db: Session, mock_service_notify_recov
     with patch('app.core.monitor.ping_service', new_callable=AsyncMock) as mock_ping, \
          patch('app.core.notifications.send_slack_notification', new_callable=AsyncMock) as mock_slack:
         
-        mock_ping.return_value = (False, None)  # Service down
+        mock_ping.return_value = ProbeResult(False, None)  # Service down
         mock_slack.return_value = True
         
         await check_services(test_db)
@@ -121,7 +122,7 @@ async def test_recovery_notification(test_db: Session, mock_service_notify_recov
     
     # Créer un historique "down"
     initial_stat = ServiceStats(
-        service_id=service.id,
+        service_key=service.stats_key,
         status=False,
         response_time=None,
         ping_date=datetime.utcnow() - timedelta(minutes=5)
@@ -132,7 +133,7 @@ async def test_recovery_notification(test_db: Session, mock_service_notify_recov
     with patch('app.core.monitor.ping_service', new_callable=AsyncMock) as mock_ping, \
          patch('app.core.notifications.send_slack_notification', new_callable=AsyncMock) as mock_slack:
         
-        mock_ping.return_value = (True, 100.0)  # Service up
+        mock_ping.return_value = ProbeResult(True, 100.0)  # Service up
         mock_slack.return_value = True
         
         await check_services(test_db)
@@ -147,7 +148,7 @@ async def test_no_recovery_notification(test_db: Session, mock_service_notify_no
     
     # Créer un historique "down"
     initial_stat = ServiceStats(
-        service_id=service.id,
+        service_key=service.stats_key,
         status=False,
         response_time=None,
         ping_date=datetime.utcnow() - timedelta(minutes=5)
@@ -158,7 +159,7 @@ async def test_no_recovery_notification(test_db: Session, mock_service_notify_no
     with patch('app.core.monitor.ping_service', new_callable=AsyncMock) as mock_ping, \
          patch('app.core.notifications.send_slack_notification', new_callable=AsyncMock) as mock_slack:
         
-        mock_ping.return_value = (True, 100.0)  # Service up
+        mock_ping.return_value = ProbeResult(True, 100.0)  # Service up
         
         await check_services(test_db)
         
@@ -172,7 +173,7 @@ async def test_service_down_daily_alert(test_db: Session, mock_service_notify_no
     with patch('app.core.monitor.ping_service', new_callable=AsyncMock) as mock_ping, \
          patch('app.core.notifications.send_slack_notification', new_callable=AsyncMock) as mock_slack:
         
-        mock_ping.return_value = (False, None)  # Service down
+        mock_ping.return_value = ProbeResult(False, None)  # Service down
         mock_slack.return_value = True
         
         # Premier check - devrait envoyer une alerte
@@ -195,7 +196,7 @@ async def test_service_down_daily_alert(test_db: Session, mock_service_notify_no
         
         # Update the last ping date
         last_stat = test_db.query(ServiceStats)\
-            .filter(ServiceStats.service_id == service.id)\
+            .filter(ServiceStats.service_key == service.stats_key)\
             .order_by(ServiceStats.ping_date.desc())\
             .first()
         last_stat.ping_date = past_time
@@ -217,14 +218,14 @@ async def test_service_down_always_alert(test_db: Session, mock_service_notify_r
     with patch('app.core.monitor.ping_service', new_callable=AsyncMock) as mock_ping, \
          patch('app.core.notifications.send_slack_notification', new_callable=AsyncMock) as mock_slack:
         
-        mock_ping.return_value = (False, None)  # Service down
+        mock_ping.return_value = ProbeResult(False, None)  # Service down
         mock_slack.return_value = True
         
         # Multiple checks - devrait envoyer une alerte à chaque fois
         for _ in range(3):
             # Update the last ping date
             last_stat = test_db.query(ServiceStats)\
-                .filter(ServiceStats.service_id == service.id)\
+                .filter(ServiceStats.service_key == service.stats_key)\
                 .order_by(ServiceStats.ping_date.desc())\
                 .first()
             if last_stat:
@@ -243,15 +244,15 @@ async def test_multiple_services_monitoring(test_db: Session, mock_service_notif
          patch('app.core.notifications.send_slack_notification', new_callable=AsyncMock) as mock_slack:
         
         # Premier check - les deux services down
-        mock_ping.side_effect = [(False, None), (False, None)]  # Service 1 & 2 down
+        mock_ping.side_effect = [ProbeResult(False, None), ProbeResult(False, None)]  # Service 1 & 2 down
         await check_services(test_db)
         assert mock_slack.call_count == 2  # Une alerte pour chaque service
         
         # Deuxième check - toujours down
-        mock_ping.side_effect = [(False, None), (False, None)]  # Service 1 & 2 still down
+        mock_ping.side_effect = [ProbeResult(False, None), ProbeResult(False, None)]  # Service 1 & 2 still down
         for service in [mock_service_notify_recovery_always, mock_service_notify_no_recovery_daily]:
             last_stat = test_db.query(ServiceStats)\
-                .filter(ServiceStats.service_id == service.id)\
+                .filter(ServiceStats.service_key == service.stats_key)\
                 .order_by(ServiceStats.ping_date.desc())\
                 .first()
             if last_stat:
@@ -264,10 +265,10 @@ async def test_multiple_services_monitoring(test_db: Session, mock_service_notif
         assert mock_slack.call_count == 3  # Une alerte supplémentaire pour le service "always"
         
         # Troisième check - les services reviennent up
-        mock_ping.side_effect = [(True, 100.0), (True, 100.0)]  # Service 1 & 2 up
+        mock_ping.side_effect = [ProbeResult(True, 100.0), ProbeResult(True, 100.0)]  # Service 1 & 2 up
         for service in [mock_service_notify_recovery_always, mock_service_notify_no_recovery_daily]:
             last_stat = test_db.query(ServiceStats)\
-                .filter(ServiceStats.service_id == service.id)\
+                .filter(ServiceStats.service_key == service.stats_key)\
                 .order_by(ServiceStats.ping_date.desc())\
                 .first()
             if last_stat:
@@ -278,4 +279,54 @@ async def test_multiple_services_monitoring(test_db: Session, mock_service_notif
                 test_db.refresh(last_stat)
                 
         await check_services(test_db)
-        assert mock_slack.call_count == 4  # Une seule notification de recovery (service 1)
\ No newline at end of file
+        assert mock_slack.call_count == 4  # Une seule notification de recovery (service 1)
+
+@pytest.mark.asyncio
+async def test_no_recovery_for_unconfirmed_down(test_db: Session, mock_service_notify_recovery_always):
+    """Une panne locale non confirmée par le quorum n'est pas signalée, son retour non plus"""
+    service = mock_service_notify_recovery_always
+
+    with patch('app.core.monitor.ping_service', new_callable=AsyncMock) as mock_ping, \
+         patch('app.core.monitor.settings.AGENT_TOKENS', "eu-west=eu-token"), \
+         patch('app.core.monitor.quorum_is_down', return_value=False), \
+         patch('app.core.notifications.send_slack_notification', new_callable=AsyncMock) as mock_slack:
+        mock_slack.return_value = True
+
+        mock_ping.return_value = ProbeResult(False, None)
+        await check_services(test_db)
+        assert service.unconfirmed_down_at is not None
+
+        last_stat = test_db.query(ServiceStats).filter(ServiceStats.service_key == service.stats_key).one()
+        last_stat.ping_date = datetime.utcnow() - timedelta(minutes=5)
+        test_db.commit()
+        mock_ping.return_value = ProbeResult(True, 100.0)
+        await check_services(test_db)
+
+        mock_slack.assert_not_called()
+    assert service.unconfirmed_down_at is None
+
+@pytest.mark.asyncio
+async def test_send_alert_daily_frequency(mock_service_notify_no_recovery_daily):
+    """Les alertes SLO, de latence et des règles suivent aussi la fréquence quotidienne"""
+    pref = mock_service_notify_no_recovery_daily.notification_preferences
+
+    with patch('app.core.notifications.send_slack_notification', new_callable=AsyncMock) as mock_slack:
+        mock_slack.return_value = True
+
+        assert await send_alert(pref, "🚨 Alert rule triggered", {"Rule": "latency"}) is True
+        assert await send_alert(pref, "🚨 Alert rule triggered", {"Rule": "latency"}) is False
+        assert await send_alert(pref, "🟢 Alert rule resolved", {"Rule": "latency"}, resolved=True) is False  # Pas de notify_on_recovery
+
+        pref.last_alert_time = datetime.utcnow() - timedelta(days=2)
+        assert await send_alert(pref, "🚨 Alert rule triggered", {"Rule": "latency"}) is True
+
+    assert mock_slack.call_count == 2
+    assert mock_slack.call_args[0][1]["blocks"][1]["fields"][0]["text"] == "*Rule:*\nlatency"
+
+def test_alerter_requires_notify():
+    """Un alerter sans notify ne peut pas être instancié"""
+    class Incomplete(Alerter):
+        name = "incomplete"
+
+    with pytest.raises(TypeError):
+        Incomplete()
@@ -0,0 +1,73 @@
+import asyncio
+import time
+import uuid
+import pytest
+from unittest.mock import patch
+
+from app.core.monitor import run_check_pipeline, ProbeResult
+from app.core.pipeline import TokenBucket, PipelineMetrics
+from app.db.models import Service, ServiceStats, RefreshFrequency
+
+@pytest.mark.asyncio
+async def test_token_bucket_limits_rate():
+    bucket = TokenBucket(rate=100, burst=5)
+
+    start = time.monotonic()
+    for _ in range(25):
+        await bucket.acquire()
+    elapsed = time.monotonic() - start
+
+    # 5 jetons immédiats puis 20 à 100/s
+    assert 0.15 <= elapsed < 0.5
+
+@pytest.mark.asyncio
+async def test_token_bucket_set_rate_at_runtime():
+    bucket = TokenBucket(rate=1, burst=1)
+    await bucket.acquire()
+
+    bucket.set_rate(1000, burst=10)
+    start = time.monotonic()
+    for _ in range(10):
+        await bucket.acquire()
+
+    assert time.monotonic() - start < 0.1
+
+def test_pipeline_metrics():
+    metrics = PipelineMetrics()
+    for lag in [0.1, 0.2, 0.3, 5.0]:
+        metrics.record_start(lag)
+        metrics.record_completion()
+
+    stats = metrics.stats()
+
+    assert stats["total_completed"] == 4
+    assert stats["lag_p50_seconds"] == 0.2
+    assert stats["lag_max_seconds"] == 5.0
+
+@pytest.mark.asyncio
+async def test_slow_probe_does_not_hold_the_pipeline(test_db, test_user):
+    services = [
+        Service(
+            id=uuid.uuid4(),
+            name=f"Service {i}",
+            url=f"https://pipeline{i}.example.com",
+            refresh_frequency=RefreshFrequency.ONE_MINUTE,
+            user_id=test_user.id
+        )
+        for i in range(60)
+    ]
+    test_db.add_all(services)
+    test_db.commit()
+    finished = []
+
+    async def fake_ping(service):
+        await asyncio.sleep(0.5 if service is services[0] else 0.01)
+        finished.append(service.id)
+        return ProbeResult(True, 10.0)
+
+    with patch('app.core.monitor.ping_service', side_effect=fake_ping):
+        saved = await run_check_pipeline([(service, None) for service in services], test_db)
+
+    assert saved == 60
+    assert finished[-1] == services[0].id
+    assert test_db.query(ServiceStats).count() == 60
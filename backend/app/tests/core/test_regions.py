@@ -0,0 +1,78 @@
+import asyncio
+import gzip
+import json
+import uuid
+import pytest
+import httpx
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from app.agent import ProbeAgent
+from app.core.monitor import ProbeResult
+from app.core.regions import decode_batch, quorum_down, quorum_is_down, BatchTooLarge, MAX_INGEST_BYTES
+from app.db.models import Service, RegionResult, RefreshFrequency
+from app.main import app
+
+def test_quorum_down():
+    assert quorum_down([False, False, True])
+    assert not quorum_down([False, True])
+    assert not quorum_down([True, True, False])
+
+def test_decode_batch_bounds_decompression():
+    bomb = gzip.compress(b"[" + b" " * (MAX_INGEST_BYTES + 10) + b"]")
+
+    with pytest.raises(BatchTooLarge):
+        decode_batch(bomb, "gzip")
+    assert decode_batch(gzip.compress(json.dumps([{"a": 1}]).encode()), "gzip") == [{"a": 1}]
+
+def test_quorum_is_down_without_agents_uses_local_status(test_db, test_user):
+    service = Service(id=uuid.uuid4(), name="Solo", url="https://solo.example.com", refresh_frequency=RefreshFrequency.ONE_MINUTE, user_id=test_user.id)
+    test_db.add(service)
+    test_db.commit()
+
+    assert quorum_is_down(test_db, service, False)
+
+    # Deux régions voient le service en ligne : la panne locale n'est pas confirmée
+    for region in ["eu-west", "us-east"]:
+        test_db.add(RegionResult(service_id=service.id, region=region, status=True, ping_date=datetime.utcnow() - timedelta(seconds=5)))
+    test_db.commit()
+    assert not quorum_is_down(test_db, service, False)
+
+@pytest.mark.asyncio
+async def test_agent_pulls_probes_and_pushes(client, test_db, test_user):
+    """Bout en bout : l'agent parle à l'API à travers ASGI"""
+    services = [
+        Service(id=uuid.uuid4(), name=f"Agent {i}", url=f"https://agent{i}.example.com", refresh_frequency=RefreshFrequency.ONE_MINUTE, user_id=test_user.id)
+        for i in range(3)
+    ]
+    test_db.add_all(services)
+    test_db.commit()
+
+    with patch('app.core.auth.settings.AGENT_TOKENS', "eu-west=eu-token"), \
+         patch('app.agent.ping_service', return_value=ProbeResult(True, 50.0)):
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app),
+            base_url="http://testserver",
+            headers={"X-Agent-Token": "eu-token"}
+        ) as http_client:
+            agent = ProbeAgent(http_client)
+            await agent.refresh_checks()
+            assert agent.dispatch_due(datetime.utcnow().timestamp() + 1) == 3
+            await asyncio.gather(*agent._tasks)
+            accepted = await agent.push()
+
+    assert accepted == 3
+    assert agent.buffer == []
+    assert test_db.query(RegionResult).filter(RegionResult.region == "eu-west").count() == 3
+
+@pytest.mark.asyncio
+async def test_agent_keeps_results_when_server_is_down():
+    def handler(request):
+        return httpx.Response(503)
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url="http://server") as http_client:
+        agent = ProbeAgent(http_client)
+        agent.buffer = [{"service_id": str(uuid.uuid4())}]
+
+        assert await agent.push() == 0
+        assert len(agent.buffer) == 1
@@ -0,0 +1,212 @@
+import uuid
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from app.core.ingest import save_stats
+from app.core.monitor import calculate_period_stats
+from app.core.retention import parse_retention, bucket_start, delete_expired_histograms, StatsCompactor
+from sqlalchemy import create_engine, text
+from app.db.migrations import backfill_rollups, migrate_stats_storage, columns_of, has_table
+from app.db.session import attach_timeseries, TIMESERIES_SCHEMA
+from app.db.models import Service, ServiceStats, StatsRollup, LatencyHistogram, RegionResult, RefreshFrequency
+
+NOW = datetime(2025, 3, 1, 12, 30, 0)
+
+@pytest.fixture
+def service(test_db, test_user):
+    service = Service(
+        id=uuid.uuid4(),
+        name="Retention",
+        url="https://example.com",
+        refresh_frequency=RefreshFrequency.ONE_MINUTE,
+        user_id=test_user.id
+    )
+    test_db.add(service)
+    test_db.commit()
+    return service
+
+def stat(service, ping_date, status=True, response_time=100.0):
+    return ServiceStats(service_key=service.stats_key, status=status, response_time=response_time, ping_date=ping_date)
+
+def rollup(test_db, service, resolution, start):
+    return test_db.query(StatsRollup).filter(
+        StatsRollup.service_key == service.stats_key,
+        StatsRollup.resolution == resolution,
+        StatsRollup.bucket_start == start
+    ).one()
+
+def test_parse_retention():
+    assert parse_retention("raw=7d,minute=30d,hour=forever") == {
+        "raw": timedelta(days=7), "minute": timedelta(days=30), "hour": None
+    }
+    assert parse_retention("raw=36h")["minute"] is None
+    for spec in ("raw=1h", "daily=30d", "raw=7 days"):
+        with pytest.raises(ValueError):
+            parse_retention(spec)
+
+def test_bucket_start():
+    assert bucket_start(datetime(2025, 3, 1, 12, 34, 56, 789), 60) == datetime(2025, 3, 1, 12, 34)
+    assert bucket_start(datetime(2025, 3, 1, 12, 34, 56, 789), 3600) == datetime(2025, 3, 1, 12, 0)
+
+def test_rollups_are_updated_at_ingest(test_db, service):
+    save_stats(test_db, [stat(service, NOW, response_time=100.0), stat(service, NOW + timedelta(seconds=20), False, None)])
+    save_stats(test_db, [stat(service, NOW + timedelta(seconds=40), response_time=300.0)])
+    test_db.commit()
+
+    minute = rollup(test_db, service, 60, datetime(2025, 3, 1, 12, 30))
+    assert (minute.up_count, minute.down_count) == (2, 1)
+    assert (minute.response_time_sum, minute.response_time_count) == (400.0, 2)
+    assert (minute.response_time_min, minute.response_time_max) == (100.0, 300.0)
+    assert rollup(test_db, service, 3600, datetime(2025, 3, 1, 12, 0)).up_count == 2
+
+def test_backfill_matches_ingest_buckets(test_db, service):
+    test_db.add_all([stat(service, NOW), stat(service, NOW + timedelta(minutes=1), False)])
+    test_db.commit()
+    backfill_rollups(test_db.connection())
+    test_db.commit()
+
+    # Un stat reçu après la migration complète le même bucket
+    save_stats(test_db, [stat(service, NOW + timedelta(seconds=10), response_time=50.0)])
+    test_db.commit()
+
+    minute = rollup(test_db, service, 60, datetime(2025, 3, 1, 12, 30))
+    assert (minute.up_count, minute.response_time_min) == (2, 50.0)
+    hour = rollup(test_db, service, 3600, datetime(2025, 3, 1, 12, 0))
+    assert (hour.up_count, hour.down_count) == (2, 1)
+
+@pytest.mark.asyncio
+async def test_compactor_enforces_tiers_in_chunks(test_db, service):
+    old = [stat(service, NOW - timedelta(days=40, minutes=i)) for i in range(5)]
+    recent = [stat(service, NOW - timedelta(days=1, minutes=i)) for i in range(5)]
+    save_stats(test_db, old + recent)
+    test_db.commit()
+
+    compactor = StatsCompactor()
+    with patch('app.core.retention.COMPACTION_CHUNK_ROWS', 2), \
+            patch('app.core.retention.COMPACTION_PAUSE_SECONDS', 0), \
+            patch('app.core.retention.settings.STATS_RETENTION', "raw=7d,minute=30d,hour=forever"):
+        report = await compactor.run(test_db, now=NOW)
+
+    assert report["rows_deleted"] == {"raw": 5, "minute": 5, "hour": 0}
+    assert report["histogram_rows_deleted"] == 5
+    assert report["bytes_reclaimed"] >= 0
+    assert test_db.query(ServiceStats).count() == 5
+    assert test_db.query(StatsRollup).filter(StatsRollup.resolution == 60).count() == 5
+    assert test_db.query(StatsRollup).filter(StatsRollup.resolution == 3600).count() == 2
+    assert test_db.query(LatencyHistogram).filter(LatencyHistogram.resolution == 60).count() == 5
+    assert compactor.stats()["rows_deleted"]["raw"] == 5
+
+def test_histogram_chunk_counts_band_rows(test_db, service):
+    # Trois bandes dans le même bucket minute
+    save_stats(test_db, [stat(service, NOW - timedelta(days=40, seconds=i), response_time=rt) for i, rt in enumerate((5.0, 100.0, 5000.0))])
+    test_db.commit()
+
+    with patch('app.core.retention.COMPACTION_CHUNK_ROWS', 2):
+        assert delete_expired_histograms(test_db, service.stats_key, 60, NOW) == 2
+        assert delete_expired_histograms(test_db, service.stats_key, 60, NOW) == 1
+    assert test_db.query(LatencyHistogram).filter(LatencyHistogram.resolution == 60).count() == 0
+
+@pytest.mark.asyncio
+async def test_compactor_prunes_region_results_past_freshness(test_db, service):
+    # Service à 1 minute : les résultats régionaux restent frais 3 minutes
+    for minutes in (1, 2, 4, 10, 60):
+        test_db.add(RegionResult(service_id=service.id, region="eu-west", status=True, ping_date=NOW - timedelta(minutes=minutes)))
+    test_db.commit()
+
+    compactor = StatsCompactor()
+    with patch('app.core.retention.COMPACTION_CHUNK_ROWS', 2), \
+            patch('app.core.retention.COMPACTION_PAUSE_SECONDS', 0), \
+            patch('app.core.retention.settings.STATS_RETENTION', "raw=forever"):
+        report = await compactor.run(test_db, now=NOW)
+
+    assert report["region_rows_deleted"] == 3
+    assert sorted(ping_date for ping_date, in test_db.query(RegionResult.ping_date)) == [NOW - timedelta(minutes=2), NOW - timedelta(minutes=1)]
+    assert compactor.stats()["region_rows_deleted"] == 3
+
+@pytest.mark.asyncio
+async def test_period_stats_read_rollups_past_raw_window(test_db, service):
+    now = datetime.utcnow()
+    save_stats(test_db, [
+        stat(service, now - timedelta(days=10), False, None),
+        stat(service, now - timedelta(days=10, minutes=1), response_time=300.0),
+        stat(service, now - timedelta(hours=2), response_time=100.0),
+    ])
+    test_db.commit()
+    await StatsCompactor().run(test_db, now=now)
+    assert test_db.query(ServiceStats).count() == 1
+
+    stats = calculate_period_stats(test_db, service.stats_key, now - timedelta(days=30), "30d")
+
+    assert stats.status_counts == {"up": 2, "down": 1}
+    assert stats.avg_response_time == 200.0
+    assert len(stats.timestamps) == 2
+
+def test_migrates_legacy_uuid_stats(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/legacy.db")
+    attach_timeseries(engine, f"{tmp_path}/timeseries.db")
+    service_ids = [uuid.uuid4().hex, uuid.uuid4().hex]
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE services (id CHAR(32) PRIMARY KEY, name VARCHAR)"))
+        conn.execute(text(
+            "CREATE TABLE service_stats (id CHAR(32) PRIMARY KEY, service_id CHAR(32), "
+            "ping_date DATETIME, status BOOLEAN, response_time FLOAT)"
+        ))
+        for i, service_id in enumerate(service_ids):
+            conn.execute(text("INSERT INTO services (id, name) VALUES (:id, :name)"), {"id": service_id, "name": f"s{i}"})
+        rows = [
+            (service_ids[0], "2025-03-01 12:30:00.250000", 1, 100.4),
+            (service_ids[0], "2025-03-01 12:30:40.000000", 0, None),
+            (service_ids[1], "2025-03-01 13:05:00.000000", 1, 20.6),
+            (uuid.uuid4().hex, "2025-03-01 13:05:00.000000", 1, 1.0),  # Service supprimé
+        ]
+        for service_id, ping_date, status, response_time in rows:
+            conn.execute(
+                text("INSERT INTO service_stats VALUES (:id, :service_id, :ping_date, :status, :response_time)"),
+                {"id": uuid.uuid4().hex, "service_id": service_id, "ping_date": ping_date, "status": status, "response_time": response_time}
+            )
+
+    with engine.begin() as conn:
+        migrate_stats_storage(conn)
+    # Une seconde exécution ne change rien
+    with engine.begin() as conn:
+        migrate_stats_storage(conn)
+
+    with engine.connect() as conn:
+        # Les stats sont passées dans la base des séries temporelles
+        assert not has_table(conn, "service_stats")
+        assert columns_of(conn, "service_stats", TIMESERIES_SCHEMA) == {"service_key", "ts", "status", "latency_ms", "bytes_read", "status_code"}
+        keys = dict(conn.execute(text("SELECT id, stats_key FROM services")).all())
+        stats = conn.execute(text("SELECT service_key, ts, status, latency_ms FROM service_stats ORDER BY ts")).all()
+        assert stats == [
+            (keys[service_ids[0]], 1740832200250, 1, 100),
+            (keys[service_ids[0]], 1740832240000, 0, None),
+            (keys[service_ids[1]], 1740834300000, 1, 21),
+        ]
+        minute = conn.execute(text(
+            "SELECT up_count, down_count, response_time_sum FROM stats_rollups "
+            "WHERE service_key = :key AND resolution = 60"
+        ), {"key": keys[service_ids[0]]}).all()
+        assert minute == [(1, 1, 100.0)]
+        # Les services créés ensuite reçoivent une clé après les clés migrées
+        assert conn.execute(text("SELECT max(id) FROM stats_key_sequence")).scalar() == max(keys.values())
+
+def test_moves_compact_tables_to_timeseries_database(tmp_path):
+    path = f"sqlite:///{tmp_path}/config.db"
+    with create_engine(path).begin() as conn:
+        conn.execute(text("CREATE TABLE services (id CHAR(32) PRIMARY KEY, stats_key INTEGER)"))
+        conn.execute(text("INSERT INTO services VALUES ('a', 1)"))
+        conn.execute(text("CREATE TABLE service_stats (service_key INTEGER, ts INTEGER, status BOOLEAN, latency_ms INTEGER, PRIMARY KEY (service_key, ts))"))
+        conn.execute(text("INSERT INTO service_stats VALUES (1, 1740832200000, 1, 100)"))
+
+    engine = create_engine(path)
+    attach_timeseries(engine, f"{tmp_path}/timeseries.db")
+    with engine.begin() as conn:
+        migrate_stats_storage(conn)
+
+    with engine.connect() as conn:
+        assert not has_table(conn, "service_stats")
+        assert conn.execute(text(f"SELECT service_key, ts, latency_ms, bytes_read FROM {TIMESERIES_SCHEMA}.service_stats")).all() == [
+            (1, 1740832200000, 100, None)
+        ]
+        assert conn.execute(text(f"SELECT up_count FROM {TIMESERIES_SCHEMA}.stats_rollups WHERE resolution = 3600")).scalar() == 1
@@ -0,0 +1,83 @@
+import uuid
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, patch
+
+from app.core.ingest import save_stats
+from app.core.rules import compile_rule, describe, RuleAlerter
+from app.db.models import (
+    Service, ServiceStats, AlertRule, AlertRuleState, RuleKind, NotificationPreference, NotificationMethod,
+    AlertFrequency, RefreshFrequency,
+)
+
+NOW = datetime(2025, 3, 1, 12, 0)
+
+def new_state():
+    return AlertRuleState(rule_id=1, history=0, seen=0, firing=False, notified=True)
+
+def stat(i, status=True, response_time=100.0, status_code=200):
+    return ServiceStats(service_key=1, status=status, response_time=response_time, status_code=status_code,
+                        ping_date=NOW + timedelta(minutes=i))
+
+def test_latency_rule_fires_on_matches_of_last_checks():
+    evaluator = compile_rule(RuleKind.LATENCY, 2000.0, None, 3, 5, None)
+    state = new_state()
+    results = [evaluator.update(state, stat(i, response_time=time)) for i, time in enumerate([2500, 100, 2500, 2500, 100, 100, 100])]
+    assert results == [False, False, False, True, True, False, False]
+    assert state.value == 2 and state.seen == 5
+
+def test_status_code_rule_matches_class():
+    evaluator = compile_rule(RuleKind.STATUS_CODE, None, 5, 1, 1, None)
+    state = new_state()
+    assert [evaluator.update(state, stat(i, status_code=code)) for i, code in enumerate([200, 404, 503, None])] == [False, False, True, False]
+
+def test_uptime_rule_over_sliding_window():
+    evaluator = compile_rule(RuleKind.UPTIME, 99.0, None, 1, 1, 3600)
+    state = new_state()
+    assert evaluator.update(state, stat(0)) is None  # Pas assez de checks
+    results = [evaluator.update(state, stat(i, status=i != 5)) for i in range(1, 60)]
+    assert results[3] is False and results[4] is True and results[-1] is True
+    assert state.value == pytest.approx(59 / 60 * 100, abs=0.001)
+    # Une heure plus tard, le check en erreur est sorti de la fenêtre
+    assert evaluator.update(state, stat(66)) is False
+    assert len(state.buckets) <= 12
+
+def test_rules_with_the_same_definition_share_an_evaluator():
+    assert compile_rule(RuleKind.LATENCY, 2000.0, None, 3, 5, None) is compile_rule(RuleKind.LATENCY, 2000.0, None, 3, 5, None)
+    rule = AlertRule(kind=RuleKind.UPTIME, threshold=99.0, window_seconds=3600, matches=1, checks=1)
+    assert describe(rule) == "uptime over 1:00:00 < 99%"
+
+@pytest.mark.asyncio
+async def test_rule_evaluated_at_ingest_and_sent_once(test_db, test_user):
+    service = Service(
+        id=uuid.uuid4(), name="Rules", url="https://example.com",
+        refresh_frequency=RefreshFrequency.ONE_MINUTE, user_id=test_user.id
+    )
+    test_db.add(service)
+    test_db.add(NotificationPreference(
+        service_id=service.id, notification_method=NotificationMethod.SLACK, alert_frequency=AlertFrequency.ALWAYS,
+        webhook_url="https://hooks.slack.com/x"
+    ))
+    slow = AlertRule(service_id=service.id, kind=RuleKind.LATENCY, threshold=2000.0, matches=2, checks=5)
+    errors = AlertRule(service_id=service.id, kind=RuleKind.STATUS_CODE, status_class=5, matches=1, checks=1)
+    test_db.add_all([slow, errors])
+    test_db.commit()
+
+    def record(i, **fields):
+        save_stats(test_db, [ServiceStats(service_key=service.stats_key, ping_date=NOW + timedelta(minutes=i), **{
+            "status": True, "response_time": 100.0, "status_code": 200, **fields
+        })])
+        test_db.commit()
+
+    record(0, response_time=3000.0)
+    record(1, response_time=3000.0)
+    # Erreur 5xx aussitôt résolue : rien à envoyer pour cette règle
+    record(2, status=False, response_time=None, status_code=503)
+    record(3)
+    alerter = RuleAlerter()
+    with patch("app.core.notifications.send_slack_notification", new=AsyncMock(return_value=True)) as slack:
+        assert await alerter.run(test_db) == 1
+        assert await alerter.run(test_db) == 0
+    assert slack.await_count == 1
+    assert test_db.get(AlertRuleState, slow.id).firing
+    assert not test_db.get(AlertRuleState, errors.id).firing
@@ -0,0 +1,146 @@
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from app.core.scheduling import (
+    CheckSchedule,
+    EPOCH,
+    next_slot_after,
+    resolve_interval,
+    to_epoch,
+    LoadRecorder,
+    evenness,
+    expected_load,
+    is_due,
+    phase_offset,
+    slot_index,
+)
+
+def test_phase_offset_is_stable_and_within_interval():
+    service_id = uuid.UUID("a3ded56b-a4c6-49ef-8953-b8f1b0648145")
+
+    assert phase_offset(service_id, 60) == phase_offset(str(service_id), 60)
+    assert all(0 <= phase_offset(uuid.uuid4(), 60) < 60 for _ in range(100))
+
+def test_is_due_waits_for_the_service_phase():
+    phase = 20
+    slot_start = EPOCH + timedelta(seconds=60 * 1_000_000 + phase)
+    last_check = slot_start - timedelta(seconds=60)
+
+    assert not is_due(last_check, slot_start - timedelta(seconds=1), 60, phase)
+    assert is_due(last_check, slot_start, 60, phase)
+
+def test_is_due_late_check_keeps_its_slot():
+    # Un check exécuté 10s en retard ne décale pas le suivant d'un intervalle entier
+    phase = 0
+    slot_start = EPOCH + timedelta(seconds=60 * 1_000_000)
+    late_check = slot_start + timedelta(seconds=10)
+
+    assert is_due(late_check, slot_start + timedelta(seconds=60), 60, phase)
+
+def test_is_due_minimum_spacing():
+    # Un check très en retard n'est pas suivi d'un autre dès le début du slot suivant
+    phase = 0
+    slot_start = EPOCH + timedelta(seconds=60 * 1_000_000)
+    very_late_check = slot_start + timedelta(seconds=50)
+
+    assert not is_due(very_late_check, slot_start + timedelta(seconds=60), 60, phase)
+    assert is_due(very_late_check, slot_start + timedelta(seconds=120), 60, phase)
+
+def test_expected_load_is_spread_over_the_minute():
+    schedule = [(uuid.uuid4(), 60) for _ in range(6000)]
+
+    counts = expected_load(schedule, 60)
+    report = evenness(counts)
+
+    assert sum(counts) == 6000
+    assert report["mean"] == 100
+    assert report["peak_to_mean"] < 1.5
+
+def test_expected_load_long_intervals():
+    counts = expected_load([(uuid.uuid4(), 3600)], 60)
+
+    assert sum(counts) == 60 / 3600
+
+def test_load_recorder():
+    recorder = LoadRecorder(history_seconds=10)
+    for _ in range(3):
+        recorder.record(now=1000.2)
+    recorder.record(now=1005.0)
+
+    counts = recorder.per_second(now=1009)
+
+    assert len(counts) == 10
+    assert counts[0] == 3
+    assert counts[5] == 1
+    assert sum(recorder.per_second(now=1012)) == 1
+
+def test_resolve_interval():
+    assert resolve_interval("1 minute", None) == ("1 minute", 60)
+    assert resolve_interval("1 hour", 30) == ("30 seconds", 30)
+    assert resolve_interval("1 hour", 45) == ("custom", 45)
+
+def test_check_schedule_pops_due_services_once_per_slot():
+    schedule = CheckSchedule()
+    service_id = uuid.uuid4()
+    now = 1_000_000.0
+    schedule.sync({service_id: 10}, {}, now)
+
+    assert [sid for sid, _ in schedule.pop_due(now)] == [service_id]
+    assert schedule.pop_due(now + 1) == []
+
+    phase = phase_offset(service_id, 10)
+    next_slot = max(next_slot_after(now, 10, phase), now + 7.5)
+    assert schedule.pop_due(next_slot - 0.01) == []
+    assert [sid for sid, _ in schedule.pop_due(next_slot)] == [service_id]
+
+def test_check_schedule_coalesces_missed_slots():
+    schedule = CheckSchedule()
+    service_id = uuid.uuid4()
+    now = 1_000_000.0
+    schedule.sync({service_id: 10}, {}, now)
+    schedule.pop_due(now)
+
+    # Blocage de 5 minutes : un seul check, pas 30 à la suite
+    stalled = now + 300
+    assert len(schedule.pop_due(stalled)) == 1
+    assert schedule.pop_due(stalled + 1) == []
+    assert schedule.coalesced_slots >= 28
+
+def test_check_schedule_uses_last_check():
+    schedule = CheckSchedule()
+    service_id = uuid.uuid4()
+    last_check = datetime(2024, 1, 1, 12, 0, 0)
+    now = to_epoch(last_check) + 5
+
+    schedule.sync({service_id: 60}, {service_id: last_check}, now)
+
+    assert schedule.pop_due(now) == []
+    assert len(schedule.pop_due(to_epoch(last_check) + 61)) == 1
+
+def test_check_schedule_sync_handles_removed_and_changed_services():
+    schedule = CheckSchedule()
+    kept, removed = uuid.uuid4(), uuid.uuid4()
+    now = 1_000_000.0
+    schedule.sync({kept: 60, removed: 60}, {}, now)
+    schedule.pop_due(now)
+
+    schedule.sync({kept: 10}, {}, now + 1)
+
+    assert len(schedule) == 1
+    assert schedule.interval_of(kept) == 10
+    assert [sid for sid, _ in schedule.pop_due(now + 1)] == [kept]
+
+def test_check_schedule_scales_to_many_services():
+    schedule = CheckSchedule()
+    intervals = {uuid.uuid4(): 60 for _ in range(60_000)}
+    now = 1_000_000.0
+    schedule.sync(intervals, {}, now)
+    schedule.pop_due(now)
+
+    start = time.perf_counter()
+    dispatched = sum(len(schedule.pop_due(now + second)) for second in range(1, 61))
+    elapsed = time.perf_counter() - start
+
+    assert dispatched == 60_000  # Chaque service une fois par minute
+    assert elapsed < 2
@@ -0,0 +1,92 @@
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+
+from app.core.sharding import HashRing, ShardMembership, claim_checks, REBALANCE_GRACE_SECONDS
+from app.db.models import Service, RefreshFrequency
+
+def test_ring_spreads_services_evenly():
+    ring = HashRing(["w1", "w2", "w3"])
+    owners = Counter(ring.owner(uuid.uuid4()) for _ in range(3000))
+
+    assert set(owners) == {"w1", "w2", "w3"}
+    assert all(600 < count < 1400 for count in owners.values())
+
+def test_ring_moves_only_the_new_worker_share():
+    keys = [uuid.uuid4() for _ in range(3000)]
+    before = HashRing(["w1", "w2", "w3"])
+    after = HashRing(["w1", "w2", "w3", "w4"])
+
+    moved = [key for key in keys if before.owner(key) != after.owner(key)]
+
+    assert all(after.owner(key) == "w4" for key in moved)
+    assert 450 < len(moved) < 1100
+
+def test_membership_keeps_previous_shard_during_grace():
+    membership = ShardMembership("w1")
+    keys = [uuid.uuid4() for _ in range(200)]
+    assert all(membership.owns(key, 0) for key in keys)
+
+    assert membership.update(["w1", "w2"], now=100)
+    lost = [key for key in keys if membership.ring.owner(key) == "w2"]
+
+    assert lost
+    assert all(membership.owns(key, 100 + REBALANCE_GRACE_SECONDS - 1) for key in lost)
+    assert not any(membership.owns(key, 100 + REBALANCE_GRACE_SECONDS) for key in lost)
+    assert not membership.update(["w2", "w1"], now=200)
+
+def make_services(test_db, test_user, count):
+    services = [
+        Service(
+            id=uuid.uuid4(),
+            name=f"Sharded {i}",
+            url=f"https://shard{i}.example.com",
+            refresh_frequency=RefreshFrequency.ONE_MINUTE,
+            user_id=test_user.id
+        )
+        for i in range(count)
+    ]
+    test_db.add_all(services)
+    test_db.commit()
+    return services
+
+def test_claim_once_per_slot(test_db, test_user):
+    services = make_services(test_db, test_user, 10)
+    due = [(service.id, 0.0) for service in services]
+    intervals = {service.id: 60 for service in services}
+    now = datetime.utcnow()
+
+    first = claim_checks(test_db, "w1", due, intervals, now)
+    second = claim_checks(test_db, "w2", due, intervals, now + timedelta(seconds=1))
+    next_slot = claim_checks(test_db, "w2", due, intervals, now + timedelta(seconds=60))
+
+    assert len(first) == 10
+    assert second == []
+    assert len(next_slot) == 10
+
+def test_rebalance_neither_doubles_nor_skips(test_db, test_user):
+    """w3 joins: w1 and w2 see it 10 s later than w3 does, every service is
+    still checked exactly once per slot."""
+    services = make_services(test_db, test_user, 300)
+    intervals = {service.id: 60 for service in services}
+    workers = {name: ShardMembership(name) for name in ["w1", "w2", "w3"]}
+    workers["w1"].update(["w1", "w2"], 0)
+    workers["w2"].update(["w1", "w2"], 0)
+    workers["w3"].update(["w1", "w2", "w3"], 60)
+    start = datetime.utcnow()
+
+    for slot in range(4):
+        now = 60 * slot + 5
+        if slot == 1:
+            workers["w1"].update(["w1", "w2", "w3"], now + 10)
+            workers["w2"].update(["w1", "w2", "w3"], now + 10)
+        checked = Counter()
+        for name, membership in workers.items():
+            if name == "w3" and slot == 0:
+                continue
+            due = [(service.id, 0.0) for service in services if membership.owns(service.id, now)]
+            claimed = claim_checks(test_db, name, due, intervals, start + timedelta(seconds=now))
+            checked.update(service_id for service_id, _ in claimed)
+
+        assert set(checked) == {service.id for service in services}
+        assert set(checked.values()) == {1}
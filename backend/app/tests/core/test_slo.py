@@ -0,0 +1,111 @@
+import uuid
+import warnings
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, patch
+from sqlalchemy.exc import SAWarning
+
+from app.core.ingest import save_stats
+from app.core.slo import burn_rate_threshold, budget_status, rebuild_budget, SloAlerter
+from app.db.models import (
+    Service, ServiceStats, ServiceSlo, SloBucket, SloBudget, NotificationPreference,
+    NotificationMethod, AlertFrequency, RefreshFrequency,
+)
+
+NOW = datetime(2025, 3, 1, 12, 0)
+
+@pytest.fixture
+def service(test_db, test_user):
+    service = Service(
+        id=uuid.uuid4(),
+        name="Slo",
+        url="https://example.com",
+        refresh_frequency=RefreshFrequency.ONE_MINUTE,
+        user_id=test_user.id
+    )
+    test_db.add(service)
+    test_db.add(ServiceSlo(service_id=service.id, availability_target=99.0, latency_threshold_ms=200.0, latency_target=90.0, window_days=1))
+    test_db.commit()
+    return service
+
+def stats(service, statuses, start=NOW, response_time=100.0):
+    return [
+        ServiceStats(service_key=service.stats_key, status=status, response_time=response_time if status else None,
+                     ping_date=start + timedelta(minutes=i))
+        for i, status in enumerate(statuses)
+    ]
+
+def budget_of(test_db, service):
+    test_db.expire_all()
+    return test_db.get(SloBudget, service.stats_key)
+
+def test_thresholds_scale_with_the_window():
+    assert burn_rate_threshold("fast", 30) == pytest.approx(14.4)
+    assert burn_rate_threshold("slow", 30) == pytest.approx(6)
+    assert burn_rate_threshold("fast", 7) == pytest.approx(3.36)
+
+def test_budget_updated_at_ingest(test_db, service):
+    save_stats(test_db, stats(service, [True] * 8 + [False] * 2))
+    save_stats(test_db, stats(service, [True] * 5, start=NOW + timedelta(minutes=10), response_time=500.0))
+    test_db.commit()
+
+    budget = budget_of(test_db, service)
+    assert (budget.checks, budget.down_checks, budget.slow_checks) == (15, 2, 5)
+    assert test_db.query(SloBucket).count() == 3  # Buckets de 5 minutes
+    status = budget_status(test_db.get(ServiceSlo, service.id), budget)
+    assert status["availability"]["compliance"] == pytest.approx(86.6667)
+    assert status["latency"]["budget_remaining"] == pytest.approx(1 - (5 / 13) / 0.1, abs=1e-4)
+
+def test_buckets_leaving_the_window_are_subtracted(test_db, service):
+    save_stats(test_db, stats(service, [False] * 3))
+    test_db.commit()
+    assert budget_of(test_db, service).down_checks == 3
+
+    # Un jour plus tard, la fenêtre ne contient plus les premiers checks
+    save_stats(test_db, stats(service, [True] * 2, start=NOW + timedelta(days=1, minutes=10)))
+    test_db.commit()
+    budget = budget_of(test_db, service)
+    assert (budget.checks, budget.down_checks) == (2, 0)
+    assert budget.window_start == NOW + timedelta(minutes=10)
+    assert test_db.query(SloBucket).count() == 1
+
+def test_rebuild_matches_incremental_totals(test_db, service):
+    save_stats(test_db, stats(service, [True, False] * 30, response_time=300.0))
+    test_db.commit()
+    incremental = budget_of(test_db, service)
+    expected = (incremental.checks, incremental.down_checks, incremental.slow_checks)
+
+    incremental.alert, incremental.alerted_at = "fast", NOW
+    test_db.commit()
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", SAWarning)
+        rebuilt = rebuild_budget(test_db, service, test_db.get(ServiceSlo, service.id), now=NOW + timedelta(hours=1))
+        test_db.commit()
+    assert (rebuilt.checks, rebuilt.down_checks, rebuilt.slow_checks) == expected == (60, 30, 30)
+    assert (rebuilt.alert, rebuilt.alerted_at) == ("fast", NOW)
+    assert test_db.query(SloBucket).count() == 12
+
+@pytest.mark.asyncio
+async def test_alert_sent_once_then_resolved(test_db, service):
+    test_db.add(NotificationPreference(
+        service_id=service.id, notification_method=NotificationMethod.SLACK, alert_frequency=AlertFrequency.ALWAYS, webhook_url="https://hooks.slack.com/x"
+    ))
+    save_stats(test_db, stats(service, [False] * 60))
+    test_db.commit()
+    alerter = SloAlerter()
+
+    with patch("app.core.notifications.send_slack_notification", new=AsyncMock(return_value=True)) as slack:
+        assert await alerter.run(test_db, now=NOW + timedelta(hours=1)) == 1
+        assert await alerter.run(test_db, now=NOW + timedelta(hours=1, minutes=1)) == 0
+        assert slack.await_count == 1
+        budget = budget_of(test_db, service)
+        assert budget.alert == "fast"
+        assert budget.fast_burn_rate == 100.0
+
+        # Plus de check en erreur dans la fenêtre courte : fin de l'alerte
+        save_stats(test_db, stats(service, [True] * 30, start=NOW + timedelta(hours=1)))
+        test_db.commit()
+        assert await alerter.run(test_db, now=NOW + timedelta(hours=1, minutes=30)) == 0
+        assert slack.await_count == 2
+        assert budget_of(test_db, service).alert is None
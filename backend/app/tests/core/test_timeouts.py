@@ -0,0 +1,68 @@
+import uuid
+import pytest
+from datetime import datetime, timedelta
+
+from app.core.timeouts import (
+    TimeoutCache,
+    compute_timeout,
+    DEFAULT_TIMEOUT,
+    MIN_TIMEOUT,
+    MAX_TIMEOUT,
+    MIN_SAMPLES,
+)
+from app.db.models import Service, ServiceStats, RefreshFrequency
+
+def test_compute_timeout_not_enough_samples():
+    assert compute_timeout([100.0] * (MIN_SAMPLES - 1)) == DEFAULT_TIMEOUT
+
+def test_compute_timeout_multiple_of_p99():
+    # p99 de 1000ms -> 3s
+    assert compute_timeout([100.0] * 98 + [1000.0] * 2) == 3.0
+
+def test_compute_timeout_floor_and_ceiling():
+    assert compute_timeout([10.0] * 100) == MIN_TIMEOUT
+    assert compute_timeout([60_000.0] * 100) == MAX_TIMEOUT
+
+def make_service(user, **kwargs):
+    return Service(
+        id=uuid.uuid4(),
+        name="Service",
+        url="https://example.com",
+        refresh_frequency=RefreshFrequency.ONE_MINUTE,
+        user_id=user.id,
+        **kwargs
+    )
+
+def test_refresh_uses_recent_latency_profile(test_db, test_user):
+    fast = make_service(test_user)
+    slow = make_service(test_user)
+    unknown = make_service(test_user)
+    now = datetime.utcnow()
+    test_db.add_all([fast, slow, unknown])
+    test_db.flush()
+    for i in range(50):
+        test_db.add(ServiceStats(service_key=fast.stats_key, status=True, response_time=100.0, ping_date=now - timedelta(minutes=i)))
+        test_db.add(ServiceStats(service_key=slow.stats_key, status=True, response_time=5000.0, ping_date=now - timedelta(minutes=i)))
+    test_db.commit()
+
+    cache = TimeoutCache()
+    cache.refresh(test_db)
+
+    assert cache.get(fast) == MIN_TIMEOUT
+    assert cache.get(slow) == 15.0
+    assert cache.get(unknown) == DEFAULT_TIMEOUT
+
+def test_override_wins(test_user):
+    cache = TimeoutCache()
+    service = make_service(test_user, timeout_override=42.0)
+
+    assert cache.get(service) == 42.0
+
+def test_plan_capacity(test_user):
+    cache = TimeoutCache()
+    services = [make_service(test_user) for _ in range(200)]
+
+    plan = cache.plan_capacity(services, concurrency=20)
+
+    assert plan["worst_case_run_seconds"] == 200 * DEFAULT_TIMEOUT / 20
+    assert plan["fits_interval"] is False
@@ -0,0 +1,26 @@
+from datetime import datetime, timedelta
+
+from app.core.workers import record_heartbeat, live_workers, WORKER_STALE_SECONDS, WORKER_FORGET_AFTER
+from app.db.models import WorkerHeartbeat
+
+def test_heartbeat_upsert(test_db):
+    record_heartbeat(test_db, "worker-1", "worker", is_leader=False)
+    record_heartbeat(test_db, "worker-1", "worker", is_leader=True, dispatched_checks=12)
+
+    heartbeat = test_db.query(WorkerHeartbeat).one()
+    assert heartbeat.is_leader
+    assert heartbeat.dispatched_checks == 12
+
+def test_live_workers_skip_stale_ones(test_db):
+    now = datetime.utcnow()
+    record_heartbeat(test_db, "old", "worker", is_leader=False, now=now - timedelta(seconds=WORKER_STALE_SECONDS + 1))
+    record_heartbeat(test_db, "fresh", "api", is_leader=True, now=now)
+
+    assert [worker.worker_id for worker in live_workers(test_db, now)] == ["fresh"]
+
+def test_dead_workers_are_forgotten(test_db):
+    now = datetime.utcnow()
+    record_heartbeat(test_db, "gone", "worker", is_leader=False, now=now - WORKER_FORGET_AFTER - timedelta(minutes=1))
+    record_heartbeat(test_db, "fresh", "worker", is_leader=True, now=now)
+
+    assert test_db.query(WorkerHeartbeat).count() == 1
@@ -0,0 +1,34 @@
+import asyncio
+import logging
+import signal
+from app.db.session import init_db
+from app.core.scheduler import init_scheduler, shutdown_scheduler
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+async def run_worker():
+    """Run the scheduler, the probe engine and the notifications without the API.
+
+    Several workers can run at once: they elect a leader through the
+    database and each one records a heartbeat there. Without PROBE_SHARDING
+    only the leader checks services; with PROBE_SHARDING=true every worker
+    checks its consistent-hash shard, e.g. locally:
+
+        PROBE_SHARDING=true python -m app.worker  # dans plusieurs terminaux
+    """
+    init_db()
+    init_scheduler(role="worker")
+    logger.info("Monitor worker started")
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    await stop.wait()
+
+    shutdown_scheduler()
+    logger.info("Monitor worker stopped")
+
+if __name__ == "__main__":
+    asyncio.run(run_worker())